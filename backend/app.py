@@ -1,16 +1,39 @@
 # Backend application entry point 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import asyncio
+import heapq
 import logging
 import os
-from typing import Dict, Any, Optional, List
+import time
+import threading
+from typing import Dict, Any, Optional, List, Tuple
 from dotenv import load_dotenv
 
-from backend.helpbot.confluence_client import ConfluenceClient
-from backend.helpbot.html_extractor import HTMLExtractor
+from backend.helpbot.confluence_client import (ConfluenceClient, SEARCH_EXPAND_BODIES, SEARCH_EXPAND_VERSIONS,
+                                               count_transfer, current_transfer, mark_stale)
+from backend.helpbot.html_extractor import HTMLExtractor, ERROR_LOG_ID_PATTERN
 from backend.helpbot.ollama_service import OllamaService
+from backend.helpbot.knowledge_base import KnowledgeBase
+from backend.helpbot.models import ErrorEntry
+from backend.helpbot.snapshot import load_snapshot, load_enrichments, save_snapshot, SnapshotError
+from backend.helpbot.local_search import LocalSearchBackend
+from backend.helpbot.shared_index import SharedIndex, SharedIndexError
+from backend.helpbot.shards import ShardedKnowledgeBase, SpaceShard, parse_space_keys, shard_snapshot_path
+from backend.helpbot.executor import ExtractionExecutor, extract_entries, match_entries, rank_entries, find_solution
+from backend.helpbot.deadline import Deadline, DeadlineExceeded
+from backend.helpbot.query_log import QueryLog, canonical_query
+from backend.helpbot.tracing import current_trace, start_trace, trace_hit, trace_miss, trace_stage
+from backend.helpbot.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, QUEUE_DEPTH, REGISTRY as METRICS
+from backend.helpbot.answer_cache import AnswerCache
+from backend.helpbot.scheduler import background_priority
+from backend.helpbot.suggestions import SuggestionIndex
+from backend.helpbot.autocomplete import AutocompleteIndex
+from backend.helpbot.search import CursorError, decode_cursor, encode_cursor, make_snippet
+from backend.helpbot.webhook import (PageRefreshQueue, WebhookError, REMOVAL_EVENTS, SIGNATURE_HEADER,
+                                    parse_event, verify_signature)
 
 # Load environment variables from .env
 load_dotenv('.env')
@@ -34,9 +57,11 @@ app.add_middleware(
 CONFLUENCE_URL = os.getenv("CONFLUENCE_URL")
 CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME")
 CONFLUENCE_API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN")
-CONFLUENCE_SPACE_KEY = os.getenv("CONFLUENCE_SPACE_KEY")
+# Comma-separated spaces to serve; CONFLUENCE_SPACE_KEY still works for a single space
+CONFLUENCE_SPACE_KEYS = parse_space_keys(os.getenv("CONFLUENCE_SPACE_KEYS") or os.getenv("CONFLUENCE_SPACE_KEY"))
+CONFLUENCE_SPACE_KEY = CONFLUENCE_SPACE_KEYS[0] if CONFLUENCE_SPACE_KEYS else None
 
-logger.info(f"Loaded config - URL: {CONFLUENCE_URL}, User: {CONFLUENCE_USERNAME}, Space: {CONFLUENCE_SPACE_KEY}")
+logger.info(f"Loaded config - URL: {CONFLUENCE_URL}, User: {CONFLUENCE_USERNAME}, Spaces: {CONFLUENCE_SPACE_KEYS}")
 
 # Initialize clients with error handling
 confluence_client = None
@@ -44,13 +69,13 @@ try:
     confluence_url = os.getenv("CONFLUENCE_URL")
     confluence_username = os.getenv("CONFLUENCE_USERNAME")
     confluence_api_token = os.getenv("CONFLUENCE_API_TOKEN")
-    confluence_space_key = os.getenv("CONFLUENCE_SPACE_KEY")
     
-    if confluence_url and confluence_username and confluence_api_token and confluence_space_key:
-        logger.info(f"Loaded config - URL: {confluence_url}, User: {confluence_username}, Space: {confluence_space_key}")
+    if confluence_url and confluence_username and confluence_api_token and CONFLUENCE_SPACE_KEYS:
+        logger.info(f"Loaded config - URL: {confluence_url}, User: {confluence_username}, Spaces: {CONFLUENCE_SPACE_KEYS}")
         logger.info(f"API Token: {confluence_api_token[:10]}...")  # Log first 10 chars for debugging
         confluence_client = ConfluenceClient(
-            confluence_url, confluence_username, confluence_api_token, confluence_space_key
+            confluence_url, confluence_username, confluence_api_token, CONFLUENCE_SPACE_KEY,
+            space_keys=CONFLUENCE_SPACE_KEYS
         )
         logger.info("Confluence client initialized successfully")
         
@@ -62,13 +87,125 @@ try:
             logger.error(f"Connection test failed: {test_e}")
     else:
         logger.warning("Confluence environment variables not found - running in demo mode")
-        logger.warning(f"Missing vars: URL={bool(confluence_url)}, User={bool(confluence_username)}, Token={bool(confluence_api_token)}, Space={bool(confluence_space_key)}")
+        logger.warning(f"Missing vars: URL={bool(confluence_url)}, User={bool(confluence_username)}, Token={bool(confluence_api_token)}, Space={bool(CONFLUENCE_SPACE_KEYS)}")
 except Exception as e:
     logger.error(f"Failed to initialize Confluence client: {e}")
     logger.warning("Continuing in demo mode")
     confluence_client = None
 html_extractor = HTMLExtractor()
 
+# Total time budget for one /query request; stages that don't fit are skipped
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS", "3.0"))
+
+# Knowledge base snapshot - lets a fresh process answer from the first request
+KNOWLEDGE_BASE_SNAPSHOT = os.getenv("KNOWLEDGE_BASE_SNAPSHOT", "data/kb_snapshot.db")
+KNOWLEDGE_BASE_REFRESH_SECONDS = int(os.getenv("KNOWLEDGE_BASE_REFRESH_SECONDS", "0"))
+# Shared secret of the Confluence webhook; page events then refresh just the changed page
+CONFLUENCE_WEBHOOK_SECRET = os.getenv("CONFLUENCE_WEBHOOK_SECRET")
+
+# Optional memory-mapped index published by the sync job and shared read-only by all workers
+KNOWLEDGE_BASE_SHARED_INDEX = os.getenv("KNOWLEDGE_BASE_SHARED_INDEX")
+
+# A budget per space for knowledge base searches; a space that overruns it is left out of the answer
+KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS = float(os.getenv("KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS", "0.5"))
+
+def build_shard(space_key: str) -> SpaceShard:
+    """
+    A space's shard. A single space keeps the KNOWLEDGE_BASE_SNAPSHOT file itself; with several each
+    gets its own file next to it. KNOWLEDGE_BASE_REFRESH_SECONDS_<SPACE> overrides the sync interval.
+    """
+    sharded = len(CONFLUENCE_SPACE_KEYS) > 1
+    return SpaceShard(
+        space_key,
+        KnowledgeBase(html_extractor),
+        shard_snapshot_path(KNOWLEDGE_BASE_SNAPSHOT, space_key) if sharded else KNOWLEDGE_BASE_SNAPSHOT,
+        refresh_seconds=int(os.getenv(f"KNOWLEDGE_BASE_REFRESH_SECONDS_{space_key.upper()}",
+                                      KNOWLEDGE_BASE_REFRESH_SECONDS)),
+        client=confluence_client.for_space(space_key) if confluence_client and sharded else confluence_client,
+    )
+
+knowledge_base = ShardedKnowledgeBase([build_shard(key) for key in CONFLUENCE_SPACE_KEYS or ["default"]])
+shared_index = None
+if KNOWLEDGE_BASE_SHARED_INDEX and os.path.exists(KNOWLEDGE_BASE_SHARED_INDEX):
+    try:
+        shared_index = SharedIndex(KNOWLEDGE_BASE_SHARED_INDEX)
+        logger.info(f"Mapped shared knowledge base index {KNOWLEDGE_BASE_SHARED_INDEX}: {len(shared_index)} entries")
+    except (OSError, SharedIndexError) as e:
+        logger.error(f"Failed to map shared index: {e}")
+
+# Severity/category/suggestions precomputed by the index job, keyed by entry version
+shared_enrichments: Dict[str, Dict[str, Any]] = {}
+if shared_index:
+    # Entries come from the shared mapping; the in-memory knowledge base only caches live fetches
+    logger.info("Skipping in-process snapshot load - serving entries from the shared index")
+    if os.path.exists(KNOWLEDGE_BASE_SNAPSHOT):
+        try:
+            shared_enrichments = load_enrichments(KNOWLEDGE_BASE_SNAPSHOT)
+        except SnapshotError as e:
+            logger.error(f"Failed to load precomputed enrichments: {e}")
+else:
+    for shard in knowledge_base.shards.values():
+        if not os.path.exists(shard.snapshot_path):
+            logger.info(f"No knowledge base snapshot at {shard.snapshot_path} - space {shard.space_key} starts cold")
+            continue
+        try:
+            load_snapshot(shard.snapshot_path, shard.knowledge_base)
+        except SnapshotError as e:
+            logger.error(f"Failed to load knowledge base snapshot of space {shard.space_key}: {e}")
+
+# Search backend: "confluence" (CQL text search) or "local" (SQLite FTS5 over the snapshot)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "confluence").lower()
+search_backend = confluence_client
+if SEARCH_BACKEND == "local":
+    if os.path.exists(KNOWLEDGE_BASE_SNAPSHOT):
+        search_backend = LocalSearchBackend(KNOWLEDGE_BASE_SNAPSHOT)
+        logger.info(f"Using local FTS5 search backend over {KNOWLEDGE_BASE_SNAPSHOT}")
+    else:
+        logger.warning("SEARCH_BACKEND=local but no snapshot exists - falling back to Confluence search")
+
+# Related-query suggestions precomputed from the knowledge base and logged traffic
+SUGGESTIONS_TOP_N = int(os.getenv("SUGGESTIONS_TOP_N", "3"))
+SUGGESTIONS_REBUILD_SECONDS = int(os.getenv("SUGGESTIONS_REBUILD_SECONDS", "300"))
+SUGGESTIONS_LOG_DAYS = float(os.getenv("SUGGESTIONS_LOG_DAYS", "30"))
+# Ask the LLM for suggestions when the index has none for an entry (off: suggestions are data only)
+SUGGESTIONS_LLM_FALLBACK = os.getenv("SUGGESTIONS_LLM_FALLBACK", "false").lower() == "true"
+suggestion_index = SuggestionIndex()
+
+# Typeahead over titles, error ids and popular queries, rebuilt with the suggestion index
+AUTOCOMPLETE_LIMIT = int(os.getenv("AUTOCOMPLETE_LIMIT", "8"))
+AUTOCOMPLETE_MAX_QUERIES = int(os.getenv("AUTOCOMPLETE_MAX_QUERIES", "500"))
+autocomplete_index = AutocompleteIndex()
+
+# Ranked /search: results per page by default and at most
+SEARCH_DEFAULT_K = int(os.getenv("SEARCH_DEFAULT_K", "10"))
+SEARCH_MAX_K = int(os.getenv("SEARCH_MAX_K", "50"))
+
+# Every answered query with its stage timings, cache hits and providers, written in batches off the request path
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "data/query_log.db")
+query_log = QueryLog(
+    QUERY_LOG_PATH,
+    buffer_size=int(os.getenv("QUERY_LOG_BUFFER", "10000")),
+    flush_interval=float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "1.0")),
+    retention_days=float(os.getenv("QUERY_LOG_RETENTION_DAYS", "30")),
+)
+
+# Complete answers to recent queries, by canonical query
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600")),
+)
+
+# Prewarming: replay the most frequent recent queries (or PREWARM_QUERIES, "|"-separated)
+# through the pipeline at background priority before /health reports ready
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "50"))
+PREWARM_QUERIES = [query.strip() for query in os.getenv("PREWARM_QUERIES", "").split("|") if query.strip()]
+PREWARM_LOOKBACK_HOURS = float(os.getenv("PREWARM_LOOKBACK_HOURS", "24"))
+PREWARM_BUDGET_SECONDS = float(os.getenv("PREWARM_BUDGET_SECONDS", "60"))
+prewarm_state: Dict[str, Any] = {"status": "pending"}
+
+# CPU-bound parsing and matching run off the event loop (process pool for big payloads)
+extraction_executor = ExtractionExecutor()
+
 # Initialize Ollama service
 ollama_service = None
 try:
@@ -84,33 +221,33 @@ except Exception as e:
 
 # Demo data for when Confluence is not configured
 DEMO_ERROR_DATA = [
-    {
-        'id': '3999',
-        'error_code': 'Error Log #3999: AS2 Connection Timeout',
-        'explanation': 'AS2 connection timed out while attempting to establish secure communication with trading partner. This typically occurs when the remote server is unresponsive or network connectivity issues prevent the handshake from completing within the configured timeout period.',
-        'resolution': 'Check network connectivity to trading partner. Verify AS2 endpoint URL is correct. Increase timeout settings in AS2 configuration. Contact trading partner to verify their AS2 service is operational. Review firewall rules to ensure AS2 ports are open.'
-    },
-    {
-        'id': '1',
-        'error_code': 'Error Log 1: Database Connection Failed',
-        'explanation': 'Unable to establish connection to the primary database server. Connection attempts are timing out after 30 seconds.',
-        'resolution': 'Verify database server is running. Check connection string parameters. Ensure network connectivity between application and database server. Review database server logs for any errors.'
-    },
-    {
-        'id': '2',
-        'error_code': 'Error Log 2: Authentication Service Unavailable',
-        'explanation': 'The authentication service is not responding to login requests. Users cannot authenticate and access the system.',
-        'resolution': 'Restart the authentication service. Check service logs for errors. Verify LDAP/AD connectivity if using external authentication. Ensure authentication database is accessible.'
-    },
-    {
-        'id': '500',
-        'error_code': 'Error Log 500: Internal Server Error',
-        'explanation': 'An unexpected internal server error occurred while processing the request. This is typically caused by unhandled exceptions in the application code.',
-        'resolution': 'Check application logs for detailed error information. Review recent code deployments. Verify all required services and dependencies are running. Contact development team if error persists.'
-    }
+    ErrorEntry(
+        id='3999',
+        error_code='Error Log #3999: AS2 Connection Timeout',
+        explanation='AS2 connection timed out while attempting to establish secure communication with trading partner. This typically occurs when the remote server is unresponsive or network connectivity issues prevent the handshake from completing within the configured timeout period.',
+        resolution='Check network connectivity to trading partner. Verify AS2 endpoint URL is correct. Increase timeout settings in AS2 configuration. Contact trading partner to verify their AS2 service is operational. Review firewall rules to ensure AS2 ports are open.'
+    ),
+    ErrorEntry(
+        id='1',
+        error_code='Error Log 1: Database Connection Failed',
+        explanation='Unable to establish connection to the primary database server. Connection attempts are timing out after 30 seconds.',
+        resolution='Verify database server is running. Check connection string parameters. Ensure network connectivity between application and database server. Review database server logs for any errors.'
+    ),
+    ErrorEntry(
+        id='2',
+        error_code='Error Log 2: Authentication Service Unavailable',
+        explanation='The authentication service is not responding to login requests. Users cannot authenticate and access the system.',
+        resolution='Restart the authentication service. Check service logs for errors. Verify LDAP/AD connectivity if using external authentication. Ensure authentication database is accessible.'
+    ),
+    ErrorEntry(
+        id='500',
+        error_code='Error Log 500: Internal Server Error',
+        explanation='An unexpected internal server error occurred while processing the request. This is typically caused by unhandled exceptions in the application code.',
+        resolution='Check application logs for detailed error information. Review recent code deployments. Verify all required services and dependencies are running. Contact development team if error persists.'
+    )
 ]
 
-def find_demo_match(user_query: str) -> dict:
+def find_demo_match(user_query: str) -> ErrorEntry:
     """Find matching error from demo data using enhanced semantic matching"""
     user_query_lower = user_query.lower().strip()
     
@@ -120,7 +257,7 @@ def find_demo_match(user_query: str) -> dict:
     if exact_match:
         query_log_num = exact_match.group(1)
         for entry in DEMO_ERROR_DATA:
-            if entry.get('id') == query_log_num:
+            if entry.id == query_log_num:
                 return entry
     
     # Enhanced semantic matching
@@ -144,9 +281,9 @@ def find_demo_match(user_query: str) -> dict:
 
     for entry in DEMO_ERROR_DATA:
         score = 0
-        title = entry.get('error_code', '').lower()
-        explanation = entry.get('explanation', '').lower()
-        resolution = entry.get('resolution', '').lower()
+        title = entry.error_code.lower()
+        explanation = entry.explanation.lower()
+        resolution = entry.resolution.lower()
         
         # Extract words from entry content
         title_words = set(re.findall(r'\b\w{3,}\b', title))
@@ -196,6 +333,8 @@ def find_demo_match(user_query: str) -> dict:
 
 class QueryRequest(BaseModel):
     query: str
+    # Set by the widget per page view; links queries for the suggestion index
+    session_id: Optional[str] = None
 
 class ErrorResponse(BaseModel):
     user_issue: str
@@ -208,6 +347,333 @@ class ErrorResponse(BaseModel):
     category: str = "general"
     conversational_response: Optional[str] = None
     suggestions: List[str] = []
+    skipped_stages: List[str] = []
+    # Answered from last known good Confluence data because Confluence was failing
+    stale: bool = False
+    # Provider, model and generation budget that served each AI task
+    ai_profiles: Dict[str, Dict[str, Any]] = {}
+
+class SearchResult(BaseModel):
+    id: str
+    error_code: str
+    score: float
+    page_id: str = ""
+    page_title: Optional[str] = None
+    space_key: Optional[str] = None
+    snippet: str
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    candidates: int
+    next_cursor: Optional[str] = None
+
+async def search_shards(query: str, k: int, after=None, deadline: Optional[Deadline] = None,
+                        exact_id: Optional[str] = None) -> Tuple[List[Tuple[float, ErrorEntry]], int]:
+    """
+    Rank each space's candidates concurrently and merge the top k by score,
+    returning them with the number of candidates scored. A space that
+    doesn't finish within its budget is left out and counted as a timeout.
+    """
+    async def search_shard(shard: SpaceShard):
+        started = time.perf_counter()
+        index = shard.knowledge_base
+        candidates = index.candidates(query)
+        exact_entry = index.get_by_id(exact_id) if exact_id else None
+        if exact_entry is not None and exact_entry not in candidates:
+            candidates.append(exact_entry)
+        if not candidates:
+            shard.record_query(time.perf_counter() - started)
+            return [], 0
+        timeout = deadline.timeout(KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS) if deadline else KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS
+        try:
+            ranked = await asyncio.wait_for(extraction_executor.run_in_thread(
+                rank_entries, query, candidates, k, after
+            ), timeout=timeout)
+        except asyncio.TimeoutError:
+            shard.record_query(time.perf_counter() - started, timed_out=True)
+            logger.warning(f"Space {shard.space_key} missed its {timeout * 1000:.0f} ms search budget "
+                           f"({len(candidates)} candidates)")
+            return [], 0
+        shard.record_query(time.perf_counter() - started)
+        return ranked, len(candidates)
+
+    shards = [shard for shard in knowledge_base.shards.values() if len(shard.knowledge_base)]
+    results = await asyncio.gather(*(search_shard(shard) for shard in shards))
+    # Same order as top_matches within a shard: score, then page and entry id
+    merged = heapq.nsmallest(k, (item for ranked, _ in results for item in ranked),
+                             key=lambda item: (-item[0], item[1].page_id, item[1].id))
+    return merged, sum(count for _, count in results)
+
+async def find_knowledge_base_match(user_query: str, error_num: Optional[str],
+                                    deadline: Optional[Deadline] = None) -> Optional[ErrorEntry]:
+    """Answer from the knowledge base when it has a match, without calling Confluence"""
+    if deadline and deadline.expired():
+        raise DeadlineExceeded('knowledge_base')
+    if shared_index:
+        shared_index.maybe_remap()
+    if shared_index and len(shared_index):
+        if error_num:
+            match = shared_index.get_by_id(error_num)
+        else:
+            candidates = shared_index.candidates(user_query)
+            match = None
+            if candidates:
+                match = await extraction_executor.run_in_thread(
+                    match_entries, user_query, candidates, deadline=deadline
+                )
+        if match:
+            return match
+    if not len(knowledge_base):
+        return None
+    if error_num:
+        # An explicit id that the knowledge base doesn't know goes to the live search
+        return knowledge_base.get_by_id(error_num)
+    ranked, candidates = await search_shards(user_query, 1, deadline=deadline)
+    if ranked:
+        return ranked[0][1]
+    if candidates:
+        # Like find_best_match: entries sharing a term with the query still beat a live search
+        return next(entry for shard in knowledge_base.shards.values()
+                    for entry in shard.knowledge_base.candidates(user_query))
+    return None
+
+def find_enrichment(entry: ErrorEntry) -> Optional[Dict[str, Any]]:
+    """Precomputed severity, category and suggestions for this version of the entry, if any"""
+    return knowledge_base.get_enrichment(entry) or shared_enrichments.get(entry.version_key())
+
+def indexed_entries() -> List[ErrorEntry]:
+    """Every entry currently served, from the shared index or the in-process knowledge base"""
+    if shared_index:
+        return [shared_index.get_entry(position) for position in range(len(shared_index))]
+    return list(knowledge_base.entries)
+
+def build_suggestion_index(records: List[Dict[str, Any]]) -> SuggestionIndex:
+    enrichments = {**shared_enrichments, **knowledge_base.enrichments}
+    return SuggestionIndex.build(indexed_entries(), records, enrichments, top_n=SUGGESTIONS_TOP_N)
+
+def build_autocomplete_index(records: List[Dict[str, Any]]) -> AutocompleteIndex:
+    # Demo mode completes the sample entries
+    entries = indexed_entries() or DEMO_ERROR_DATA
+    return AutocompleteIndex.build(entries, records, max_queries=AUTOCOMPLETE_MAX_QUERIES)
+
+async def rebuild_suggestions_periodically():
+    """Rebuild the suggestion and autocomplete indexes now and then from the latest knowledge base and query log"""
+    global suggestion_index, autocomplete_index
+    while True:
+        try:
+            records = await asyncio.to_thread(query_log.read, time.time() - SUGGESTIONS_LOG_DAYS * 86400)
+            suggestion_index = await asyncio.to_thread(build_suggestion_index, records)
+            autocomplete_index = await asyncio.to_thread(build_autocomplete_index, records)
+        except Exception as e:
+            logger.error(f"Suggestion index rebuild failed: {e}")
+        await asyncio.sleep(SUGGESTIONS_REBUILD_SECONDS)
+
+@app.on_event("startup")
+async def start_traffic_tasks():
+    """Flush the query log and classifier labels, and rebuild the suggestion index, in the background"""
+    asyncio.create_task(query_log.run())
+    asyncio.create_task(ollama_service.label_store.run())
+    asyncio.create_task(rebuild_suggestions_periodically())
+
+async def run_ai_stages(user_query: str, data: Dict[str, str], deadline: Deadline,
+                        enrichment: Optional[Dict[str, Any]] = None,
+                        related_queries: Optional[List[str]] = None):
+    """
+    Run the AI enhancement, conversational reply and suggestions on the async
+    clients, so the event loop keeps serving while the LLM scheduler decides what runs.
+    With a precomputed enrichment only the conversational reply needs the LLM.
+    Suggestions come from the suggestion index, then the enrichment, and only
+    reach the LLM when SUGGESTIONS_LLM_FALLBACK is on.
+    """
+    profile_usage = ollama_service.track_profile_usage()
+    if enrichment:
+        enhanced_data = {
+            **data,
+            'resolution_steps': data.get('resolution', 'No resolution steps available'),
+            'severity': enrichment['severity'],
+            'category': enrichment['category'],
+            'enhanced': True,
+            'ai_provider': 'precomputed',
+        }
+        profile_usage['analysis'] = {'provider': 'precomputed', 'source': enrichment.get('provider')}
+        trace_hit('enrichment')
+    else:
+        # The service times its own stages (analysis, conversation, suggestions) into the trace
+        enhanced_data = await ollama_service.aenhance_error_analysis(user_query, data, deadline=deadline)
+    
+    # Generate conversational response
+    conversational_response = await ollama_service.agenerate_conversational_response(
+        user_query, enhanced_data, deadline=deadline
+    )
+    
+    # Get suggestions
+    if related_queries:
+        suggestions = related_queries
+        profile_usage['suggestions'] = {'provider': 'suggestion_index'}
+        trace_hit('suggestion_index')
+    elif enrichment and enrichment['suggestions']:
+        suggestions = enrichment['suggestions']
+        profile_usage['suggestions'] = {'provider': 'precomputed', 'source': enrichment.get('provider')}
+    elif SUGGESTIONS_LLM_FALLBACK:
+        suggestions = await ollama_service.asuggest_related_queries(
+            user_query, enhanced_data.get('category', 'general'), deadline=deadline
+        )
+    else:
+        suggestions = []
+    
+    trace = current_trace()
+    if trace:
+        trace.providers.update((task, usage['provider']) for task, usage in profile_usage.items())
+    return enhanced_data, conversational_response, suggestions, profile_usage
+
+async def build_entry_response(user_query: str, entry: ErrorEntry, deadline: Deadline) -> ErrorResponse:
+    """Enhance a structured error entry and turn it into the API response"""
+    trace = current_trace()
+    if trace:
+        trace.entry_id = entry.id
+        trace.page_id = entry.page_id or None
+    enrichment = find_enrichment(entry)
+    related_queries = suggestion_index.lookup(entry.id)
+    # Hits are recorded where run_ai_stages uses them
+    if not enrichment:
+        trace_miss('enrichment')
+    if not related_queries:
+        trace_miss('suggestion_index')
+    enhanced_data, conversational_response, suggestions, profile_usage = await run_ai_stages(
+        user_query, entry.to_dict(), deadline, enrichment=enrichment, related_queries=related_queries
+    )
+    
+    return ErrorResponse(
+        user_issue=user_query,
+        explanation=enhanced_data.get("explanation", "No explanation found."),
+        resolution_steps=enhanced_data.get("resolution", "No resolution steps found."),
+        resolution=enhanced_data.get("resolution", "No resolution steps found."),
+        enhanced=enhanced_data.get("enhanced", False),
+        severity=enhanced_data.get("severity", "medium"),
+        category=enhanced_data.get("category", "general"),
+        conversational_response=conversational_response,
+        suggestions=suggestions,
+        skipped_stages=deadline.skipped_stages,
+        ai_profiles=profile_usage
+    )
+
+# Shards refreshing at the same time take turns rewriting the combined snapshot
+combined_snapshot_lock = threading.Lock()
+
+def save_snapshots(shards: List[SpaceShard]):
+    """
+    Write the given spaces' snapshots. With several spaces also rewrite the combined
+    KNOWLEDGE_BASE_SNAPSHOT, whose FTS tables SEARCH_BACKEND=local searches.
+    """
+    for shard in shards:
+        save_snapshot(shard.knowledge_base, shard.snapshot_path)
+    if len(knowledge_base.shards) > 1:
+        with combined_snapshot_lock:
+            save_snapshot(knowledge_base.merged(), KNOWLEDGE_BASE_SNAPSHOT)
+
+async def refresh_shard_periodically(shard: SpaceShard):
+    """Incrementally re-sync one space with Confluence on its own schedule and re-publish its snapshot"""
+    while True:
+        await asyncio.sleep(shard.refresh_seconds)
+        started = time.perf_counter()
+        try:
+            # Changed pages are extracted in the process pool, off this worker's GIL
+            stats = await asyncio.to_thread(
+                shard.knowledge_base.refresh, shard.client, extraction_executor.process_pool()
+            )
+            shard.record_refresh(time.perf_counter() - started)
+            if stats['added'] or stats['updated'] or stats['removed']:
+                await asyncio.to_thread(save_snapshots, [shard])
+                # Cached answers may quote changed entries; rebuild the warm set from the new data
+                answer_cache.clear()
+                await prewarm_caches()
+        except Exception as e:
+            shard.record_refresh(time.perf_counter() - started, failed=True)
+            logger.error(f"Knowledge base refresh of space {shard.space_key} failed: {e}")
+
+@app.on_event("startup")
+async def start_knowledge_base_refresh():
+    """Start the background sync of each space when Confluence is configured"""
+    if shared_index and KNOWLEDGE_BASE_REFRESH_SECONDS > 0:
+        # With a shared index the sync job is the single writer; workers only remap
+        logger.warning("KNOWLEDGE_BASE_REFRESH_SECONDS ignored - the shared index is published by the sync job")
+        return
+    if not confluence_client:
+        return
+    for shard in knowledge_base.shards.values():
+        if shard.refresh_seconds > 0:
+            asyncio.create_task(refresh_shard_periodically(shard))
+            logger.info(f"Knowledge base refresh of space {shard.space_key} every {shard.refresh_seconds}s")
+
+async def apply_page_event(event: str, page_id: str):
+    """Re-fetch and re-extract one page after a webhook event and drop the cached answers quoting it"""
+    if event in REMOVAL_EVENTS:
+        shard = await asyncio.to_thread(knowledge_base.remove_page, page_id)
+        changed = [shard] if shard else []
+    else:
+        page = await asyncio.to_thread(confluence_client.get_page, page_id, 'body.storage,version,space')
+        if page is None:
+            raise RuntimeError("page could not be fetched")
+        space_key = page.get('space', {}).get('key')
+        owner = knowledge_base.shard_for_page(page_id)
+        if space_key and CONFLUENCE_SPACE_KEYS and space_key not in knowledge_base.shards:
+            logger.info(f"Ignoring {event} for page {page_id} in space {space_key}")
+            if owner is None:
+                return
+            # Moved out of the configured spaces
+            await asyncio.to_thread(knowledge_base.remove_page, page_id)
+            changed = [owner]
+        else:
+            version = page.get('version', {}).get('number', 0)
+            known_page = owner.knowledge_base.pages[page_id] if owner else None
+            if known_page and known_page.get('version') == version and knowledge_base.shards.get(space_key, owner) is owner:
+                # Redelivered event, or the periodic sync got there first
+                return
+            body = page.get('body', {}).get('storage', {}).get('value', '')
+            entries = await extraction_executor.run(len(body), extract_entries, body)
+            shard = await asyncio.to_thread(
+                knowledge_base.update_page, page_id, page.get('title', ''), version, body, True, entries, space_key
+            )
+            changed = [shard] if owner in (None, shard) else [owner, shard]
+    dropped = answer_cache.invalidate(page_id)
+    logger.info(f"Applied {event} for page {page_id}; dropped {dropped} cached answers")
+    # One snapshot write per burst of events; with a shared index the sync job owns the files
+    if not shared_index:
+        page_refresh_shards.update(shard.space_key for shard in changed)
+        if not len(page_refresh_queue):
+            shards = [knowledge_base.shards[space_key] for space_key in sorted(page_refresh_shards)]
+            await asyncio.to_thread(save_snapshots, shards)
+            page_refresh_shards.clear()
+
+page_refresh_queue = PageRefreshQueue(apply_page_event)
+# Spaces changed by the current burst of webhook events, whose snapshots are rewritten once it ends
+page_refresh_shards = set()
+
+@app.on_event("startup")
+async def start_page_refresh_queue():
+    """Apply Confluence webhook events in the background when the webhook is configured"""
+    if CONFLUENCE_WEBHOOK_SECRET and confluence_client:
+        asyncio.create_task(page_refresh_queue.run())
+
+@app.post("/webhooks/confluence", status_code=202)
+async def confluence_webhook(request: Request):
+    """Receive a signed Confluence page event and queue a refresh of just that page."""
+    if not CONFLUENCE_WEBHOOK_SECRET or not confluence_client:
+        raise HTTPException(status_code=503, detail="Confluence webhook is not configured")
+    body = await request.body()
+    try:
+        verify_signature(CONFLUENCE_WEBHOOK_SECRET, body, request.headers.get(SIGNATURE_HEADER))
+    except WebhookError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    try:
+        event, page_id = parse_event(body)
+    except WebhookError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if event is None:
+        return {"status": "ignored"}
+    page_refresh_queue.submit(event, page_id)
+    return {"status": "queued", "event": event, "page_id": page_id}
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -252,7 +718,7 @@ async def test_connection():
                 "message": "Confluence client not initialized - running in demo mode",
                 "confluence_configured": False
             }
-        result = confluence_client.test_connection()
+        result = await asyncio.to_thread(confluence_client.test_connection)
         logger.info(f"Connection test result: {result}")
         return result
     except Exception as e:
@@ -262,14 +728,15 @@ async def test_connection():
 @app.get("/debug-search")
 async def debug_search():
     """Debug Confluence search functionality"""
-    if not confluence_client:
+    if not search_backend:
         return {"status": "error", "message": "Confluence not configured"}
     
     try:
         # Test basic search
-        results = confluence_client.search_pages("Error", limit=5)
+        results = await asyncio.to_thread(search_backend.search_pages, "Error", limit=5)
         return {
             "status": "success",
+            "search_backend": SEARCH_BACKEND,
             "search_query": "Error",
             "results_count": len(results) if results else 0,
             "results": results[:3] if results else [],  # First 3 results only
@@ -279,8 +746,97 @@ async def debug_search():
         return {"status": "error", "message": str(e), "error_type": type(e).__name__}
 
 @app.post("/query")
-async def process_query(request: QueryRequest) -> ErrorResponse:
+async def process_query(request: QueryRequest, http_response: Response = None) -> ErrorResponse:
     """Processes user query using the multi-format extraction engine."""
+    trace = start_trace(request.query.strip(), request.session_id)
+    status = "error"
+    try:
+        with count_transfer() as transfer:
+            response = await answer_with_cache(request)
+        status = response.status
+        if http_response is not None:
+            # What this answer cost in Confluence traffic
+            http_response.headers["X-Confluence-Requests"] = str(transfer.requests)
+            http_response.headers["X-Confluence-Bytes"] = str(transfer.bytes)
+        return response
+    finally:
+        if trace.query:
+            query_log.record_trace(trace, status)
+
+async def answer_with_cache(request: QueryRequest) -> ErrorResponse:
+    """Serve a recent identical query from the answer cache, else answer and cache complete answers"""
+    key = canonical_query(request.query)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        trace_hit('answer')
+        return cached.model_copy(deep=True)
+    trace_miss('answer')
+    response = await answer_query(request)
+    transfer = current_transfer()
+    response.stale = bool(transfer and transfer.stale)
+    # Partial answers (stages skipped for time or load, AI failed while available, stale data) are not worth repeating
+    complete = not response.skipped_stages and not response.stale and (
+        response.enhanced or not ollama_service.is_available())
+    if response.status == "success" and complete:
+        trace = current_trace()
+        tags = [trace.page_id] if trace and trace.page_id else []
+        answer_cache.put(key, response.model_copy(deep=True), tags)
+    return response
+
+async def prewarm_caches() -> Dict[str, Any]:
+    """
+    Drive the top recent queries through the pipeline at background priority so the
+    knowledge base, page store, Ollama models and answer cache are warm, within
+    PREWARM_BUDGET_SECONDS. Reports the share of the lookback window's traffic the
+    warmed queries account for.
+    """
+    since = time.time() - PREWARM_LOOKBACK_HOURS * 3600
+    queries = PREWARM_QUERIES
+    if not queries and PREWARM_TOP_N > 0:
+        queries = [row['canonical'] for row in await asyncio.to_thread(query_log.top_queries, PREWARM_TOP_N, since)]
+    started = time.monotonic()
+    warmed = []
+    with background_priority():
+        for query in queries:
+            if time.monotonic() - started >= PREWARM_BUDGET_SECONDS:
+                logger.warning(f"Prewarm budget of {PREWARM_BUDGET_SECONDS:.0f}s used up after {len(warmed)} queries")
+                break
+            try:
+                # A trace of its own, so the cached answer is tagged with its page for webhook invalidation
+                start_trace(query)
+                response = await answer_with_cache(QueryRequest(query=query))
+            except Exception as e:
+                logger.warning(f"Prewarming '{query}' failed: {e}")
+                continue
+            if response.status == "success":
+                warmed.append(query)
+    total = await asyncio.to_thread(query_log.count, since)
+    covered = await asyncio.to_thread(query_log.count, since, sorted({canonical_query(q) for q in warmed}))
+    stats = {
+        "queries": len(queries),
+        "warmed": len(warmed),
+        "seconds": round(time.monotonic() - started, 2),
+        "traffic_coverage": round(covered / total, 3) if total else None,
+    }
+    logger.info(f"Prewarmed caches: {stats}")
+    return stats
+
+@app.on_event("startup")
+async def start_prewarm():
+    """Warm the caches in the background; /health reports not ready until done"""
+    async def run():
+        prewarm_state["status"] = "warming"
+        try:
+            prewarm_state.update(await prewarm_caches())
+        except Exception as e:
+            logger.error(f"Prewarming failed: {e}")
+        prewarm_state["status"] = "ready"
+
+    asyncio.create_task(run())
+
+async def answer_query(request: QueryRequest) -> ErrorResponse:
+    """The /query pipeline; stages are timed into the request's query trace"""
+    deadline = Deadline(QUERY_DEADLINE_SECONDS)
     try:
         user_query = request.query.strip()
         if not user_query:
@@ -326,46 +882,56 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
         extracted_keywords = extract_search_keywords(user_query)
         logger.info(f"Extracted search keywords: '{extracted_keywords}'")
         
+        # 0. Serve from the local knowledge base when it already knows the answer
+        with trace_stage('knowledge_base'):
+            kb_match = await find_knowledge_base_match(user_query, extracted_error_num, deadline)
+        if kb_match:
+            trace_hit('knowledge_base')
+            logger.info(f"Found knowledge base match: {kb_match.error_code}")
+            return await build_entry_response(user_query, kb_match, deadline)
+        trace_miss('knowledge_base')
+        
         # 1. Find the most relevant page in Confluence or use demo data as fallback
-        if not confluence_client:
+        if not search_backend:
             logger.warning("Confluence not configured - using demo data as fallback")
             # Use demo data when Confluence is not available
             demo_match = find_demo_match(user_query)
             
             # Enhance with Ollama if available
-            enhanced_data = ollama_service.enhance_error_analysis(user_query, demo_match)
-            
-            # Generate conversational response
-            conversational_response = ollama_service.generate_conversational_response(
-                user_query, enhanced_data
-            )
-            
-            # Get suggestions
-            suggestions = ollama_service.suggest_related_queries(
-                user_query, enhanced_data.get('category', 'general')
+            enhanced_data, conversational_response, suggestions, profile_usage = await run_ai_stages(
+                user_query, demo_match.to_dict(), deadline
             )
             
             return ErrorResponse(
                 user_issue=user_query,
-                explanation=enhanced_data.get("explanation", demo_match.get("explanation", "No explanation found.")),
-                resolution_steps=enhanced_data.get("resolution", demo_match.get("resolution", "No resolution steps found.")),
-                resolution=enhanced_data.get("resolution", demo_match.get("resolution", "No resolution steps found.")),
+                explanation=enhanced_data.get("explanation", demo_match.explanation),
+                resolution_steps=enhanced_data.get("resolution", demo_match.resolution),
+                resolution=enhanced_data.get("resolution", demo_match.resolution),
                 enhanced=enhanced_data.get("enhanced", False),
                 severity=enhanced_data.get("severity", "medium"),
                 category=enhanced_data.get("category", "general"),
                 conversational_response=conversational_response,
-                suggestions=suggestions
+                suggestions=suggestions,
+                skipped_stages=deadline.skipped_stages,
+                ai_profiles=profile_usage
             )
         
-        # Try multiple search strategies for better results
+        # Try multiple search strategies for better results. Confluence calls retry with backoff,
+        # so they run in threads (which carry the trace and transfer counters) to keep the loop free.
         search_results = None
+        # With pages already stored, searches only need versions to validate them; a cold store
+        # takes the bodies in the search payload so a new page costs no second request
+        search_expand = SEARCH_EXPAND_VERSIONS if knowledge_base.pages else SEARCH_EXPAND_BODIES
         
         # Strategy 1: If we have an error log number, search for it specifically
         if extracted_error_num:
             search_query = f"Error Log #{extracted_error_num}"
             logger.info(f"Strategy 1 - Searching for specific error log: '{search_query}'")
             try:
-                search_results = confluence_client.search_pages(search_query, limit=1)
+                with trace_stage('search'):
+                    search_results = await asyncio.to_thread(
+                        search_backend.search_pages, search_query, limit=1, deadline=deadline, expand=search_expand
+                    )
                 logger.info(f"Strategy 1 search results: {len(search_results) if search_results else 0} results")
                 if search_results:
                     logger.info(f"First result: {search_results[0].get('title', 'No title')}")
@@ -374,10 +940,13 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
                 search_results = None
         
         # Strategy 2: Search using extracted keywords
-        if not search_results and extracted_keywords:
+        if not search_results and extracted_keywords and not deadline.expired():
             logger.info(f"Strategy 2 - Searching with keywords: '{extracted_keywords}'")
             try:
-                search_results = confluence_client.search_pages(extracted_keywords, limit=1)
+                with trace_stage('search'):
+                    search_results = await asyncio.to_thread(
+                        search_backend.search_pages, extracted_keywords, limit=1, deadline=deadline, expand=search_expand
+                    )
                 logger.info(f"Strategy 2 search results: {len(search_results) if search_results else 0} results")
                 if search_results:
                     logger.info(f"First result: {search_results[0].get('title', 'No title')}")
@@ -386,10 +955,13 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
                 search_results = None
         
         # Strategy 3: Fallback to original query
-        if not search_results:
+        if not search_results and not deadline.expired():
             logger.info(f"Strategy 3 - Fallback to original query: '{user_query}'")
             try:
-                search_results = confluence_client.search_pages(user_query, limit=1)
+                with trace_stage('search'):
+                    search_results = await asyncio.to_thread(
+                        search_backend.search_pages, user_query, limit=1, deadline=deadline, expand=search_expand
+                    )
                 logger.info(f"Strategy 3 search results: {len(search_results) if search_results else 0} results")
                 if search_results:
                     logger.info(f"First result: {search_results[0].get('title', 'No title')}")
@@ -404,13 +976,54 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
                 explanation="No relevant documentation found for this error.",
                 resolution_steps="Please refine your search query or check the Confluence space directly.",
                 resolution="Please refine your search query or check the Confluence space directly.",
-                status="error"
+                status="error",
+                skipped_stages=deadline.skipped_stages
             )
         
         # 2. Get the content of that page
         best_page = search_results[0]
         logger.info(f"Found best page: '{best_page['title']}' (ID: {best_page['id']})")
-        page_content = confluence_client.get_page_content(best_page['id'])
+        trace = current_trace()
+        if trace:
+            trace.page_id = best_page['id']
+        page_version = best_page.get('version', {}).get('number', 0)
+        known_page = knowledge_base.pages.get(best_page['id'])
+        all_entries = None
+        if known_page and known_page.get('version') == page_version:
+            trace_hit('page')
+            page_content = knowledge_base.get_page_body(best_page['id'])
+            all_entries = knowledge_base.page_entries.get(best_page['id'])
+        else:
+            trace_miss('page')
+            # Local search results, and Confluence searches of a cold store, carry the body already
+            page_content = ConfluenceClient.page_body(best_page)
+            if page_content is None and confluence_client:
+                with trace_stage('fetch'):
+                    page_content = await asyncio.to_thread(
+                        confluence_client.get_page_content, best_page['id'], deadline=deadline
+                    )
+                if page_content is None and known_page:
+                    # Confluence is failing: an older stored version beats no answer
+                    page_content = knowledge_base.get_page_body(best_page['id'])
+                    all_entries = knowledge_base.page_entries.get(best_page['id'])
+                    if page_content is not None:
+                        mark_stale()
+            if page_content and all_entries is None:
+                # First try structured extraction to find specific error logs
+                logger.info(f"Trying structured extraction for page content...")
+                with trace_stage('extract'):
+                    all_entries = await extraction_executor.run(
+                        len(page_content), extract_entries, page_content, deadline=deadline
+                    )
+                # Keep the in-memory knowledge base current with what we just fetched, unless
+                # it is a stale stand-in that may be older than page_version. Off the loop, as a
+                # background refresh may be holding the index lock.
+                transfer = current_transfer()
+                if not (transfer and transfer.stale):
+                    await asyncio.to_thread(
+                        knowledge_base.update_page, best_page['id'], best_page['title'], page_version, page_content,
+                        True, all_entries, ConfluenceClient.page_space_key(best_page)
+                    )
         
         if not page_content:
             return ErrorResponse(
@@ -418,61 +1031,36 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
                 explanation=f"Found page '{best_page['title']}' but could not retrieve its content.",
                 resolution_steps="Please check the page permissions in Confluence or try again.",
                 resolution="Please check the page permissions in Confluence or try again.",
-                status="error"
+                status="error",
+                skipped_stages=deadline.skipped_stages
             )
         
-        # First try structured extraction to find specific error logs
-        logger.info(f"Trying structured extraction for page content...")
-        all_entries = html_extractor.extract_error_entries(page_content)
+        all_entries = all_entries or []
         logger.info(f"Found {len(all_entries)} structured error entries")
         
         if all_entries:
             # Find the best match for the user's query
-            best_match = html_extractor.find_best_match(user_query, all_entries)
+            with trace_stage('match'):
+                best_match = await extraction_executor.run_in_thread(
+                    match_entries, user_query, all_entries, deadline=deadline
+                )
             if best_match:
-                logger.info(f"Found structured match: {best_match.get('error_code', 'Unknown')}")
+                logger.info(f"Found structured match: {best_match.error_code}")
                 # Enhance with Ollama if available
-                enhanced_data = ollama_service.enhance_error_analysis(user_query, best_match)
-                
-                # Generate conversational response
-                conversational_response = ollama_service.generate_conversational_response(
-                    user_query, enhanced_data
-                )
-                
-                # Get suggestions
-                suggestions = ollama_service.suggest_related_queries(
-                    user_query, enhanced_data.get('category', 'general')
-                )
-                
-                return ErrorResponse(
-                    user_issue=user_query,
-                    explanation=enhanced_data.get("explanation", "No explanation found."),
-                    resolution_steps=enhanced_data.get("resolution", "No resolution steps found."),
-                    resolution=enhanced_data.get("resolution", "No resolution steps found."),
-                    enhanced=enhanced_data.get("enhanced", False),
-                    severity=enhanced_data.get("severity", "medium"),
-                    category=enhanced_data.get("category", "general"),
-                    conversational_response=conversational_response,
-                    suggestions=suggestions
-                )
+                return await build_entry_response(user_query, best_match, deadline)
             else:
                 logger.warning("No structured match found despite having entries")
         
         # Fallback to universal parser if no structured entries found
         logger.info(f"No structured entries found, using universal parser...")
-        solution = html_extractor.find_best_solution(user_query, page_content)
+        with trace_stage('universal_parser'):
+            solution = await extraction_executor.run(
+                len(page_content), find_solution, user_query, page_content, deadline=deadline
+            )
         
         # Enhance with Ollama if available
-        enhanced_data = ollama_service.enhance_error_analysis(user_query, solution)
-        
-        # Generate conversational response
-        conversational_response = ollama_service.generate_conversational_response(
-            user_query, enhanced_data
-        )
-        
-        # Get suggestions
-        suggestions = ollama_service.suggest_related_queries(
-            user_query, enhanced_data.get('category', 'general')
+        enhanced_data, conversational_response, suggestions, profile_usage = await run_ai_stages(
+            user_query, solution, deadline
         )
         
         return ErrorResponse(
@@ -484,15 +1072,93 @@ async def process_query(request: QueryRequest) -> ErrorResponse:
             severity=enhanced_data.get("severity", "medium"),
             category=enhanced_data.get("category", "general"),
             conversational_response=conversational_response,
-            suggestions=suggestions
+            suggestions=suggestions,
+            skipped_stages=deadline.skipped_stages,
+            ai_profiles=profile_usage
         )
         
     except HTTPException:
         raise
+    except DeadlineExceeded as e:
+        logger.warning(f"Query '{request.query}' ran out of its {QUERY_DEADLINE_SECONDS:.1f}s budget: {e}")
+        deadline.skip(e.stage)
+        return ErrorResponse(
+            user_issue=request.query,
+            explanation="The request took too long to complete.",
+            resolution_steps="Please try again in a moment or make the query more specific.",
+            resolution="Please try again in a moment or make the query more specific.",
+            status="error",
+            skipped_stages=deadline.skipped_stages
+        )
     except Exception as e:
         logger.error(f"Unexpected error processing query '{request.query}': {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {e}")
 
+@app.get("/search", response_model=SearchResponse)
+async def search(q: str, k: int = SEARCH_DEFAULT_K, cursor: Optional[str] = None):
+    """Top-k knowledge base entries for a query with scores and snippets; never calls the LLM."""
+    query = q.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    k = max(1, min(k, SEARCH_MAX_K))
+    try:
+        after = decode_cursor(cursor, query) if cursor else None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if shared_index:
+        shared_index.maybe_remap()
+    exact_match = ERROR_LOG_ID_PATTERN.search(query.lower())
+    exact_id = exact_match.group(1) if exact_match else None
+    # One extra result tells whether there is a next page
+    if not (shared_index and len(shared_index)) and len(knowledge_base):
+        ranked, candidate_count = await search_shards(query, k + 1, after, exact_id=exact_id)
+    else:
+        if shared_index and len(shared_index):
+            candidates = shared_index.candidates(query)
+            exact_entry = shared_index.get_by_id(exact_id) if exact_id else None
+            if exact_entry is not None and exact_entry not in candidates:
+                candidates.append(exact_entry)
+        else:
+            # Demo mode: the sample entries stand in for the knowledge base
+            candidates = list(DEMO_ERROR_DATA)
+        ranked = await extraction_executor.run_in_thread(
+            rank_entries, query, candidates, k + 1, after
+        ) if candidates else []
+        candidate_count = len(candidates)
+    page, more = ranked[:k], len(ranked) > k
+
+    query_words = html_extractor.query_features(query)[1]
+    results = []
+    for score, entry in page:
+        shard = knowledge_base.shard_for_page(entry.page_id) if entry.page_id else None
+        page_info = shard.knowledge_base.pages[entry.page_id] if shard else None
+        results.append(SearchResult(
+            id=entry.id,
+            error_code=entry.error_code,
+            score=round(score, 2),
+            page_id=entry.page_id,
+            page_title=page_info['title'] if page_info else None,
+            space_key=shard.space_key if shard and CONFLUENCE_SPACE_KEYS else None,
+            snippet=make_snippet(entry.explanation or entry.resolution, query_words),
+        ))
+    next_cursor = None
+    if more:
+        last_score, last_entry = page[-1]
+        next_cursor = encode_cursor(query, last_score, last_entry.page_id, last_entry.id)
+    return SearchResponse(query=query, results=results, candidates=candidate_count, next_cursor=next_cursor)
+
+@app.get("/autocomplete")
+async def autocomplete(q: str, limit: int = AUTOCOMPLETE_LIMIT):
+    """Typeahead suggestions for a partial query from the in-memory autocomplete index."""
+    started = time.perf_counter()
+    suggestions = autocomplete_index.complete(q, max(1, min(limit, 20)))
+    return {
+        "query": q,
+        "suggestions": suggestions,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
 @app.get("/ollama-status")
 async def ollama_status():
     """Check Ollama service status."""
@@ -502,6 +1168,13 @@ async def ollama_status():
             "status": "available" if is_available else "unavailable",
             "model": ollama_service.model_name,
             "base_url": ollama_service.base_url,
+            "provider": ollama_service.current_provider,
+            "latency": ollama_service.latency_stats(),
+            "routing": ollama_service.routing_stats(),
+            "scheduler": ollama_service.scheduler_stats(),
+            "residency": ollama_service.residency_stats(),
+            "profiles": ollama_service.profile_stats(),
+            "classifier": ollama_service.classifier_stats(),
             "message": "Ollama is ready for natural language processing" if is_available else "Ollama is not available - using basic mode"
         }
     except Exception as e:
@@ -510,10 +1183,86 @@ async def ollama_status():
             "message": f"Error checking Ollama status: {str(e)}"
         }
 
+@app.get("/executor-status")
+async def executor_status():
+    """Report extraction pool sizes, dispatch threshold and queue wait times."""
+    return extraction_executor.stats()
+
+@app.get("/query-stats")
+async def query_stats(hours: float = 24, top: int = 10):
+    """Top queries and entries, latency percentiles, cache hit rates and Confluence traffic."""
+    since = time.time() - hours * 3600
+    return {
+        "log": query_log.stats(),
+        "top_queries": await asyncio.to_thread(query_log.top_queries, top, since),
+        "top_entries": await asyncio.to_thread(query_log.top_entries, top, since),
+        "report": await asyncio.to_thread(query_log.report, since),
+        "confluence": confluence_client.stats() if confluence_client else None,
+    }
+
+@app.get("/cache-status")
+async def cache_status():
+    """Report answer cache hit rate, the last prewarm run and webhook page refreshes."""
+    return {"answers": answer_cache.stats(), "prewarm": prewarm_state, "webhook": page_refresh_queue.stats()}
+
+def register_queue_gauges():
+    """Queue depths read at scrape time, so recording them costs the request path nothing"""
+    QUEUE_DEPTH.set_function(lambda: ollama_service.scheduler_stats()['queued'], 'llm_scheduler')
+    QUEUE_DEPTH.set_function(lambda: len(page_refresh_queue), 'page_refresh')
+    QUEUE_DEPTH.set_function(lambda: query_log.stats()['buffered'], 'query_log')
+    for kind in ('thread', 'process'):
+        QUEUE_DEPTH.set_function(
+            lambda kind=kind: extraction_executor.stats()['pools'][kind]['in_flight'], f'extraction_{kind}'
+        )
+
+register_queue_gauges()
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latency histograms, LLM calls, cache hits and misses and queue depths in Prometheus text format."""
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/shards-status")
+async def shards_status():
+    """Size, search latency and sync state of each space's knowledge base shard"""
+    return {
+        "shard_timeout_seconds": KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS,
+        "spaces": knowledge_base.stats(),
+    }
+
+@app.get("/suggestions-status")
+async def suggestions_status():
+    """Report the suggestion index size, the traffic it was built from and when."""
+    return dict(suggestion_index.stats(), llm_fallback=SUGGESTIONS_LLM_FALLBACK,
+                autocomplete=autocomplete_index.stats())
+
+@app.on_event("startup")
+async def start_model_residency():
+    """Preload the Ollama models and keep them warm so queries don't pay the model load"""
+    asyncio.create_task(ollama_service.keep_models_warm())
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    """Stop the extraction pools and close pooled AI connections"""
+    extraction_executor.shutdown()
+    await ollama_service.aclose()
+
+@app.on_event("shutdown")
+async def flush_query_log():
+    """Write whatever the query log still buffers"""
+    await asyncio.to_thread(query_log.close)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint with service status"""
     try:
+        if prewarm_state["status"] != "ready":
+            # Keep the instance out of rotation until its caches are warm
+            return JSONResponse(status_code=503, content={
+                "status": "warming",
+                "service": "helpbot",
+                "message": "Prewarming caches"
+            })
         # Simplified health check to avoid startup issues
         return {
             "status": "healthy",
@@ -538,5 +1287,12 @@ if __name__ == "__main__":
     # Use reload=False for production deployment
     reload = os.getenv("ENVIRONMENT", "production") == "development"
     
-    logger.info(f"Starting server on {host}:{port} (reload={reload})")
-    uvicorn.run("backend.app:app", host=host, port=port, reload=reload) 
\ No newline at end of file
+    # WEB_CONCURRENCY > 1 preloads the app once and forks workers that share it copy-on-write
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    
+    logger.info(f"Starting server on {host}:{port} (reload={reload}, workers={workers})")
+    if workers > 1 and not reload:
+        from backend.prefork import serve
+        serve(host, port, workers)
+    else:
+        uvicorn.run("backend.app:app", host=host, port=port, reload=reload) 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import time
+import heapq
+import logging
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from .html_extractor import STOP_WORDS
+from .models import ErrorEntry
+from .query_log import canonical_query
+
+logger = logging.getLogger(__name__)
+
+# Entries (answered by id, the cheapest query) rank above popular queries, and those above bare terms;
+# within a kind, more popular suggestions come first
+KIND_ORDER = {'entry': 0, 'query': 1, 'term': 2}
+
+
+class AutocompleteIndex:
+    """
+    Typeahead over entry titles, error ids, popular logged queries and common
+    knowledge base terms. Every completion key sits in one sorted list, so a
+    lookup is a bisect to the first key with the prefix and a short scan;
+    build() does the work offline.
+
+    Titles are indexed from every word, so "connection" completes "Error Log 1:
+    Database Connection Failed". Picking an entry suggests its "Error Log #<id>"
+    query, which is answered by id instead of free-text matching.
+    """
+
+    def __init__(self, keys: Optional[List[str]] = None, refs: Optional[List[int]] = None,
+                 items: Optional[List[Dict[str, Any]]] = None, stats: Optional[Dict[str, Any]] = None):
+        self.keys = keys or []
+        self.refs = refs or []
+        self.items = items or []
+        self.built_stats = stats or {'entries': 0, 'queries': 0, 'terms': 0, 'keys': 0, 'built_at': None}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def complete(self, prefix: str, limit: int = 8, max_scan: int = 1000) -> List[Dict[str, Any]]:
+        """The best-ranked suggestions with a key starting with prefix; scans at most max_scan keys"""
+        prefix = canonical_query(prefix)
+        if not prefix or limit <= 0:
+            return []
+        matched = set()
+        position = bisect_left(self.keys, prefix)
+        end = min(len(self.keys), position + max_scan)
+        while position < end and self.keys[position].startswith(prefix):
+            matched.add(self.refs[position])
+            position += 1
+        items = self.items
+        best = heapq.nsmallest(limit, matched,
+                               key=lambda ref: (KIND_ORDER[items[ref]['kind']], -items[ref]['weight'], ref))
+        return [{key: value for key, value in items[ref].items() if key != 'weight'} for ref in best]
+
+    @classmethod
+    def build(cls, entries: Iterable[ErrorEntry], query_records: Iterable[Dict[str, Any]],
+              max_queries: int = 500, min_query_count: int = 2, max_terms: int = 2000) -> 'AutocompleteIndex':
+        started = time.perf_counter()
+        entries = list(entries)
+
+        popularity = Counter()
+        query_counts = Counter()
+        for record in query_records:
+            if record.get('entry_id'):
+                popularity[record['entry_id']] += 1
+                # Only queries that found an entry are worth suggesting to the next user
+                query_counts[record['canonical']] += 1
+
+        items: List[Dict[str, Any]] = []
+        pairs = []
+
+        def add(keys: Iterable[str], item: Dict[str, Any]):
+            items.append(item)
+            for key in set(keys):
+                if key:
+                    pairs.append((key, len(items) - 1))
+
+        term_counts = Counter()
+        for entry in entries:
+            title = canonical_query(entry.error_code)
+            words = title.split()
+            # Each word of the title starts a key, except filler words
+            keys = [' '.join(words[i:]) for i, word in enumerate(words) if word not in STOP_WORDS]
+            if entry.id:
+                keys += [entry.id, f"#{entry.id}", f"error log {entry.id}", f"error log #{entry.id}"]
+            add(keys, {
+                'text': entry.error_code,
+                'query': f"Error Log #{entry.id}" if entry.id else entry.error_code,
+                'kind': 'entry',
+                'entry_id': entry.id or None,
+                'weight': popularity[entry.id],
+            })
+            text = canonical_query(f"{entry.error_code} {entry.explanation}")
+            term_counts.update(set(word for word in text.split() if len(word) > 3 and word not in STOP_WORDS
+                                   and not word.isdigit()))
+
+        queries = [(query, count) for query, count in query_counts.most_common(max_queries) if count >= min_query_count]
+        for query, count in queries:
+            add([query], {'text': query, 'query': query, 'kind': 'query', 'entry_id': None, 'weight': count})
+
+        terms = term_counts.most_common(max_terms)
+        for term, count in terms:
+            add([term], {'text': term, 'query': term, 'kind': 'term', 'entry_id': None, 'weight': count})
+
+        pairs.sort()
+        stats = {'entries': len(entries), 'queries': len(queries), 'terms': len(terms), 'keys': len(pairs),
+                 'built_at': time.time(), 'build_ms': round((time.perf_counter() - started) * 1000, 1)}
+        logger.info(f"Built autocomplete index: {stats}")
+        return cls([key for key, _ in pairs], [ref for _, ref in pairs], items, stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.built_stats)
@@ -0,0 +1,213 @@
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .html_extractor import ERROR_TYPES, STOP_WORDS, WORD_PATTERN
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+SEVERITIES = ['low', 'medium', 'high']
+CATEGORIES = ['connection', 'configuration', 'authentication', 'data', 'general']
+LABELS = {'severity': SEVERITIES, 'category': CATEGORIES}
+
+
+def classification_text(user_query: str, data: Dict[str, str]) -> str:
+    """The text a severity/category label depends on: the documented entry plus the user's query"""
+    return ' '.join([
+        user_query,
+        data.get('error_code', ''),
+        data.get('explanation', ''),
+        data.get('resolution', '') or data.get('resolution_steps', ''),
+    ])
+
+
+def extract_features(text: str) -> Dict[str, float]:
+    """Sparse features: content words plus keyword hits per html_extractor error type"""
+    text = text.lower()
+    features = {f"w:{word}": 1.0 for word in WORD_PATTERN.findall(text) if word not in STOP_WORDS}
+    for error_type, keywords in ERROR_TYPES.items():
+        hits = sum(1 for keyword in keywords if keyword in text)
+        if hits:
+            features[f"type:{error_type}"] = float(hits)
+    return features
+
+
+def normalize_label(head: str, value: Optional[str]) -> Optional[str]:
+    """Map an LLM's free-text severity/category to a known class, or None"""
+    if not value:
+        return None
+    value = value.strip().strip('[].').lower()
+    for label in LABELS[head]:
+        if value == label or value.startswith(label):
+            return label
+    return None
+
+
+class _LinearHead:
+    """Multinomial logistic regression over sparse features"""
+
+    def __init__(self, classes: List[str], weights: Optional[Dict[str, List[float]]] = None,
+                 bias: Optional[List[float]] = None):
+        self.classes = classes
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(classes)
+
+    def probabilities(self, features: Dict[str, float]) -> List[float]:
+        scores = list(self.bias)
+        for feature, value in features.items():
+            weights = self.weights.get(feature)
+            if weights:
+                for index, weight in enumerate(weights):
+                    scores[index] += weight * value
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def predict(self, features: Dict[str, float]) -> Tuple[str, float]:
+        probabilities = self.probabilities(features)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.classes[best], probabilities[best]
+
+    def train(self, examples: List[Tuple[Dict[str, float], str]], epochs: int, learning_rate: float,
+              l2: float, rng: random.Random):
+        examples = list(examples)
+        for epoch in range(epochs):
+            rng.shuffle(examples)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, label in examples:
+                target = self.classes.index(label)
+                probabilities = self.probabilities(features)
+                for index, probability in enumerate(probabilities):
+                    gradient = probability - (1.0 if index == target else 0.0)
+                    self.bias[index] -= rate * gradient
+                    for feature, value in features.items():
+                        weights = self.weights.setdefault(feature, [0.0] * len(self.classes))
+                        weights[index] -= rate * (gradient * value + l2 * weights[index])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'classes': self.classes, 'bias': self.bias, 'weights': self.weights}
+
+
+class ErrorClassifier:
+    """
+    Local severity/category classifier: a linear model per head, trained on
+    labels the LLM produced earlier. Predicting is a sparse dot product, so it
+    costs microseconds; callers escalate to the LLM when the confidence of
+    either head is below their threshold.
+    """
+
+    def __init__(self, heads: Optional[Dict[str, _LinearHead]] = None, examples: int = 0):
+        self.heads = heads or {head: _LinearHead(classes) for head, classes in LABELS.items()}
+        self.examples = examples
+
+    @classmethod
+    def train(cls, labels: Iterable[Dict[str, str]], epochs: int = 15, learning_rate: float = 0.2,
+              l2: float = 1e-4, seed: int = 0) -> 'ErrorClassifier':
+        rng = random.Random(seed)
+        rows = [(extract_features(label['text']), label) for label in labels]
+        classifier = cls(examples=len(rows))
+        for head, model in classifier.heads.items():
+            model.train([(features, label[head]) for features, label in rows], epochs, learning_rate, l2, rng)
+        return classifier
+
+    def predict(self, text: str) -> Dict[str, Tuple[str, float]]:
+        """{'severity': (label, confidence), 'category': (label, confidence)}"""
+        features = extract_features(text)
+        return {head: model.predict(features) for head, model in self.heads.items()}
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': MODEL_VERSION,
+                'examples': self.examples,
+                'trained_at': time.time(),
+                'heads': {head: model.to_dict() for head, model in self.heads.items()},
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ErrorClassifier':
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"Unsupported classifier model version in {path}")
+        heads = {head: _LinearHead(model['classes'], model['weights'], model['bias'])
+                 for head, model in data['heads'].items()}
+        return cls(heads, data.get('examples', 0))
+
+
+class LabelStore:
+    """
+    Append-only JSONL file of LLM severity/category labels, the classifier's
+    training data. append() only buffers the label in memory, so analyses on
+    the event loop never wait on the disk; run() writes the buffer from a
+    background thread every flush_interval seconds.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 10000, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def append(self, text: str, severity: str, category: str):
+        """Queue one label for the next flush; no I/O happens here"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(json.dumps({'text': text, 'severity': severity, 'category': category,
+                                        'at': time.time()}))
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns how many labels were written"""
+        with self._lock:
+            records = [self._buffer.popleft() for _ in range(len(self._buffer))]
+            if not records:
+                return 0
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write('\n'.join(records) + '\n')
+            except OSError as e:
+                logger.warning(f"Could not store {len(records)} classifier labels: {e}")
+                self.dropped += len(records)
+                return 0
+        return len(records)
+
+    async def run(self):
+        """Background task: flush every flush_interval seconds"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Classifier label flush failed: {e}")
+
+    def load(self) -> List[Dict[str, str]]:
+        """All stored labels with a valid severity and category, including any still buffered"""
+        self.flush()
+        labels = []
+        if not os.path.exists(self.path):
+            return labels
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                severity = normalize_label('severity', record.get('severity'))
+                category = normalize_label('category', record.get('category'))
+                if record.get('text') and severity and category:
+                    labels.append({'text': record['text'], 'severity': severity, 'category': category})
+        return labels
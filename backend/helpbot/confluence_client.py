@@ -1,28 +1,252 @@
+import os
+import copy
+import random
 import requests
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Any
 import time
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .deadline import Deadline
+
 logger = logging.getLogger(__name__)
 
+# Upper bound for any single Confluence call when the caller has no deadline
+DEFAULT_TIMEOUT_SECONDS = 30
+# Responses worth retrying: throttling and gateway/server errors during a brownout
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Page ids per CQL "id in (...)" request when fetching bodies in bulk
+BATCH_SIZE = 25
+
+# What a search returns per page: bodies, so a cold page needs no second request, or versions only
+SEARCH_EXPAND_BODIES = 'body.storage,version'
+SEARCH_EXPAND_VERSIONS = 'version'
+
+
+class TransferStats:
+    """Requests made to Confluence and response bytes received; stale if cached data stood in"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.stale = False
+
+    def add(self, size: int):
+        self.requests += 1
+        self.bytes += size
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'requests': self.requests, 'bytes': self.bytes}
+
+
+_request_transfer: contextvars.ContextVar = contextvars.ContextVar('confluence_transfer', default=None)
+
+
+@contextmanager
+def count_transfer() -> Iterator[TransferStats]:
+    """Count the Confluence traffic of the current request (context), including work it hands to threads"""
+    transfer = TransferStats()
+    token = _request_transfer.set(transfer)
+    try:
+        yield transfer
+    finally:
+        _request_transfer.reset(token)
+
+
+def current_transfer() -> Optional[TransferStats]:
+    return _request_transfer.get()
+
+
+def mark_stale():
+    """Flag the current request as answered from last known good data"""
+    transfer = _request_transfer.get()
+    if transfer is not None:
+        transfer.stale = True
+
+
+class _LastKnownGood:
+    """Bounded LRU of the latest successful responses, served while Confluence is failing"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._entries.get(key)
+
+
 class ConfluenceClient:
-    def __init__(self, base_url: str, username: str, api_token: str, space_key: str):
+    """
+    Confluence REST client. Every GET has connect and read timeouts, is
+    retried with jittered exponential backoff on connection errors, timeouts
+    and 429/5xx responses, and goes through a circuit breaker. When a search
+    or page fetch fails, or the circuit is open, the last good response for
+    it is served and the current request is marked stale.
+    """
+
+    def __init__(self, base_url: str, username: str, api_token: str, space_key: str,
+                 retries: Optional[int] = None, backoff_seconds: Optional[float] = None,
+                 connect_timeout: Optional[float] = None, breaker: Optional[CircuitBreaker] = None,
+                 stale_cache_size: Optional[int] = None, space_keys: Optional[List[str]] = None):
         self.base_url = base_url.rstrip('/')
         self.username = username
         self.api_token = api_token
         self.space_key = space_key
+        # Spaces covered by searches and listings; space_key is the one used for space-level calls
+        self.space_keys = list(space_keys) if space_keys else [space_key]
         self.session = requests.Session()
         self.session.auth = (username, api_token)
         self.session.headers.update({
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
+        self.transfer = TransferStats()
+        self.retries = retries if retries is not None else int(os.getenv("CONFLUENCE_RETRIES", "2"))
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else float(
+            os.getenv("CONFLUENCE_BACKOFF_SECONDS", "0.2"))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(
+            os.getenv("CONFLUENCE_CONNECT_TIMEOUT_SECONDS", "3"))
+        self.breaker = breaker or CircuitBreaker(
+            'confluence',
+            failure_threshold=int(os.getenv("CONFLUENCE_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("CONFLUENCE_BREAKER_RESET_SECONDS", "30")),
+        )
+        stale_cache_size = stale_cache_size if stale_cache_size is not None else int(
+            os.getenv("CONFLUENCE_STALE_CACHE_SIZE", "256"))
+        self._good_searches = _LastKnownGood(stale_cache_size)
+        self._good_pages = _LastKnownGood(stale_cache_size)
+        self.retried = 0
+        self.stale_served = 0
+
+    def for_space(self, space_key: str) -> 'ConfluenceClient':
+        """
+        A client scoped to one space, sharing this client's connection pool,
+        circuit breaker, traffic counters and last known good pages.
+        """
+        client = copy.copy(self)
+        client.space_key = space_key
+        client.space_keys = [space_key]
+        client._good_searches = _LastKnownGood(self._good_searches.max_entries)
+        client.retried = 0
+        client.stale_served = 0
+        return client
+
+    def _space_cql(self) -> str:
+        quoted = [f'"{key}"' for key in self.space_keys]
+        if len(quoted) == 1:
+            return f'space = {quoted[0]}'
+        return f"space in ({', '.join(quoted)})"
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None,
+             timeout: float = DEFAULT_TIMEOUT_SECONDS, deadline: Optional[Deadline] = None) -> requests.Response:
+        """
+        GET a REST API path with retries behind the circuit breaker, counting
+        the response bytes for this client and the current request. Raises
+        CircuitOpenError without calling Confluence while the circuit is open;
+        otherwise returns the last response or raises the last error.
+        Retries stop early rather than outlive the request's deadline.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError('confluence', self.breaker.retry_in())
+        try:
+            response, error = self._get_with_retries(path, params, timeout, deadline)
+        except Exception:
+            # A local error (e.g. a spent deadline) says nothing about Confluence: end a
+            # half-open probe without counting it against the circuit
+            self.breaker.release()
+            raise
+        if error is None and response.status_code not in RETRY_STATUSES:
+            self.breaker.record_success()
+            return response
+        self.breaker.record_failure()
+        if error is not None:
+            raise error
+        return response
+
+    def _get_with_retries(self, path: str, params: Optional[Dict[str, Any]], timeout: float,
+                          deadline: Optional[Deadline]) -> Tuple[Optional[requests.Response], Optional[Exception]]:
+        """The last response, or the last transport error, after retrying transient failures"""
+        attempt = 0
+        while True:
+            if deadline is not None:
+                timeout = deadline.timeout(timeout)
+            response, error = None, None
+            try:
+                response = self.session.get(f"{self.base_url}{path}", params=params,
+                                            timeout=(min(self.connect_timeout, timeout), timeout))
+            except requests.exceptions.RequestException as e:
+                # Connection errors and timeouts, but also bodies cut off or undecodable mid-transfer
+                error = e
+            else:
+                size = len(response.content)
+                self.transfer.add(size)
+                request_transfer = _request_transfer.get()
+                if request_transfer is not None:
+                    request_transfer.add(size)
+                if response.status_code not in RETRY_STATUSES:
+                    return response, None
+
+            backoff = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+            if attempt >= self.retries or (deadline is not None and not deadline.has_budget(backoff + 0.05)):
+                return response, error
+            attempt += 1
+            self.retried += 1
+            logger.warning(f"Retrying {path} in {backoff:.2f}s (attempt {attempt + 1}): "
+                           f"{error or response.status_code}")
+            time.sleep(backoff)
+
+    def _serve_stale(self, cache: _LastKnownGood, key: Hashable, what: str) -> Optional[Any]:
+        value = cache.get(key)
+        if value is not None:
+            self.stale_served += 1
+            mark_stale()
+            logger.warning(f"Serving last known good {what} while Confluence is failing")
+        return value
+
+    @staticmethod
+    def page_body(page: Dict[str, Any]) -> Optional[str]:
+        """The storage-format body already included in a search or content payload, if it was expanded"""
+        storage = page.get('body', {}).get('storage')
+        return storage.get('value') if storage else None
+
+    @staticmethod
+    def page_space_key(page: Dict[str, Any]) -> Optional[str]:
+        """The space of a page, expanded or from the link Confluence includes when it isn't"""
+        space = page.get('space') or {}
+        if space.get('key'):
+            return space['key']
+        link = page.get('_expandable', {}).get('space')
+        return link.rstrip('/').rsplit('/', 1)[-1] if link else None
+
+    def transfer_stats(self) -> Dict[str, int]:
+        return self.transfer.as_dict()
+
+    def stats(self) -> Dict[str, Any]:
+        """Traffic, retries, stale responses served and the circuit breaker state"""
+        return dict(self.transfer.as_dict(), retried=self.retried, stale_served=self.stale_served,
+                    breaker=self.breaker.stats())
         
     def test_connection(self) -> Dict[str, Any]:
         """Test connection to Confluence and return detailed status"""
         try:
             # Test basic connectivity
-            response = self.session.get(f"{self.base_url}/rest/api/space/{self.space_key}")
+            response = self._get(f"/rest/api/space/{self.space_key}")
             
             if response.status_code == 200:
                 space_info = response.json()
@@ -65,50 +289,130 @@ class ConfluenceClient:
                 "error_type": "unknown"
             }
     
-    def search_pages(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search for pages in the Confluence space"""
+    def _timeout(self, deadline: Optional[Deadline], stage: str) -> Optional[float]:
+        """Per-call timeout from the request deadline; None means the budget is already spent"""
+        if deadline is None:
+            return DEFAULT_TIMEOUT_SECONDS
+        if deadline.expired():
+            deadline.skip(stage)
+            return None
+        return deadline.timeout(DEFAULT_TIMEOUT_SECONDS)
+
+    def search_pages(self, query: str, limit: int = 10, deadline: Optional[Deadline] = None,
+                     expand: str = SEARCH_EXPAND_BODIES) -> List[Dict[str, Any]]:
+        """Search for pages in the Confluence spaces; expand=SEARCH_EXPAND_VERSIONS leaves out the bodies"""
+        timeout = self._timeout(deadline, 'search')
+        if timeout is None:
+            return []
         try:
+            # Escape the user's text so it can't break out of the CQL string literal
+            escaped_query = query.replace('\\', '\\\\').replace('"', '\\"')
             params = {
-                'cql': f'space = "{self.space_key}" AND text ~ "{query}"',
+                'cql': f'{self._space_cql()} AND text ~ "{escaped_query}"',
                 'limit': limit,
-                'expand': 'body.storage,version'
+                'expand': expand
             }
             
-            response = self.session.get(
-                f"{self.base_url}/rest/api/content/search",
-                params=params
-            )
+            response = self._get("/rest/api/content/search", params, timeout, deadline)
             
             if response.status_code == 200:
-                data = response.json()
-                return data.get('results', [])
+                results = response.json().get('results', [])
+                # One entry per search whatever the expand, so an outage under either expand finds it
+                self._good_searches.put((query, limit), results)
+                return results
             else:
                 logger.error(f"Search failed: {response.status_code} - {response.text}")
-                return []
                 
+        except requests.exceptions.Timeout:
+            logger.error(f"Search timed out after {timeout:.2f}s")
+            if deadline:
+                deadline.skip('search')
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
-            return []
+        return self._serve_stale(self._good_searches, (query, limit), 'search results') or []
     
-    def get_page_content(self, page_id: str) -> Optional[str]:
+    def get_page_content(self, page_id: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Get the full content of a specific page"""
+        timeout = self._timeout(deadline, 'page_fetch')
+        if timeout is None:
+            return None
         try:
-            response = self.session.get(
-                f"{self.base_url}/rest/api/content/{page_id}",
-                params={'expand': 'body.storage'}
-            )
+            response = self._get(f"/rest/api/content/{page_id}", {'expand': 'body.storage'}, timeout, deadline)
             
             if response.status_code == 200:
                 data = response.json()
-                return data.get('body', {}).get('storage', {}).get('value', '')
+                body = data.get('body', {}).get('storage', {}).get('value', '')
+                self._good_pages.put(page_id, body)
+                return body
             else:
                 logger.error(f"Failed to get page {page_id}: {response.status_code}")
-                return None
                 
+        except requests.exceptions.Timeout:
+            logger.error(f"Fetching page {page_id} timed out after {timeout:.2f}s")
+            if deadline:
+                deadline.skip('page_fetch')
         except Exception as e:
             logger.error(f"Error getting page content: {str(e)}")
-            return None
+        return self._serve_stale(self._good_pages, page_id, f"page {page_id}")
     
+    def get_page(self, page_id: str, expand: str = 'body.storage,version') -> Optional[Dict[str, Any]]:
+        """Get a page with its title, version and body; None if it is gone or unreadable"""
+        try:
+            response = self._get(f"/rest/api/content/{page_id}", {'expand': expand})
+            if response.status_code == 200:
+                return response.json()
+            logger.error(f"Failed to get page {page_id}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting page {page_id}: {str(e)}")
+            return None
+
+    def list_pages(self, expand: str = 'version', page_size: int = 50) -> List[Dict[str, Any]]:
+        """List every current page in the spaces, paging through the CQL search API"""
+        pages = []
+        start = 0
+        while True:
+            params = {
+                'cql': f'{self._space_cql()} AND type = page',
+                'limit': page_size,
+                'start': start,
+                'expand': expand
+            }
+            response = self._get("/rest/api/content/search", params)
+            if response.status_code != 200:
+                raise RuntimeError(f"Listing pages failed: {response.status_code} - {response.text}")
+
+            results = response.json().get('results', [])
+            pages.extend(results)
+            if len(results) < page_size:
+                return pages
+            start += len(results)
+
+    def get_pages(self, page_ids: Iterable[str], expand: str = 'body.storage,version',
+                  batch_size: int = BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch many pages with one CQL "id in (...)" search per batch_size ids
+        instead of one request per page. Returns the pages found by id; pages
+        that are gone or unreadable are simply missing.
+        """
+        ids = []
+        for page_id in page_ids:
+            page_id = str(page_id)
+            if page_id.isdigit():
+                ids.append(page_id)
+            else:
+                logger.warning(f"Skipping invalid page id {page_id!r}")
+        pages = {}
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            params = {'cql': f"id in ({','.join(batch)})", 'limit': len(batch), 'expand': expand}
+            response = self._get("/rest/api/content/search", params)
+            if response.status_code != 200:
+                raise RuntimeError(f"Fetching pages failed: {response.status_code} - {response.text}")
+            for page in response.json().get('results', []):
+                pages[str(page['id'])] = page
+        return pages
+
     def get_overview_page(self) -> Optional[Dict[str, Any]]:
         """Get the main overview/index page for the space"""
         try:
@@ -136,7 +440,7 @@ class ConfluenceClient:
                         }
             
             # If no specific overview found, get the space homepage
-            response = self.session.get(f"{self.base_url}/rest/api/space/{self.space_key}")
+            response = self._get(f"/rest/api/space/{self.space_key}")
             if response.status_code == 200:
                 space_data = response.json()
                 homepage_id = space_data.get('homepage', {}).get('id')
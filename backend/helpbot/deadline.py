@@ -0,0 +1,49 @@
+import time
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage cannot finish within the request's remaining budget"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Time budget for one request. Each pipeline stage asks for the remaining
+    budget as its timeout, and stages that are skipped for lack of time are
+    recorded so the response can say what was left out.
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds
+        self.skipped_stages: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def has_budget(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """The remaining budget, optionally capped by a stage's own limit"""
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+    def skip(self, stage: str):
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+            logger.info(f"Skipping {stage}: {self.remaining() * 1000:.0f} ms of {self.budget_seconds:.1f}s budget left")
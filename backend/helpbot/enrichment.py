@@ -0,0 +1,60 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict
+
+from .knowledge_base import KnowledgeBase
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+
+async def _enrich_entry(entry: ErrorEntry, ollama_service) -> Dict[str, Any]:
+    """Severity, category and related queries for one entry, phrased as if its title were the query"""
+    analysis = await ollama_service.aenhance_error_analysis(entry.error_code, entry.to_dict())
+    if not analysis.get('enhanced'):
+        raise RuntimeError("AI analysis unavailable")
+    suggestions = await ollama_service.asuggest_related_queries(entry.error_code, analysis['category'])
+    return {
+        'severity': analysis['severity'],
+        'category': analysis['category'],
+        'suggestions': suggestions,
+        'provider': analysis.get('ai_provider'),
+        'created_at': int(time.time()),
+    }
+
+
+async def enrich_knowledge_base(knowledge_base: KnowledgeBase, ollama_service,
+                                concurrency: int = 2) -> Dict[str, int]:
+    """
+    Precompute the entry-level AI stages for every entry version that has no
+    enrichment yet, at most `concurrency` entries at a time so a shared Ollama
+    isn't flooded. Unchanged entries keep their enrichment; entries that fail
+    are retried on the next run. Enrichments of removed entries are dropped.
+    """
+    stats = {'enriched': 0, 'reused': 0, 'failed': 0}
+    pending: Dict[str, ErrorEntry] = {}
+    current = {}
+    for entry in knowledge_base.entries:
+        key = entry.version_key()
+        if key in knowledge_base.enrichments:
+            current[key] = knowledge_base.enrichments[key]
+            stats['reused'] += 1
+        else:
+            pending.setdefault(key, entry)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def enrich(key: str, entry: ErrorEntry):
+        async with semaphore:
+            try:
+                current[key] = await _enrich_entry(entry, ollama_service)
+                stats['enriched'] += 1
+            except Exception as e:
+                logger.warning(f"Could not enrich entry {entry.id}: {e}")
+                stats['failed'] += 1
+
+    await asyncio.gather(*(enrich(key, entry) for key, entry in pending.items()))
+    knowledge_base.enrichments = current
+    logger.info(f"Enrichment finished: {stats}")
+    return stats
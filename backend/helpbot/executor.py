@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .deadline import Deadline, DeadlineExceeded
+from .html_extractor import HTMLExtractor
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+# One extractor per process; it is stateless apart from the compiled module-level patterns
+_extractor = HTMLExtractor()
+
+
+# --- Picklable task functions (run in either pool) ---
+
+def extract_entries(html_content: str) -> List[ErrorEntry]:
+    return _extractor.extract_error_entries(html_content)
+
+
+def match_entries(user_query: str, entries: List[ErrorEntry]) -> Optional[ErrorEntry]:
+    return _extractor.find_best_match(user_query, entries)
+
+
+def rank_entries(user_query: str, entries: List[ErrorEntry], k: int,
+                 after: Optional[Tuple[float, str, str]] = None) -> List[Tuple[float, ErrorEntry]]:
+    return _extractor.top_matches(user_query, entries, k, after)
+
+
+def find_solution(user_query: str, html_content: str) -> Dict[str, str]:
+    return _extractor.find_best_solution(user_query, html_content)
+
+
+# Only these parse whole pages. Matching and ranking scan entries the caller already holds;
+# shipping those to another process would pickle the whole candidate set on every query.
+PROCESS_TASKS = (extract_entries, find_solution)
+
+
+def _timed_call(func: Callable, args: tuple, submitted_at: float):
+    """Run func and report when it actually started, so the caller can derive queue wait"""
+    started_at = time.time()
+    return func(*args), started_at
+
+
+class _PoolStats:
+    def __init__(self):
+        self.tasks = 0
+        self.in_flight = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'tasks': self.tasks,
+            'in_flight': self.in_flight,
+            'timeouts': self.timeouts,
+            'avg_queue_wait_ms': round(self.total_wait / self.tasks * 1000, 2) if self.tasks else 0.0,
+            'max_queue_wait_ms': round(self.max_wait * 1000, 2),
+            'avg_run_ms': round(self.total_run / self.tasks * 1000, 2) if self.tasks else 0.0,
+        }
+
+
+class ExtractionExecutor:
+    """
+    Runs CPU-bound HTML parsing, extraction and matching off the event loop.
+
+    Page tasks (PROCESS_TASKS) at or above process_threshold bytes go to a
+    process pool so a huge page can't hold the GIL against every other
+    request; everything else goes to a thread pool, where the hand-off is
+    cheaper than pickling. The process pool also serves background
+    knowledge base refreshes (process_pool()).
+    """
+
+    def __init__(self, process_workers: Optional[int] = None, thread_workers: Optional[int] = None,
+                 process_threshold: Optional[int] = None, slow_wait_seconds: float = 0.5):
+        self.process_workers = process_workers if process_workers is not None else int(
+            os.getenv("EXTRACTION_PROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+        self.thread_workers = thread_workers if thread_workers is not None else int(
+            os.getenv("EXTRACTION_THREAD_WORKERS", 4))
+        self.process_threshold = process_threshold if process_threshold is not None else int(
+            os.getenv("EXTRACTION_PROCESS_THRESHOLD_BYTES", 256 * 1024))
+        self.slow_wait_seconds = slow_wait_seconds
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._stats = {'thread': _PoolStats(), 'process': _PoolStats()}
+        # in_flight is released from pool threads when a task finishes
+        self._lock = threading.Lock()
+
+    def process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """The process pool, created on first use so forked workers each get their own; None if disabled"""
+        if self.process_workers <= 0:
+            return None
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers,
+                                                   thread_name_prefix="extraction")
+        return self._thread_pool
+
+    async def run(self, size: int, func: Callable, *args, deadline: Optional[Deadline] = None) -> Any:
+        """
+        Run func(*args), a page task over a payload of `size` bytes, in the
+        process pool if the payload is large enough and in the thread pool
+        otherwise. Any other func always runs in the thread pool.
+        """
+        if func in PROCESS_TASKS and size >= self.process_threshold:
+            pool = self.process_pool()
+            if pool is not None:
+                return await self._submit('process', pool, func, args, deadline)
+        return await self._submit('thread', self._get_thread_pool(), func, args, deadline)
+
+    async def run_in_thread(self, func: Callable, *args, deadline: Optional[Deadline] = None) -> Any:
+        """Run func(*args) in the thread pool, e.g. matching or ranking entries already in memory"""
+        return await self._submit('thread', self._get_thread_pool(), func, args, deadline)
+
+    def _release(self, stats: _PoolStats):
+        with self._lock:
+            stats.in_flight -= 1
+
+    async def _submit(self, kind: str, pool, func: Callable, args: tuple, deadline: Optional[Deadline]) -> Any:
+        """
+        With a deadline, raises DeadlineExceeded once the remaining budget is
+        used up. A task still queued is then cancelled; one already running
+        can't be interrupted and finishes in the background, and it counts as
+        in flight until it does.
+        """
+        if deadline and deadline.expired():
+            raise DeadlineExceeded(func.__name__)
+        stats = self._stats[kind]
+        with self._lock:
+            stats.in_flight += 1
+        submitted_at = time.time()
+        task = pool.submit(_timed_call, func, args, submitted_at)
+        task.add_done_callback(lambda _: self._release(stats))
+        # Cancelling the wrapper (timeout, or a caller's own wait_for) cancels a queued task
+        future = asyncio.wrap_future(task)
+        try:
+            if deadline:
+                result, started_at = await asyncio.wait_for(future, timeout=deadline.remaining())
+            else:
+                result, started_at = await future
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise DeadlineExceeded(func.__name__)
+
+        wait = max(0.0, started_at - submitted_at)
+        stats.tasks += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.total_run += time.time() - started_at
+        if wait > self.slow_wait_seconds:
+            logger.warning(f"{func.__name__} waited {wait * 1000:.0f} ms in the {kind} pool queue")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'process_workers': self.process_workers,
+            'thread_workers': self.thread_workers,
+            'process_threshold_bytes': self.process_threshold,
+            'pools': {kind: stats.as_dict() for kind, stats in self._stats.items()},
+        }
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
@@ -1,13 +1,68 @@
 import re
+import heapq
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 from bs4 import BeautifulSoup
 
+from .models import ErrorEntry
+from .tracing import trace_stage
+
 logger = logging.getLogger(__name__)
 
+# Structured entry formats, tried in order by extract_error_entries
+DIRECT_LOG_PATTERN = re.compile(
+    r"Error Log\s*(\d+):\s*(.*?)\s*Issue:\s*(.*?)\s*Solutions?:\s*(.*?)(?=Error Log\s*\d+:|\Z)",
+    re.DOTALL | re.IGNORECASE
+)
+HASH_LOG_PATTERN = re.compile(
+    r"Error Log\s*#(\d+):\s*(.*?)\s*Issue:\s*(.*?)\s*Resolution:\s*(.*?)(?=(?:\s*Error Log\s*#\d+|$))",
+    re.DOTALL | re.IGNORECASE
+)
+TIMESTAMP_LOG_PATTERN = re.compile(
+    r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z\s+ERROR\s+.*?)\s+Explanation:\s+(.*?)\s+Solution:\s+(.*?)(?=(?:\s*\d{4}-\d{2}-\d{2}T|$))",
+    re.DOTALL | re.IGNORECASE
+)
+
+ERROR_LOG_ID_PATTERN = re.compile(r'error log\s*#?(\d+)')
+WORD_PATTERN = re.compile(r'\b\w{3,}\b')
+# Score of an entry whose id the query names explicitly ("error log 12"); ranks above any keyword match
+EXACT_ID_SCORE = 1000.0
+
+# Common words ignored when matching queries against entries
+STOP_WORDS = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'this', 'that', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'cant', 'im', 'having', 'getting', 'error', 'log'}
+
+# Define error type keywords for better categorization
+ERROR_TYPES = {
+    'connection': ['connection', 'connect', 'timeout', 'network', 'socket', 'unreachable', 'refused', 'disconnected'],
+    'authentication': ['auth', 'login', 'password', 'credential', 'unauthorized', 'forbidden', 'access', 'permission'],
+    'database': ['database', 'sql', 'query', 'table', 'connection', 'db', 'mysql', 'postgres', 'oracle'],
+    'file': ['file', 'directory', 'path', 'folder', 'missing', 'not found', 'permission', 'read', 'write'],
+    'server': ['server', 'internal', '500', 'service', 'unavailable', 'down', 'maintenance'],
+    'validation': ['validation', 'invalid', 'format', 'required', 'missing', 'empty', 'null'],
+    'api': ['api', 'endpoint', 'request', 'response', 'json', 'xml', 'rest', 'soap'],
+    'configuration': ['config', 'configuration', 'setting', 'property', 'parameter', 'variable']
+}
+
+# Fuzzy matching for common error patterns: (query pattern, entry pattern, boost)
+FUZZY_PATTERNS = [
+    (re.compile(query_pattern), re.compile(entry_pattern), boost)
+    for query_pattern, entry_pattern, boost in [
+        (r'timeout|time.*out', r'timeout|time.*out', 3),
+        (r'connection.*failed|failed.*connection', r'connection.*failed|failed.*connection', 3),
+        (r'not.*found|missing|does.*not.*exist', r'not.*found|missing|does.*not.*exist', 3),
+        (r'unauthorized|access.*denied|permission.*denied', r'unauthorized|access.*denied|permission.*denied', 3),
+        (r'internal.*server.*error|500.*error', r'internal.*server.*error|500.*error', 3),
+        (r'invalid.*format|format.*invalid', r'invalid.*format|format.*invalid', 2),
+        (r'database.*error|sql.*error', r'database.*error|sql.*error', 3),
+        (r'network.*error|network.*issue', r'network.*error|network.*issue', 3)
+    ]
+]
+
 
 class HTMLExtractor:
+    # Timed where it runs; parsing in the extraction process pool is counted by that process, not /metrics
+    @trace_stage('clean_html')
     def clean_html(self, html_content: str) -> str:
         """Cleans HTML to a text string, preserving line breaks for structure."""
         if not html_content:
@@ -21,7 +76,7 @@ class HTMLExtractor:
             logger.error(f"Error cleaning HTML: {e}")
             return html_content
 
-    def extract_error_entries(self, content: str) -> List[Dict[str, str]]:
+    def extract_error_entries(self, content: str) -> List[ErrorEntry]:
         """
         The final multi-format engine. It tries different patterns to extract
         structured error entries from any known Confluence page format.
@@ -30,54 +85,42 @@ class HTMLExtractor:
         entries = []
 
         # --- Pattern 1: Direct Error Log format (from actual content) ---
-        pattern1 = re.compile(
-            r"Error Log\s*(\d+):\s*(.*?)\s*Issue:\s*(.*?)\s*Solutions?:\s*(.*?)(?=Error Log\s*\d+:|\Z)",
-            re.DOTALL | re.IGNORECASE
-        )
-        for match in pattern1.finditer(clean_content):
+        for match in DIRECT_LOG_PATTERN.finditer(clean_content):
             log_num, title, issue, solution_block = match.groups()
             # Clean up the solution block by removing extra whitespace and joining lines
             solutions = ' '.join([line.strip() for line in solution_block.split('\n') if line.strip()])
-            entries.append({
-                'id': log_num.strip(),
-                'error_code': f"Error Log {log_num.strip()}: {title.strip()}",
-                'explanation': issue.strip(),
-                'resolution': solutions.strip(),
-            })
+            entries.append(ErrorEntry(
+                id=log_num.strip(),
+                error_code=f"Error Log {log_num.strip()}: {title.strip()}",
+                explanation=issue.strip(),
+                resolution=solutions.strip(),
+            ))
         if entries:
             logger.info(f"SUCCESS: Extractor found {len(entries)} entries using 'Direct Error Log' format.")
             return entries
 
         # --- Pattern 2: "Error Log #..." ---
-        pattern2 = re.compile(
-            r"Error Log\s*#(\d+):\s*(.*?)\s*Issue:\s*(.*?)\s*Resolution:\s*(.*?)(?=(?:\s*Error Log\s*#\d+|$))",
-            re.DOTALL | re.IGNORECASE
-        )
-        for match in pattern2.finditer(clean_content):
+        for match in HASH_LOG_PATTERN.finditer(clean_content):
             log_num, title, issue, resolution = match.groups()
-            entries.append({
-                'id': log_num.strip(),
-                'error_code': f"Error Log #{log_num.strip()}: {title.strip()}",
-                'explanation': issue.strip(),
-                'resolution': resolution.strip(),
-            })
+            entries.append(ErrorEntry(
+                id=log_num.strip(),
+                error_code=f"Error Log #{log_num.strip()}: {title.strip()}",
+                explanation=issue.strip(),
+                resolution=resolution.strip(),
+            ))
         if entries:
             logger.info(f"SUCCESS: Extractor found {len(entries)} entries using 'Error Log #' format.")
             return entries
 
         # --- Pattern 3: "Timestamp ERROR..." ---
-        pattern3 = re.compile(
-            r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z\s+ERROR\s+.*?)\s+Explanation:\s+(.*?)\s+Solution:\s+(.*?)(?=(?:\s*\d{4}-\d{2}-\d{2}T|$))",
-            re.DOTALL | re.IGNORECASE
-        )
-        for match in pattern3.finditer(clean_content):
+        for match in TIMESTAMP_LOG_PATTERN.finditer(clean_content):
             error_line, explanation, solution = match.groups()
-            entries.append({
-                'id': error_line.split(' ')[0],
-                'error_code': error_line.strip(),
-                'explanation': explanation.strip(),
-                'resolution': solution.strip(),
-            })
+            entries.append(ErrorEntry(
+                id=error_line.split(' ')[0],
+                error_code=error_line.strip(),
+                explanation=explanation.strip(),
+                resolution=solution.strip(),
+            ))
         if entries:
             logger.info(f"SUCCESS: Extractor found {len(entries)} entries using 'Timestamp ERROR' format.")
             return entries
@@ -85,7 +128,66 @@ class HTMLExtractor:
         logger.error("FAILURE: Could not detect any known structured error log formats in the content.")
         return []
 
-    def find_best_match(self, user_query: str, entries: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    @staticmethod
+    def query_features(user_query: str) -> Tuple[str, Set[str], Set[str]]:
+        """The query's lower-cased text, meaningful words and error types, computed once per query"""
+        user_query_lower = user_query.lower().strip()
+        # Extract meaningful words from user query (filter out common words)
+        query_words = set(word for word in WORD_PATTERN.findall(user_query_lower) if word not in STOP_WORDS)
+        query_error_types = {
+            error_type for error_type, keywords in ERROR_TYPES.items()
+            if any(keyword in user_query_lower for keyword in keywords)
+        }
+        return user_query_lower, query_words, query_error_types
+
+    def score_entry(self, features: Tuple[str, Set[str], Set[str]], entry: ErrorEntry) -> float:
+        """Semantic/keyword relevance of one entry to a query (see query_features)"""
+        user_query_lower, query_words, query_error_types = features
+        score = 0
+        title = entry.error_code.lower()
+        explanation = entry.explanation.lower()
+        resolution = entry.resolution.lower()
+        
+        # Extract words from entry content
+        title_words = set(WORD_PATTERN.findall(title))
+        explanation_words = set(WORD_PATTERN.findall(explanation))
+        resolution_words = set(WORD_PATTERN.findall(resolution))
+        
+        # Basic keyword matching (weighted by importance)
+        score += len(query_words.intersection(title_words)) * 5  # Title matches are most important
+        score += len(query_words.intersection(explanation_words)) * 3  # Explanation matches are important
+        score += len(query_words.intersection(resolution_words)) * 1  # Resolution matches are helpful
+        
+        # Error type matching - boost score if query and entry are same error type
+        entry_error_types = set()
+        for error_type, keywords in ERROR_TYPES.items():
+            if any(keyword in title or keyword in explanation for keyword in keywords):
+                entry_error_types.add(error_type)
+        
+        # Boost score for matching error types
+        common_types = query_error_types.intersection(entry_error_types)
+        score += len(common_types) * 4
+        
+        # Fuzzy matching for common error patterns
+        for query_pattern, entry_pattern, boost in FUZZY_PATTERNS:
+            if query_pattern.search(user_query_lower) and entry_pattern.search(title + ' ' + explanation):
+                score += boost
+        
+        # Partial word matching for technical terms
+        for query_word in query_words:
+            if len(query_word) > 4:  # Only for longer words
+                for entry_word in title_words.union(explanation_words):
+                    if len(entry_word) > 4:
+                        # Check if words share significant portion
+                        if query_word in entry_word or entry_word in query_word:
+                            score += 1
+                        # Check for similar technical terms (e.g., "conn" matches "connection")
+                        elif len(query_word) >= 4 and len(entry_word) >= 4:
+                            if query_word[:4] == entry_word[:4]:
+                                score += 0.5
+        return score
+
+    def find_best_match(self, user_query: str, entries: List[ErrorEntry]) -> Optional[ErrorEntry]:
         """Finds the best matching error entry based on semantic similarity, keywords, and exact ID."""
         if not entries:
             return None
@@ -93,107 +195,59 @@ class HTMLExtractor:
         user_query_lower = user_query.lower().strip()
 
         # First, check for exact "Error Log #<number>" matches
-        exact_match = re.search(r'error log\s*#?(\d+)', user_query_lower)
+        exact_match = ERROR_LOG_ID_PATTERN.search(user_query_lower)
         if exact_match:
             query_log_num = exact_match.group(1)
             for entry in entries:
-                if entry.get('id') == query_log_num:
+                if entry.id == query_log_num:
                     logger.info(f"Found direct match for log #{query_log_num}")
                     return entry
 
         # Enhanced semantic matching for error descriptions
         best_match = None
         highest_score = 0
-        
-        # Extract meaningful words from user query (filter out common words)
-        stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'this', 'that', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'cant', 'im', 'having', 'getting', 'error', 'log'}
-        query_words = set(word for word in re.findall(r'\b\w{3,}\b', user_query_lower) if word not in stop_words)
-        
-        # Define error type keywords for better categorization
-        error_types = {
-            'connection': ['connection', 'connect', 'timeout', 'network', 'socket', 'unreachable', 'refused', 'disconnected'],
-            'authentication': ['auth', 'login', 'password', 'credential', 'unauthorized', 'forbidden', 'access', 'permission'],
-            'database': ['database', 'sql', 'query', 'table', 'connection', 'db', 'mysql', 'postgres', 'oracle'],
-            'file': ['file', 'directory', 'path', 'folder', 'missing', 'not found', 'permission', 'read', 'write'],
-            'server': ['server', 'internal', '500', 'service', 'unavailable', 'down', 'maintenance'],
-            'validation': ['validation', 'invalid', 'format', 'required', 'missing', 'empty', 'null'],
-            'api': ['api', 'endpoint', 'request', 'response', 'json', 'xml', 'rest', 'soap'],
-            'configuration': ['config', 'configuration', 'setting', 'property', 'parameter', 'variable']
-        }
+        features = self.query_features(user_query)
 
-        logger.info(f"Searching for semantic matches with query words: {query_words}")
+        logger.info(f"Searching for semantic matches with query words: {features[1]}")
 
         for entry in entries:
-            score = 0
-            title = entry.get('error_code', '').lower()
-            explanation = entry.get('explanation', '').lower()
-            resolution = entry.get('resolution', '').lower()
-            
-            # Extract words from entry content
-            title_words = set(re.findall(r'\b\w{3,}\b', title))
-            explanation_words = set(re.findall(r'\b\w{3,}\b', explanation))
-            resolution_words = set(re.findall(r'\b\w{3,}\b', resolution))
-            
-            # Basic keyword matching (weighted by importance)
-            score += len(query_words.intersection(title_words)) * 5  # Title matches are most important
-            score += len(query_words.intersection(explanation_words)) * 3  # Explanation matches are important
-            score += len(query_words.intersection(resolution_words)) * 1  # Resolution matches are helpful
-            
-            # Error type matching - boost score if query and entry are same error type
-            query_error_types = set()
-            entry_error_types = set()
-            
-            for error_type, keywords in error_types.items():
-                if any(keyword in user_query_lower for keyword in keywords):
-                    query_error_types.add(error_type)
-                if any(keyword in title or keyword in explanation for keyword in keywords):
-                    entry_error_types.add(error_type)
-            
-            # Boost score for matching error types
-            common_types = query_error_types.intersection(entry_error_types)
-            score += len(common_types) * 4
-            
-            # Fuzzy matching for common error patterns
-            fuzzy_patterns = [
-                (r'timeout|time.*out', r'timeout|time.*out', 3),
-                (r'connection.*failed|failed.*connection', r'connection.*failed|failed.*connection', 3),
-                (r'not.*found|missing|does.*not.*exist', r'not.*found|missing|does.*not.*exist', 3),
-                (r'unauthorized|access.*denied|permission.*denied', r'unauthorized|access.*denied|permission.*denied', 3),
-                (r'internal.*server.*error|500.*error', r'internal.*server.*error|500.*error', 3),
-                (r'invalid.*format|format.*invalid', r'invalid.*format|format.*invalid', 2),
-                (r'database.*error|sql.*error', r'database.*error|sql.*error', 3),
-                (r'network.*error|network.*issue', r'network.*error|network.*issue', 3)
-            ]
-            
-            for query_pattern, entry_pattern, boost in fuzzy_patterns:
-                if re.search(query_pattern, user_query_lower) and re.search(entry_pattern, title + ' ' + explanation):
-                    score += boost
-            
-            # Partial word matching for technical terms
-            for query_word in query_words:
-                if len(query_word) > 4:  # Only for longer words
-                    for entry_word in title_words.union(explanation_words):
-                        if len(entry_word) > 4:
-                            # Check if words share significant portion
-                            if query_word in entry_word or entry_word in query_word:
-                                score += 1
-                            # Check for similar technical terms (e.g., "conn" matches "connection")
-                            elif len(query_word) >= 4 and len(entry_word) >= 4:
-                                if query_word[:4] == entry_word[:4]:
-                                    score += 0.5
-
+            score = self.score_entry(features, entry)
             if score > highest_score:
                 highest_score = score
                 best_match = entry
 
         if highest_score > 0:
-            logger.info(f"Found best semantic match with score {highest_score}: {best_match.get('error_code')}")
-            logger.info(f"Match details - Title: {best_match.get('error_code')[:100]}...")
+            logger.info(f"Found best semantic match with score {highest_score}: {best_match.error_code}")
+            logger.info(f"Match details - Title: {best_match.error_code[:100]}...")
             return best_match
         
         logger.warning("No semantic match found, returning first entry as fallback.")
         return entries[0] if entries else None
 
+    def top_matches(self, user_query: str, entries: List[ErrorEntry], k: int,
+                    after: Optional[Tuple[float, str, str]] = None) -> List[Tuple[float, ErrorEntry]]:
+        """
+        The k highest-scoring entries with a positive score, best first, as
+        (score, entry). Ranking is by score, then page id and entry id, so it is
+        total; `after` is the (score, page_id, id) of the last result of the
+        previous page. Uses a bounded heap instead of sorting every entry.
+        """
+        features = self.query_features(user_query)
+        exact_match = ERROR_LOG_ID_PATTERN.search(features[0])
+        exact_id = exact_match.group(1) if exact_match else None
+
+        def ranked():
+            for entry in entries:
+                score = EXACT_ID_SCORE if entry.id == exact_id else self.score_entry(features, entry)
+                if score <= 0:
+                    continue
+                key = (-score, entry.page_id, entry.id)
+                if after is not None and key <= (-after[0], after[1], after[2]):
+                    continue
+                yield key, entry
+
+        return [(-key[0], entry) for key, entry in heapq.nsmallest(k, ranked(), key=lambda item: item[0])]
+
     def _clean_html_and_get_blocks(self, html_content: str) -> List[str]:
         """Cleans HTML and splits it into logical text blocks."""
         text = self.clean_html(html_content)
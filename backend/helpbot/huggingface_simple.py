@@ -12,6 +12,8 @@ class SimpleHuggingFaceService:
         self.api_token = api_token or os.getenv("HUGGINGFACE_API_TOKEN") or os.getenv("HF_TOKEN")
         self.base_url = "https://api-inference.huggingface.co/models"
         self.available = bool(self.api_token)
+        # Reuse connections across calls instead of a new TCP+TLS handshake per query
+        self.session = requests.Session()
         
         # Use simpler models that work well with API
         self.text_model = "google/flan-t5-small"  # Faster, smaller model
@@ -35,7 +37,7 @@ class SimpleHuggingFaceService:
             logger.warning(f"Hugging Face API test failed: {e}")
             return False
     
-    def query(self, prompt: str, max_length: int = 100, use_chat_model: bool = False) -> str:
+    def query(self, prompt: str, max_length: int = 100, use_chat_model: bool = False, timeout: float = 30) -> str:
         """Send query to Hugging Face API"""
         if not self.available:
             return ""
@@ -63,7 +65,7 @@ class SimpleHuggingFaceService:
                 }
             }
             
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(api_url, headers=headers, json=payload, timeout=timeout)
             
             if response.status_code == 200:
                 result = response.json()
@@ -0,0 +1,239 @@
+import re
+import sys
+import zlib
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .html_extractor import HTMLExtractor
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+TERM_PATTERN = re.compile(r'\b\w{3,}\b')
+
+
+def index_terms(text: str) -> set:
+    """Return the set of searchable terms in a piece of text"""
+    return set(TERM_PATTERN.findall(text.lower()))
+
+
+def entry_terms(entry: ErrorEntry) -> set:
+    """Return the terms an entry is indexed under"""
+    return index_terms(f"{entry.error_code} {entry.explanation}")
+
+
+class KnowledgeBase:
+    """
+    In-memory copy of the extracted Confluence knowledge base.
+
+    Holds the structured error entries of every crawled page together with
+    the page versions they were extracted from, an error id index and term
+    postings, so queries can be answered without a round trip to Confluence.
+
+    The flat entry list, id index and postings are replaced together in one
+    assignment, so readers on other threads never see them out of step.
+    Entries are ordered by page id, which keeps each page's entries in one
+    contiguous run that a single page update can splice.
+    """
+
+    def __init__(self, extractor: Optional[HTMLExtractor] = None):
+        self.extractor = extractor or HTMLExtractor()
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.page_entries: Dict[str, List[ErrorEntry]] = {}
+        self._index: Tuple[List[ErrorEntry], Dict[str, int], Dict[str, List[int]]] = ([], {}, {})
+        # Writers build the next index from the current one; only one may do so at a time
+        self._index_lock = threading.Lock()
+        # Severity, category and suggestions precomputed per entry version (see enrichment.py)
+        self.enrichments: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def entries(self) -> List[ErrorEntry]:
+        return self._index[0]
+
+    @property
+    def id_index(self) -> Dict[str, int]:
+        return self._index[1]
+
+    @property
+    def postings(self) -> Dict[str, List[int]]:
+        return self._index[2]
+
+    def set_index(self, entries: List[ErrorEntry], id_index: Dict[str, int], postings: Dict[str, List[int]]):
+        """Replace the entry list, id index and postings at once, e.g. with ones read from a snapshot"""
+        self._index = (entries, id_index, postings)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_by_id(self, error_id: str) -> Optional[ErrorEntry]:
+        """Look up an entry by its error log id"""
+        entries, id_index, _ = self._index
+        position = id_index.get(error_id)
+        return entries[position] if position is not None else None
+
+    def get_enrichment(self, entry: ErrorEntry) -> Optional[Dict[str, Any]]:
+        """Precomputed enrichment for this version of the entry, if the index job produced one"""
+        return self.enrichments.get(entry.version_key())
+
+    def candidates(self, query: str) -> List[ErrorEntry]:
+        """Return the entries sharing at least one term with the query"""
+        entries, _, postings = self._index
+        positions = set()
+        for term in index_terms(query):
+            positions.update(postings.get(term, ()))
+        return [entries[position] for position in sorted(positions)]
+
+    def get_page_body(self, page_id: str) -> Optional[str]:
+        """Return the stored storage-format body of a page, if known"""
+        page = self.pages.get(page_id)
+        if not page or page.get('body') is None:
+            return None
+        return zlib.decompress(page['body']).decode('utf-8')
+
+    def update_page(self, page_id: str, title: str, version: int, body: str, reindex: bool = True,
+                    entries: Optional[List[ErrorEntry]] = None):
+        """
+        Store a page and its entries, extracting them unless they were already
+        extracted. With reindex, only this page's entries are re-indexed.
+        """
+        if entries is None:
+            entries = self.extractor.extract_error_entries(body) if body else []
+        page_id = sys.intern(page_id)
+        for entry in entries:
+            entry.page_id = page_id
+        # Bodies are kept compressed; they are only needed for the universal parser fallback
+        self.pages[page_id] = {
+            'title': title,
+            'version': version,
+            'body': zlib.compress(body.encode('utf-8')) if body is not None else None
+        }
+        self.page_entries[page_id] = entries
+        if reindex:
+            self._splice_page(page_id, entries)
+
+    def remove_page(self, page_id: str, reindex: bool = True):
+        """Drop a page and its entries"""
+        self.pages.pop(page_id, None)
+        self.page_entries.pop(page_id, None)
+        if reindex:
+            self._splice_page(page_id, [])
+
+    def reindex(self):
+        """Rebuild the flat entry list, id index and postings from the per-page entries"""
+        with self._index_lock:
+            entries = []
+            id_index = {}
+            postings: Dict[str, List[int]] = {}
+            for page_id, page_entries in sorted(self.page_entries.items()):
+                for entry in page_entries:
+                    position = len(entries)
+                    entries.append(entry)
+                    id_index.setdefault(entry.id, position)
+                    for term in entry_terms(entry):
+                        postings.setdefault(term, []).append(position)
+            self.set_index(entries, id_index, postings)
+
+    def _splice_page(self, page_id: str, page_entries: List[ErrorEntry]):
+        """
+        Replace one page's run of entries in the index. Only that page's old and
+        new entries are tokenised; the positions after the run shift only when
+        the page's entry count changed.
+        """
+        with self._index_lock:
+            entries, id_index, postings = self._index
+            start = bisect_left(entries, page_id, key=lambda entry: entry.page_id)
+            end = bisect_right(entries, page_id, lo=start, key=lambda entry: entry.page_id)
+            removed = entries[start:end]
+            shift = len(page_entries) - len(removed)
+            new_end = start + len(page_entries)
+
+            new_id_index = {}
+            for error_id, position in id_index.items():
+                if position < start:
+                    new_id_index[error_id] = position
+                elif position >= end:
+                    new_id_index[error_id] = position + shift
+            for position, entry in enumerate(page_entries, start):
+                if new_id_index.get(entry.id, position) >= position:
+                    new_id_index[entry.id] = position
+            new_entries = entries[:start] + page_entries + entries[end:]
+            # An id of the old run may also appear on a later page, which now comes first
+            missing = {entry.id for entry in removed} - new_id_index.keys()
+            for position in range(new_end, len(new_entries)) if missing else ():
+                error_id = new_entries[position].id
+                if error_id in missing:
+                    new_id_index[error_id] = position
+                    missing.discard(error_id)
+                    if not missing:
+                        break
+
+            added: Dict[str, List[int]] = {}
+            for position, entry in enumerate(page_entries, start):
+                for term in entry_terms(entry):
+                    added.setdefault(term, []).append(position)
+            touched = set(added).union(*(entry_terms(entry) for entry in removed))
+            new_postings = dict(postings)
+            for term, positions in postings.items():
+                if term in touched or (shift and positions[-1] >= end):
+                    head = bisect_left(positions, start)
+                    tail = bisect_left(positions, end, lo=head)
+                    rest = [position + shift for position in positions[tail:]] if shift else positions[tail:]
+                    new_postings[term] = positions[:head] + added.pop(term, []) + rest
+                    if not new_postings[term]:
+                        del new_postings[term]
+            new_postings.update(added)
+            self.set_index(new_entries, new_id_index, new_postings)
+
+    def refresh(self, confluence_client, pool: Optional[Executor] = None) -> Dict[str, int]:
+        """
+        Incrementally synchronise with Confluence. Only page versions are
+        listed up front; bodies are fetched, in batches, for new or changed
+        pages only. When a pool is given, extraction of the fetched pages runs in it.
+        """
+        listed = confluence_client.list_pages(expand='version')
+        seen = set()
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        stale = []
+
+        for page in listed:
+            page_id = str(page['id'])
+            version = page.get('version', {}).get('number', 0)
+            seen.add(page_id)
+            known = self.pages.get(page_id)
+            if known and known.get('version') == version:
+                stats['unchanged'] += 1
+                continue
+            stale.append((page_id, page.get('title', ''), version, known is not None))
+
+        fetched = confluence_client.get_pages([page_id for page_id, _, _, _ in stale]) if stale else {}
+        changed = []
+        for page_id, title, version, known in stale:
+            page = fetched.get(page_id)
+            body = confluence_client.page_body(page) if page else None
+            if body is None:
+                logger.warning(f"Skipping page {page_id}: body could not be fetched")
+                continue
+            # The page may have moved on since it was listed; store the version the body belongs to
+            version = page.get('version', {}).get('number', version)
+            changed.append((page_id, title, version, body))
+            stats['updated' if known else 'added'] += 1
+
+        bodies = [body for _, _, _, body in changed]
+        if pool is not None:
+            extracted = list(pool.map(self.extractor.extract_error_entries, bodies))
+        else:
+            extracted = [self.extractor.extract_error_entries(body) for body in bodies]
+        for (page_id, title, version, body), entries in zip(changed, extracted):
+            self.update_page(page_id, title, version, body, reindex=False, entries=entries)
+
+        for page_id in list(self.pages):
+            if page_id not in seen:
+                self.remove_page(page_id, reindex=False)
+                stats['removed'] += 1
+
+        self.reindex()
+        logger.info(f"Knowledge base refreshed: {stats}, {len(self.entries)} entries")
+        return stats
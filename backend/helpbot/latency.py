@@ -0,0 +1,46 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class LatencyHistogram:
+    """
+    Rolling window of the most recent call latencies for one provider.
+    Percentiles are computed over the window, so they follow the provider
+    as it gets faster or slower instead of averaging over its whole life.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency below which `percent` of the recent calls finished, or None without samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(percent / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(percent: float) -> Optional[float]:
+            value = self.percentile(percent)
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'samples': len(self),
+            'total': self.total,
+            'p50_ms': ms(50),
+            'p95_ms': ms(95),
+            'p99_ms': ms(99),
+        }
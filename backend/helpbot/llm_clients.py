@@ -0,0 +1,175 @@
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Keep a few connections open per host so consecutive generations skip the TCP/TLS handshake
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+
+class _PooledClient:
+    """
+    Lazily creates one httpx.AsyncClient per event loop. The app module is
+    imported (and, with prefork, forked) before any loop exists, and a client's
+    connections can't be shared across loops.
+    """
+
+    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=self.timeout,
+                                             limits=DEFAULT_LIMITS, transport=self.transport)
+            self._loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+class AsyncOllamaClient(_PooledClient):
+    """Native async client for Ollama's /api/generate and /api/chat"""
+
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: float = 60.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        super().__init__(base_url, timeout=timeout, transport=transport)
+
+    def _payload(self, model: str, options: Optional[Dict[str, Any]], keep_alive: Optional[str],
+                 stream: bool, **fields) -> Dict[str, Any]:
+        payload = {'model': model, 'stream': stream, **fields}
+        if options:
+            payload['options'] = options
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        return payload
+
+    async def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       keep_alive: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        One completion from /api/generate. Returns Ollama's JSON, including its
+        timing fields (load_duration, eval_count, ...), with the text in 'response'.
+        """
+        response = await self.client().post(
+            '/api/generate', json=self._payload(model, options, keep_alive, False, prompt=prompt),
+            timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+                   keep_alive: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """One reply from /api/chat; the text is in result['message']['content']"""
+        response = await self.client().post(
+            '/api/chat', json=self._payload(model, options, keep_alive, False, messages=messages),
+            timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                              keep_alive: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield /api/generate text chunks as Ollama produces them (newline-delimited JSON)"""
+        async with self.client().stream(
+            'POST', '/api/generate', json=self._payload(model, options, keep_alive, True, prompt=prompt)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]],
+                          options: Optional[Dict[str, Any]] = None,
+                          keep_alive: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield /api/chat reply chunks as Ollama produces them"""
+        async with self.client().stream(
+            'POST', '/api/chat', json=self._payload(model, options, keep_alive, True, messages=messages)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                content = chunk.get('message', {}).get('content')
+                if content:
+                    yield content
+                if chunk.get('done'):
+                    break
+
+
+class AsyncHuggingFaceClient(_PooledClient):
+    """Native async client for the Hugging Face inference API"""
+
+    def __init__(self, api_token: str, base_url: str = "https://api-inference.huggingface.co/models",
+                 timeout: float = 30.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        super().__init__(base_url, headers={"Authorization": f"Bearer {api_token}"}, timeout=timeout,
+                         transport=transport)
+
+    @staticmethod
+    def _payload(prompt: str, max_new_tokens: int, temperature: float, stream: bool = False) -> Dict[str, Any]:
+        return {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "do_sample": True,
+                "return_full_text": False
+            },
+            "options": {
+                "wait_for_model": True,
+                "use_cache": True
+            },
+            "stream": stream,
+        }
+
+    async def query(self, model: str, prompt: str, max_new_tokens: int = 150, temperature: float = 0.3,
+                    timeout: Optional[float] = None) -> str:
+        """Generated text for prompt, or raise on an HTTP error or unexpected response"""
+        response = await self.client().post(
+            f"/{model}", json=self._payload(prompt, max_new_tokens, temperature), timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        if isinstance(result, list) and result:
+            if isinstance(result[0], dict) and 'generated_text' in result[0]:
+                return result[0]['generated_text'].strip()
+            if isinstance(result[0], str):
+                return result[0].strip()
+        raise RuntimeError(f"Unexpected Hugging Face response format: {result}")
+
+    async def stream(self, model: str, prompt: str, max_new_tokens: int = 150,
+                     temperature: float = 0.3) -> AsyncIterator[str]:
+        """Yield tokens as server-sent events, for models served with streaming support"""
+        async with self.client().stream(
+            'POST', f"/{model}", json=self._payload(prompt, max_new_tokens, temperature, stream=True)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:])
+                token = event.get('token', {})
+                if token.get('text') and not token.get('special'):
+                    yield token['text']
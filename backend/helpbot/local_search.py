@@ -0,0 +1,156 @@
+import os
+import re
+import zlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUERY_TERM_PATTERN = re.compile(r'\w+')
+
+# Column weights for bm25(): titles count far more than body text
+PAGE_WEIGHTS = (10.0, 1.0)
+ENTRY_WEIGHTS = (0.0, 5.0, 10.0, 3.0, 1.0)
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE pages_fts USING fts5(
+    page_id UNINDEXED, title, body, tokenize = 'porter unicode61'
+);
+CREATE VIRTUAL TABLE entries_fts USING fts5(
+    position UNINDEXED, error_id, error_code, explanation, resolution, tokenize = 'porter unicode61'
+);
+"""
+
+
+def build_match_expression(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression. Every term becomes a quoted
+    prefix query, so user input can never inject FTS syntax.
+    """
+    terms = QUERY_TERM_PATTERN.findall(query.lower())
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def populate_fts(conn: sqlite3.Connection, knowledge_base, extractor):
+    """Create and fill the FTS5 tables of a snapshot being written"""
+    conn.executescript(FTS_SCHEMA)
+    conn.executemany("INSERT INTO pages_fts (page_id, title, body) VALUES (?, ?, ?)", [
+        (page_id, page['title'], extractor.clean_html(knowledge_base.get_page_body(page_id) or ''))
+        for page_id, page in knowledge_base.pages.items()
+    ])
+    conn.executemany(
+        "INSERT INTO entries_fts (position, error_id, error_code, explanation, resolution) VALUES (?, ?, ?, ?, ?)",
+        [
+            (position, entry.id, entry.error_code, entry.explanation, entry.resolution)
+            for position, entry in enumerate(knowledge_base.entries)
+        ]
+    )
+
+
+class LocalSearchBackend:
+    """
+    Full-text search over the local knowledge base snapshot using SQLite FTS5.
+
+    Exposes the same search_pages(query, limit) interface as ConfluenceClient
+    and returns results in the Confluence search payload shape, with bm25
+    ranking, prefix matching and a highlighted snippet per result.
+    """
+
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_id = None
+        # Searches run in worker threads; only one of them may swap the connection
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return a read-only connection, reopening it when the snapshot file was replaced"""
+        stat = os.stat(self.snapshot_path)
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if self._conn is None or file_id != self._file_id:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = sqlite3.connect(f"file:{self.snapshot_path}?mode=ro", uri=True,
+                                             check_same_thread=False)
+                self._file_id = file_id
+                logger.info(f"Opened local search index {self.snapshot_path}")
+            return self._conn
+
+    def search_pages(self, query: str, limit: int = 10, deadline=None, expand=None) -> List[Dict[str, Any]]:
+        """
+        Search pages of the local copy, best bm25 score first. Local queries
+        ignore the deadline, and always include the body since it costs nothing.
+        """
+        expression = build_match_expression(query)
+        if not expression:
+            return []
+        try:
+            rows = self._connection().execute(
+                """
+                SELECT f.page_id, f.title, p.version, p.body, bm25(pages_fts, 0.0, ?, ?) AS bm25_score,
+                       snippet(pages_fts, 2, '<b>', '</b>', '…', 16)
+                FROM pages_fts AS f JOIN pages AS p ON p.page_id = f.page_id
+                WHERE pages_fts MATCH ?
+                ORDER BY bm25_score LIMIT ?
+                """,
+                (*PAGE_WEIGHTS, expression, limit)
+            ).fetchall()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Local search error: {e}")
+            return []
+
+        return [
+            {
+                'id': page_id,
+                'title': title,
+                'version': {'number': version},
+                'body': {'storage': {'value': zlib.decompress(body).decode('utf-8') if body else ''}},
+                'score': -bm25_score,
+                'snippet': snippet
+            }
+            for page_id, title, version, body, bm25_score, snippet in rows
+        ]
+
+    def search_entries(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search individual error entries, best bm25 score first"""
+        expression = build_match_expression(query)
+        if not expression:
+            return []
+        try:
+            rows = self._connection().execute(
+                """
+                SELECT e.page_id, e.error_id, e.error_code, e.explanation, e.resolution,
+                       bm25(entries_fts, ?, ?, ?, ?, ?) AS bm25_score,
+                       snippet(entries_fts, 3, '<b>', '</b>', '…', 16)
+                FROM entries_fts AS f JOIN entries AS e ON e.position = f.position
+                WHERE entries_fts MATCH ?
+                ORDER BY bm25_score LIMIT ?
+                """,
+                (*ENTRY_WEIGHTS, expression, limit)
+            ).fetchall()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Local entry search error: {e}")
+            return []
+
+        return [
+            {
+                'id': error_id,
+                'error_code': error_code,
+                'explanation': explanation,
+                'resolution': resolution,
+                'page_id': page_id,
+                'score': -bm25_score,
+                'snippet': snippet
+            }
+            for page_id, error_id, error_code, explanation, resolution, bm25_score, snippet in rows
+        ]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,298 @@
+import math
+import time
+import asyncio
+import functools
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; from a cached lookup (~1 ms) to a slow LLM reply (30 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], *extra: str) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(pair for pair in extra if pair)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if value != int(value) else str(int(value))
+
+
+class _ThreadCells:
+    """
+    Pre-allocated value slots, one array per writing thread. A thread only
+    ever adds to its own array, so recording takes no lock; a scrape sums
+    the arrays. The GIL keeps the per-thread dict lookups and inserts safe.
+    """
+
+    __slots__ = ('size', '_by_thread')
+
+    def __init__(self, size: int):
+        self.size = size
+        self._by_thread: Dict[int, List[float]] = {}
+
+    def mine(self) -> List[float]:
+        thread = threading.get_ident()
+        cells = self._by_thread.get(thread)
+        if cells is None:
+            cells = self._by_thread[thread] = [0.0] * self.size
+        return cells
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self.size
+        for cells in list(self._by_thread.values()):
+            for index, value in enumerate(cells):
+                totals[index] += value
+        return totals
+
+
+class Timer:
+    """Observe the time a block or call takes; a context manager and a decorator of sync and async functions"""
+
+    __slots__ = ('observe', '_started')
+
+    def __init__(self, observe: Callable[[float], None]):
+        self.observe = observe
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.observe(time.perf_counter() - self._started)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        # Each call gets its own timer, so concurrent calls don't share a start time
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(self.observe):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(self.observe):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class _CounterChild:
+    __slots__ = ('_cells',)
+
+    def __init__(self):
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1.0):
+        self._cells.mine()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', '_cells')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket, one for +Inf, then the running sum
+        self._cells = _ThreadCells(len(upper_bounds) + 2)
+
+    def observe(self, value: float):
+        cells = self._cells.mine()
+        cells[bisect_left(self.upper_bounds, value)] += 1
+        cells[-1] += value
+
+    def time(self) -> Timer:
+        return Timer(self.observe)
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """Cumulative bucket counts (the last is +Inf, i.e. the count) and the sum"""
+        totals = self._cells.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._create_lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The series for these label values; created once, then a plain dict lookup"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._create_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self, constant: str = '') -> List[str]:
+        """Sample lines; `constant` holds the registry's labels formatted for every series"""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set"""
+
+    kind = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def collect(self, constant: str = '') -> List[str]:
+        lines = self.header()
+        for values, child in sorted(self._children.items()):
+            labels = _format_labels(self.labelnames, values, constant)
+            lines.append(f"{self.name}{labels} {_format_value(child.value())}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets per label set, plus their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional['Registry'] = None):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> Timer:
+        return self.labels().time()
+
+    def collect(self, constant: str = '') -> List[str]:
+        lines = self.header()
+        bounds = [_format_value(bound) for bound in self.upper_bounds] + ['+Inf']
+        for values, child in sorted(self._children.items()):
+            cumulative, total = child.snapshot()
+            for bound, count in zip(bounds, cumulative):
+                labels = _format_labels(self.labelnames, values, constant, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(count)}")
+            labels = _format_labels(self.labelnames, values, constant)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative[-1])}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value read at scrape time from a callback per label set, e.g. a queue's current length"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set_function(self, function: Callable[[], float], *values: str):
+        """Report function() for these label values; a later call replaces the function"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+        self._functions[key] = function
+
+    def collect(self, constant: str = '') -> List[str]:
+        lines = self.header()
+        for values, function in sorted(self._functions.items()):
+            try:
+                line = f"{self.name}{_format_labels(self.labelnames, values, constant)} {_format_value(function())}"
+            except Exception:
+                # A broken source shouldn't take the whole scrape down
+                continue
+            lines.append(line)
+        return lines
+
+
+class Registry:
+    """
+    The metrics served together at /metrics. Every process keeps its own
+    values; constant labels (e.g. the prefork worker) tell their series apart.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.constant_labels: Dict[str, str] = {}
+
+    def set_constant_labels(self, **labels: str):
+        """Labels added to every series this registry renders"""
+        self.constant_labels = {name: str(value) for name, value in labels.items()}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def __iter__(self) -> Iterator[_Metric]:
+        return iter(list(self._metrics.values()))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        constant = ','.join(f'{name}="{_escape(value)}"' for name, value in sorted(self.constant_labels.items()))
+        lines = []
+        for metric in self:
+            lines.extend(metric.collect(constant))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- Metrics shared across the service ---
+
+STAGE_SECONDS = Histogram(
+    'helpbot_stage_duration_seconds', 'Time spent in each stage of answering a query', ['stage'])
+LLM_CALL_SECONDS = Histogram(
+    'helpbot_llm_call_duration_seconds', 'LLM provider calls by task, provider and model',
+    ['task', 'provider', 'model'])
+LLM_CALL_ERRORS = Counter(
+    'helpbot_llm_call_errors_total', 'Failed LLM provider calls by task, provider and model',
+    ['task', 'provider', 'model'])
+CACHE_LOOKUPS = Counter(
+    'helpbot_cache_lookups_total', 'Cache lookups per cache and result (hit or miss)', ['cache', 'result'])
+QUEUE_DEPTH = Gauge(
+    'helpbot_queue_depth', 'Items waiting in each work queue', ['queue'])
@@ -0,0 +1,39 @@
+import sys
+import hashlib
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(slots=True)
+class ErrorEntry:
+    """
+    A structured error entry extracted from a Confluence page.
+
+    Slotted so large knowledge bases don't pay for a per-entry dict; the
+    short, highly repeated id fields are interned and shared between entries.
+    Use to_dict() when handing an entry to the API layer.
+    """
+    id: str
+    error_code: str
+    explanation: str
+    resolution: str
+    page_id: str = ''
+
+    def __post_init__(self):
+        self.id = sys.intern(self.id)
+        self.page_id = sys.intern(self.page_id)
+
+    def version_key(self) -> str:
+        """Identifies this version of the entry's content, for data derived from it offline"""
+        content = '\0'.join((self.error_code, self.explanation, self.resolution))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+    def to_dict(self) -> Dict[str, str]:
+        """Plain dict view for the API layer and AI prompts"""
+        return {
+            'id': self.id,
+            'error_code': self.error_code,
+            'explanation': self.explanation,
+            'resolution': self.resolution,
+            'page_id': self.page_id,
+        }
@@ -1,11 +1,32 @@
 import logging
 import os
-from typing import Dict, List, Optional
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import httpx
 import requests
 import json
 
+from .deadline import Deadline, DeadlineExceeded
+from .latency import LatencyHistogram
+from .metrics import LLM_CALL_ERRORS, LLM_CALL_SECONDS
+from .tracing import trace_stage
+from .router import ProviderRouter
+from .scheduler import LLMScheduler, LoadShed
+from .llm_clients import AsyncOllamaClient, AsyncHuggingFaceClient
+from .residency import ModelResidencyManager, parse_range
+from .profiles import ModelProfile, load_profiles
+from .classifier import ErrorClassifier, LabelStore, classification_text, normalize_label
+
 logger = logging.getLogger(__name__)
 
+# Which profile/provider served each task of the current request, when the caller asked to track it
+_profile_usage: contextvars.ContextVar[Optional[Dict[str, Dict[str, Any]]]] = contextvars.ContextVar(
+    'profile_usage', default=None
+)
+
 # Try to import Ollama dependencies, but make them optional
 try:
     from langchain_ollama import OllamaLLM
@@ -124,14 +145,15 @@ class HuggingFaceService:
             logger.warning(f"Hugging Face Hub API test failed: {e}")
             return False
     
-    def query(self, prompt: str, max_length: int = 200, use_text_model: bool = False) -> str:
+    def query(self, prompt: str, max_length: int = 200, use_text_model: bool = False, timeout: float = 30) -> str:
         """Send query to Hugging Face API using simple service"""
         if not self.available:
             return ""
         
         try:
             # Use the simple service
-            response = self.client.query(prompt, max_length=max_length, use_chat_model=not use_text_model)
+            response = self.client.query(prompt, max_length=max_length, use_chat_model=not use_text_model,
+                                         timeout=timeout)
             return response.strip() if response else ""
                 
         except Exception as e:
@@ -151,6 +173,40 @@ class OllamaService:
         self.parser = ErrorAnalysisParser()
         self.ollama_available = OLLAMA_AVAILABLE
         self.current_provider = None
+        # How long Ollama keeps a model loaded after each request (Ollama's own default is 5m)
+        self.keep_alive = os.getenv("LLM_KEEP_ALIVE", "30m")
+        # Model and generation budget per task (analysis, conversation, suggestions, general)
+        self.profiles = load_profiles(self.model_name)
+        self._task_llms: Dict[str, Any] = {}
+        # Below this much remaining request budget an LLM call is skipped rather than started
+        self.min_llm_budget = float(os.getenv("LLM_MIN_BUDGET_SECONDS", 1.0))
+        # Provider calls run here so a slow one can be hedged or abandoned when the deadline passes
+        self._llm_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+        # Hedging: if the primary hasn't answered by this percentile of its recent latency,
+        # send the same prompt to the other provider and take whichever answers first
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+        self.hedge_default_delay = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", 2.0))
+        self.latency = {'ollama': LatencyHistogram(), 'huggingface': LatencyHistogram()}
+        self.hedge_stats = {'hedged': 0, 'secondary_wins': 0}
+        # Picks the provider per task from recent latency, errors and throughput
+        self.router = ProviderRouter(
+            explore_seconds=float(os.getenv("LLM_ROUTER_EXPLORE_SECONDS", 30)),
+        )
+        # Caps concurrent generations at what Ollama runs in parallel and sheds low-priority work
+        self.scheduler = LLMScheduler(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", 1))),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", 32)),
+            shed_queue_depth=int(os.getenv("LLM_SHED_QUEUE_DEPTH", 4)),
+            shed_wait_seconds=float(os.getenv("LLM_SHED_WAIT_SECONDS", 1.0)),
+        )
+        # Local severity/category classifier; the analysis LLM call only runs when it isn't confident
+        self.classifier_confidence = float(os.getenv("CLASSIFIER_CONFIDENCE", 0.8))
+        self.classifier = self._load_classifier(os.getenv("CLASSIFIER_MODEL_PATH", "data/classifier.json"))
+        # Every LLM analysis is kept as a training label for the classifier
+        self.label_store = LabelStore(os.getenv("CLASSIFIER_LABELS_PATH", "data/llm_labels.jsonl"))
+        self.classifier_counts = {'local': 0, 'escalated': 0}
         
         # Initialize Ollama
         if self.ollama_available:
@@ -159,21 +215,45 @@ class OllamaService:
         # Initialize Hugging Face as backup
         self._initialize_huggingface()
         
+        # Pooled keep-alive clients for the async entry points
+        self.ollama_client = AsyncOllamaClient(self.base_url)
+        hf_token = getattr(self.huggingface_service, 'api_token', None)
+        self.hf_client = AsyncHuggingFaceClient(hf_token) if hf_token else None
+        
+        # Preloads and keeps warm the Ollama models, and counts cold loads
+        preload_models = [model.strip() for model in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if model.strip()]
+        self.residency = ModelResidencyManager(
+            self.ollama_client,
+            models=[self.model_name] + [profile.model for profile in self.profiles.values()] + preload_models,
+            keep_alive=self.keep_alive,
+            warm_interval=float(os.getenv("LLM_KEEP_WARM_SECONDS", 600)),
+            warm_hours=parse_range(os.getenv("LLM_KEEP_WARM_HOURS", "8-18"), (8, 18)),
+            warm_days=parse_range(os.getenv("LLM_KEEP_WARM_DAYS", "0-4"), (0, 4)),
+        )
+        
         # Determine which service to use
         self._select_provider()
     
+    @staticmethod
+    def _load_classifier(path: str) -> Optional[ErrorClassifier]:
+        if not os.path.exists(path):
+            logger.info(f"No classifier model at {path} - analysis always uses the LLM")
+            return None
+        try:
+            classifier = ErrorClassifier.load(path)
+            logger.info(f"Loaded classifier trained on {classifier.examples} labels from {path}")
+            return classifier
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load classifier from {path}: {e}")
+            return None
+    
     def _initialize_ollama(self):
         """Initialize the Ollama LLM"""
         if not self.ollama_available:
             return
             
         try:
-            self.ollama_llm = OllamaLLM(
-                model=self.model_name,
-                base_url=self.base_url,
-                temperature=0.3,
-                num_predict=500
-            )
+            self.ollama_llm = self._build_ollama_llm(self.profiles['general'])
             logger.info(f"Initialized Ollama with model: {self.model_name}")
         except Exception as e:
             logger.error(f"Failed to initialize Ollama: {e}")
@@ -217,39 +297,320 @@ class OllamaService:
         """Check if any AI service is available"""
         return self.current_provider is not None
     
-    def _invoke_ai(self, prompt: str, use_text_model: bool = False) -> str:
-        """Invoke the available AI service"""
-        if self.current_provider == "ollama" and self.ollama_llm:
-            try:
-                return self.ollama_llm.invoke(prompt)
-            except Exception as e:
-                logger.warning(f"Ollama failed, trying Hugging Face: {e}")
-                # Fall back to Hugging Face
-                if self.huggingface_service:
-                    self.current_provider = "huggingface"
-                    return self.huggingface_service.query(prompt, use_text_model=use_text_model)
-                raise e
+    def _has_budget(self, deadline: Optional[Deadline], stage: str) -> bool:
+        """Check there is enough request budget left to start an LLM stage; record the skip if not"""
+        if deadline is None or deadline.has_budget(self.min_llm_budget):
+            return True
+        deadline.skip(stage)
+        return False
+    
+    def _provider_configured(self, provider: str) -> bool:
+        if provider == "ollama":
+            return bool(self.ollama_available and self.ollama_llm)
+        return bool(self.huggingface_service and self.huggingface_service.available)
+    
+    def _build_ollama_llm(self, profile: ModelProfile):
+        return OllamaLLM(
+            model=profile.model,
+            base_url=self.base_url,
+            temperature=profile.temperature,
+            num_predict=profile.num_predict,
+            num_ctx=profile.num_ctx,
+            stop=profile.stop or None,
+            keep_alive=self.keep_alive
+        )
+    
+    def profile(self, task: str) -> ModelProfile:
+        return self.profiles.get(task, self.profiles['general'])
+    
+    def _ollama_llm_for(self, task: str):
+        """The synchronous Ollama client configured with the task's profile"""
+        if task not in self.profiles or task == 'general':
+            return self.ollama_llm
+        if task not in self._task_llms:
+            self._task_llms[task] = self._build_ollama_llm(self.profiles[task])
+        return self._task_llms[task]
+    
+    def track_profile_usage(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Start recording, for the current request (context), which provider,
+        model and budget served each task; returns the dict that gets filled in
+        """
+        usage: Dict[str, Dict[str, Any]] = {}
+        _profile_usage.set(usage)
+        return usage
+    
+    def _record_usage(self, task: str, provider: str, use_text_model: bool):
+        usage = _profile_usage.get()
+        if usage is None:
+            return
+        profile = self.profile(task)
+        num_predict = profile.num_predict if provider == "ollama" else profile.hf_max_new_tokens()
+        usage[task] = {'provider': provider, 'model': self._model_for(provider, use_text_model, task),
+                       'num_predict': num_predict, 'temperature': profile.temperature}
+    
+    def _model_for(self, provider: str, use_text_model: bool, task: str = "general") -> str:
+        if provider == "ollama":
+            return self.profile(task).model
+        client = getattr(self.huggingface_service, 'client', None)
+        return getattr(client, 'text_model' if use_text_model else 'chat_model', 'unknown')
+    
+    def _providers(self, task: str, use_text_model: bool) -> List[str]:
+        """Configured providers for a task, in the router's order of expected latency"""
+        candidates = [self.current_provider] if self.current_provider else []
+        for provider in ("ollama", "huggingface"):
+            if provider not in candidates and self._provider_configured(provider):
+                candidates.append(provider)
+        return self.router.choose(task, [(provider, self._model_for(provider, use_text_model, task))
+                                         for provider in candidates])
+    
+    def _record_call(self, provider: str, model: str, started: float, response: Optional[str],
+                     task: str = "general"):
+        """Feed a finished call (response None = failed) to the hedging and routing statistics and /metrics"""
+        elapsed = time.monotonic() - started
+        LLM_CALL_SECONDS.labels(task, provider, model).observe(elapsed)
+        if response is None:
+            LLM_CALL_ERRORS.labels(task, provider, model).inc()
+            self.router.record(provider, model, elapsed, ok=False)
+            return
+        self.latency[provider].record(elapsed)
+        # ~4 characters per token is close enough to compare providers' throughput
+        self.router.record(provider, model, elapsed, ok=True, tokens=len(response) // 4)
+    
+    def _call_provider(self, provider: str, prompt: str, use_text_model: bool, timeout: float,
+                       task: str = "general") -> str:
+        """Run one provider call with the task's profile and record its latency and outcome"""
+        model = self._model_for(provider, use_text_model, task)
+        profile = self.profile(task)
+        started = time.monotonic()
+        try:
+            if provider == "ollama":
+                response = self._ollama_llm_for(task).invoke(prompt)
+            else:
+                response = self.huggingface_service.query(prompt, max_length=profile.hf_max_new_tokens(),
+                                                          use_text_model=use_text_model, timeout=timeout)
+                if not response:
+                    raise RuntimeError("Hugging Face returned an empty response")
+        except Exception:
+            self._record_call(provider, model, started, None, task)
+            raise
+        self._record_call(provider, model, started, response, task)
+        return response
+    
+    async def _acall_provider(self, provider: str, prompt: str, use_text_model: bool, timeout: float,
+                              task: str = "general") -> str:
+        """Async provider call over the pooled clients; a cancelled call is not recorded"""
+        model = self._model_for(provider, use_text_model, task)
+        profile = self.profile(task)
+        started = time.monotonic()
+        try:
+            if provider == "ollama" and use_text_model:
+                result = await self.ollama_client.generate(model, prompt, options=profile.ollama_options(),
+                                                           keep_alive=self.keep_alive, timeout=timeout)
+                self.residency.observe(model, result)
+                response = result.get('response', '')
+            elif provider == "ollama":
+                result = await self.ollama_client.chat(model, [{'role': 'user', 'content': prompt}],
+                                                       options=profile.ollama_options(), keep_alive=self.keep_alive,
+                                                       timeout=timeout)
+                self.residency.observe(model, result)
+                response = result.get('message', {}).get('content', '')
+            else:
+                response = await self.hf_client.query(model, prompt, max_new_tokens=profile.hf_max_new_tokens(),
+                                                      temperature=profile.temperature, timeout=timeout)
+            if not response:
+                raise RuntimeError(f"{provider} returned an empty response")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record_call(provider, model, started, None, task)
+            raise
+        self._record_call(provider, model, started, response, task)
+        return response
+    
+    def hedge_delay(self, provider: str) -> float:
+        """How long to wait for a provider before hedging, from its recent latency"""
+        histogram = self.latency[provider]
+        if len(histogram) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return histogram.percentile(self.hedge_percentile)
+    
+    def _invoke_ai(self, prompt: str, use_text_model: bool = False, deadline: Optional[Deadline] = None,
+                   task: str = "general") -> Tuple[str, Optional[str]]:
+        """
+        Invoke an AI provider once the scheduler admits this task; raises LoadShed
+        if it is dropped. Returns the response and the provider that gave it.
+        """
+        with self.scheduler.slot(task, deadline):
+            return self._invoke_providers(prompt, use_text_model, deadline, task)
+    
+    def _invoke_providers(self, prompt: str, use_text_model: bool, deadline: Optional[Deadline],
+                          task: str) -> Tuple[str, Optional[str]]:
+        """
+        Invoke the provider the router picks for this task within the request's
+        remaining budget. If it fails, or is slower than its usual
+        hedge_percentile latency, the other provider gets the same prompt and
+        the first good answer wins. Returns (response, winning provider); the
+        winner belongs to this call only, concurrent requests may differ.
+        """
+        providers = self._providers(task, use_text_model)
+        if not providers:
+            return "AI services not available", None
+        primary = providers[0]
+        secondary = providers[1] if len(providers) > 1 else None
+        provider_timeout = deadline.timeout(30) if deadline else 30
         
-        elif self.current_provider == "huggingface" and self.huggingface_service:
-            return self.huggingface_service.query(prompt, use_text_model=use_text_model)
+        pending = {self._llm_pool.submit(self._call_provider, primary, prompt, use_text_model, provider_timeout, task): primary}
+        hedge_at = time.monotonic() + self.hedge_delay(primary) if secondary and self.hedge_enabled else None
+        last_error = None
         
-        else:
-            return "AI services not available"
+        while pending:
+            timeout = deadline.remaining() if deadline else None
+            if secondary and hedge_at is not None:
+                until_hedge = max(0.0, hedge_at - time.monotonic())
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{provider} failed: {e}")
+                    continue
+                # Losers run to completion in the pool; their latency is still recorded
+                for other in pending:
+                    other.cancel()
+                self._record_usage(task, provider, use_text_model)
+                if provider != primary:
+                    self.hedge_stats['secondary_wins'] += 1
+                return response, provider
+            
+            hedge_due = hedge_at is not None and time.monotonic() >= hedge_at
+            if secondary and (not pending or hedge_due):
+                if pending:
+                    self.hedge_stats['hedged'] += 1
+                    logger.info(f"{primary} slower than its p{self.hedge_percentile:g} - hedging with {secondary}")
+                pending[self._llm_pool.submit(
+                    self._call_provider, secondary, prompt, use_text_model, deadline.timeout(30) if deadline else 30,
+                    task
+                )] = secondary
+                secondary = None
+                continue
+            
+            if not done and deadline and deadline.expired():
+                for future in pending:
+                    future.cancel()
+                raise DeadlineExceeded(primary)
+        
+        raise last_error or RuntimeError("No AI provider answered")
     
-    def enhance_error_analysis(self, user_query: str, confluence_data: Dict[str, str]) -> Dict[str, str]:
-        """Enhance error analysis using available AI service"""
-        if not self.is_available():
-            logger.warning("No AI services available, returning original data")
-            return {
-                **confluence_data,
-                'enhanced': False,
-                'severity': 'medium',
-                'category': 'general',
-                'status': 'success'
-            }
+    async def _ainvoke_ai(self, prompt: str, use_text_model: bool = False, deadline: Optional[Deadline] = None,
+                          task: str = "general") -> Tuple[str, Optional[str]]:
+        """Async _invoke_ai: waits for a scheduler slot without holding a thread"""
+        async with self.scheduler.aslot(task, deadline):
+            return await self._ainvoke_providers(prompt, use_text_model, deadline, task)
+    
+    async def _ainvoke_providers(self, prompt: str, use_text_model: bool, deadline: Optional[Deadline],
+                                 task: str) -> Tuple[str, Optional[str]]:
+        """Async _invoke_providers; the losing hedged call is cancelled and its connection released"""
+        providers = self._providers(task, use_text_model)
+        if not providers:
+            return "AI services not available", None
+        primary = providers[0]
+        secondary = providers[1] if len(providers) > 1 else None
+        
+        def start(provider: str) -> asyncio.Task:
+            return asyncio.create_task(self._acall_provider(
+                provider, prompt, use_text_model, deadline.timeout(30) if deadline else 30, task
+            ))
         
+        pending = {start(primary): primary}
+        hedge_at = time.monotonic() + self.hedge_delay(primary) if secondary and self.hedge_enabled else None
+        last_error = None
         try:
-            prompt = f"""
+            while pending:
+                timeout = deadline.remaining() if deadline else None
+                if secondary and hedge_at is not None:
+                    until_hedge = max(0.0, hedge_at - time.monotonic())
+                    timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                for finished in done:
+                    provider = pending.pop(finished)
+                    try:
+                        response = finished.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"{provider} failed: {e}")
+                        continue
+                    self._record_usage(task, provider, use_text_model)
+                    if provider != primary:
+                        self.hedge_stats['secondary_wins'] += 1
+                    return response, provider
+                
+                hedge_due = hedge_at is not None and time.monotonic() >= hedge_at
+                if secondary and (not pending or hedge_due):
+                    if pending:
+                        self.hedge_stats['hedged'] += 1
+                        logger.info(f"{primary} slower than its p{self.hedge_percentile:g} - hedging with {secondary}")
+                    pending[start(secondary)] = secondary
+                    secondary = None
+                    continue
+                
+                if not done and deadline and deadline.expired():
+                    raise DeadlineExceeded(primary)
+        finally:
+            # Losers, and everything when the caller gives up, are cancelled for real
+            for call in pending:
+                call.cancel()
+        
+        raise last_error or RuntimeError("No AI provider answered")
+    
+    def latency_stats(self) -> Dict[str, Any]:
+        """Per-provider latency and hedging counters for the status endpoint"""
+        return {
+            'providers': {
+                provider: dict(histogram.snapshot(), hedge_delay_ms=round(self.hedge_delay(provider) * 1000, 1))
+                for provider, histogram in self.latency.items()
+            },
+            'hedging': dict(self.hedge_stats, enabled=self.hedge_enabled, percentile=self.hedge_percentile),
+        }
+    
+    def scheduler_stats(self) -> Dict[str, Any]:
+        """Concurrency, queue depth, wait times and shed counts of the LLM scheduler"""
+        return self.scheduler.stats()
+    
+    def residency_stats(self) -> Dict[str, Any]:
+        """Keep-alive settings and per-model cold-load counts"""
+        return self.residency.stats()
+    
+    async def keep_models_warm(self):
+        """Background task: preload the Ollama models and keep them loaded during business hours"""
+        if not self._provider_configured("ollama"):
+            return
+        await self.residency.run()
+    
+    def profile_stats(self) -> Dict[str, Any]:
+        """The configured per-task profiles"""
+        return {task: profile.to_dict() for task, profile in self.profiles.items()}
+    
+    def classifier_stats(self) -> Dict[str, Any]:
+        """How many analyses the local classifier answered vs. escalated to the LLM"""
+        return dict(self.classifier_counts, loaded=self.classifier is not None,
+                    labels_dropped=self.label_store.dropped,
+                    examples=self.classifier.examples if self.classifier else 0,
+                    confidence_threshold=self.classifier_confidence)
+    
+    def routing_stats(self) -> Dict[str, Any]:
+        """Per provider/model windows and the router's latest decision per task"""
+        return self.router.snapshot()
+    
+    # --- Prompts and result handling shared by the sync and async entry points ---
+    
+    def _analysis_prompt(self, user_query: str, confluence_data: Dict[str, str]) -> str:
+        return f"""
 You are an expert technical support assistant. A user has encountered an error and we found some documentation about it.
 
 User Query: {user_query}
@@ -272,44 +633,70 @@ Severity:
 Category:
 [connection/configuration/authentication/data/general]
 """
-            
-            response = self._invoke_ai(prompt, use_text_model=True)  # Use text model for structured analysis
-            enhanced_data = self.parser.parse(response)
-            
-            # Preserve original Confluence data and add AI analysis
-            result = {
-                'user_issue': user_query,
-                'explanation': confluence_data.get('explanation', 'No explanation available'),
-                'resolution_steps': confluence_data.get('resolution', 'No resolution steps available'),
-                'resolution': confluence_data.get('resolution', 'No resolution steps available'),
-                'severity': enhanced_data.get('severity', 'medium'),
-                'category': enhanced_data.get('category', 'general'),
-                'enhanced': True,
-                'ai_provider': self.current_provider,
-                'status': 'success'
-            }
-            
-            logger.info(f"Enhanced error analysis with {self.current_provider} for query: {user_query}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error enhancing analysis with AI: {e}")
-            # Return original data if enhancement fails
-            return {
-                **confluence_data,
-                'enhanced': False,
-                'severity': 'medium',
-                'category': 'general',
-                'status': 'success'
-            }
     
-    def generate_conversational_response(self, user_query: str, error_data: Dict[str, str]) -> str:
-        """Generate a conversational response for the user"""
-        if not self.is_available():
-            return f"I found information about your error: {error_data.get('explanation', 'No details available')}"
+    def _classify_locally(self, user_query: str, confluence_data: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """The analysis from the local classifier, or None when it isn't confident enough"""
+        if self.classifier is None:
+            return None
+        prediction = self.classifier.predict(classification_text(user_query, confluence_data))
+        if any(confidence < self.classifier_confidence for _, confidence in prediction.values()):
+            self.classifier_counts['escalated'] += 1
+            return None
+        self.classifier_counts['local'] += 1
+        usage = _profile_usage.get()
+        if usage is not None:
+            usage['analysis'] = {'provider': 'local_classifier',
+                                 'confidence': round(min(c for _, c in prediction.values()), 3)}
+        return {
+            'user_issue': user_query,
+            'explanation': confluence_data.get('explanation', 'No explanation available'),
+            'resolution_steps': confluence_data.get('resolution', 'No resolution steps available'),
+            'resolution': confluence_data.get('resolution', 'No resolution steps available'),
+            'severity': prediction['severity'][0],
+            'category': prediction['category'][0],
+            'enhanced': True,
+            'ai_provider': 'local_classifier',
+            'status': 'success'
+        }
+    
+    def _analysis_result(self, user_query: str, confluence_data: Dict[str, str], response: str,
+                         provider: Optional[str]) -> Dict[str, str]:
+        enhanced_data = self.parser.parse(response)
+        # Only labels the model actually produced become training data, not the parser's defaults
+        severity = normalize_label('severity', enhanced_data.get('severity'))
+        category = normalize_label('category', enhanced_data.get('category'))
+        if severity and category and 'severity:' in response.lower() and 'category:' in response.lower():
+            self.label_store.append(classification_text(user_query, confluence_data), severity, category)
         
-        try:
-            prompt = f"""
+        # Preserve original Confluence data and add AI analysis
+        result = {
+            'user_issue': user_query,
+            'explanation': confluence_data.get('explanation', 'No explanation available'),
+            'resolution_steps': confluence_data.get('resolution', 'No resolution steps available'),
+            'resolution': confluence_data.get('resolution', 'No resolution steps available'),
+            'severity': enhanced_data.get('severity', 'medium'),
+            'category': enhanced_data.get('category', 'general'),
+            'enhanced': True,
+            'ai_provider': provider,
+            'status': 'success'
+        }
+        
+        logger.info(f"Enhanced error analysis with {provider} for query: {user_query}")
+        return result
+    
+    @staticmethod
+    def _basic_analysis(confluence_data: Dict[str, str]) -> Dict[str, str]:
+        """Original data when AI enhancement is unavailable or fails"""
+        return {
+            **confluence_data,
+            'enhanced': False,
+            'severity': 'medium',
+            'category': 'general',
+            'status': 'success'
+        }
+    
+    def _conversation_prompt(self, user_query: str, error_data: Dict[str, str]) -> str:
+        return f"""
 You are a helpful technical support assistant. A user asked about an error and you found the solution in our knowledge base.
 
 User asked: {user_query}
@@ -325,33 +712,174 @@ Provide a brief, friendly summary that:
 
 Keep it short and conversational, like you're talking to a colleague. Don't repeat the full technical details.
 """
+    
+    @staticmethod
+    def _basic_conversation(error_data: Dict[str, str]) -> str:
+        return f"I found information about your error: {error_data.get('explanation', 'No details available')}"
+    
+    def _suggestions_prompt(self, user_query: str, error_category: str) -> str:
+        return f"""
+Based on this user query: {user_query}
+Error category: {error_category}
+
+Suggest 3 related error queries that users commonly search for in this category.
+Return only the queries, one per line, without numbers or bullets.
+Make them specific and realistic.
+"""
+    
+    @staticmethod
+    def _suggestions_result(response: str) -> List[str]:
+        suggestions = [line.strip() for line in response.split('\n') if line.strip()]
+        return suggestions[:3]  # Limit to 3 suggestions
+    
+    @staticmethod
+    def _record_skip(e: Exception, deadline: Optional[Deadline], stage: str):
+        if isinstance(e, (DeadlineExceeded, LoadShed)) and deadline:
+            deadline.skip(stage)
+    
+    # --- Synchronous entry points ---
+    
+    @trace_stage('analysis')
+    def enhance_error_analysis(self, user_query: str, confluence_data: Dict[str, str],
+                               deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Enhance error analysis using available AI service"""
+        local = self._classify_locally(user_query, confluence_data)
+        if local:
+            return local
+        if not self.is_available() or not self._has_budget(deadline, 'enhance_error_analysis'):
+            logger.warning("No AI services available, returning original data")
+            return self._basic_analysis(confluence_data)
+        
+        try:
+            prompt = self._analysis_prompt(user_query, confluence_data)
+            response, provider = self._invoke_ai(prompt, use_text_model=True, deadline=deadline, task="analysis")  # Use text model for structured analysis
+            return self._analysis_result(user_query, confluence_data, response, provider)
             
-            response = self._invoke_ai(prompt, use_text_model=False)  # Use conversational model for responses
+        except Exception as e:
+            self._record_skip(e, deadline, 'enhance_error_analysis')
+            logger.error(f"Error enhancing analysis with AI: {e}")
+            # Return original data if enhancement fails
+            return self._basic_analysis(confluence_data)
+    
+    @trace_stage('conversation')
+    def generate_conversational_response(self, user_query: str, error_data: Dict[str, str],
+                                         deadline: Optional[Deadline] = None) -> str:
+        """Generate a conversational response for the user"""
+        if not self.is_available() or not self._has_budget(deadline, 'conversational_response'):
+            return self._basic_conversation(error_data)
+        
+        try:
+            prompt = self._conversation_prompt(user_query, error_data)
+            response, _ = self._invoke_ai(prompt, use_text_model=False, deadline=deadline, task="conversation")  # Use conversational model for responses
             return response.strip()
             
         except Exception as e:
+            self._record_skip(e, deadline, 'conversational_response')
             logger.error(f"Error generating conversational response: {e}")
-            return f"I found information about your error: {error_data.get('explanation', 'No details available')}"
+            return self._basic_conversation(error_data)
     
-    def suggest_related_queries(self, user_query: str, error_category: str) -> List[str]:
+    @trace_stage('suggestions')
+    def suggest_related_queries(self, user_query: str, error_category: str,
+                                deadline: Optional[Deadline] = None) -> List[str]:
         """Suggest related queries the user might be interested in"""
-        if not self.is_available():
+        if not self.is_available() or not self._has_budget(deadline, 'suggestions'):
             return []
         
         try:
-            prompt = f"""
-Based on this user query: {user_query}
-Error category: {error_category}
-
-Suggest 3 related error queries that users commonly search for in this category.
-Return only the queries, one per line, without numbers or bullets.
-Make them specific and realistic.
-"""
+            prompt = self._suggestions_prompt(user_query, error_category)
+            response, _ = self._invoke_ai(prompt, use_text_model=True, deadline=deadline, task="suggestions")  # Use text model for structured suggestions
+            return self._suggestions_result(response)
+            
+        except Exception as e:
+            self._record_skip(e, deadline, 'suggestions')
+            logger.error(f"Error generating suggestions: {e}")
+            return []
+    
+    # --- Async entry points: same behaviour without blocking the event loop ---
+    
+    @trace_stage('analysis')
+    async def aenhance_error_analysis(self, user_query: str, confluence_data: Dict[str, str],
+                                      deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Async version of enhance_error_analysis"""
+        local = self._classify_locally(user_query, confluence_data)
+        if local:
+            return local
+        if not self.is_available() or not self._has_budget(deadline, 'enhance_error_analysis'):
+            logger.warning("No AI services available, returning original data")
+            return self._basic_analysis(confluence_data)
+        
+        try:
+            prompt = self._analysis_prompt(user_query, confluence_data)
+            response, provider = await self._ainvoke_ai(prompt, use_text_model=True, deadline=deadline, task="analysis")
+            return self._analysis_result(user_query, confluence_data, response, provider)
+            
+        except Exception as e:
+            self._record_skip(e, deadline, 'enhance_error_analysis')
+            logger.error(f"Error enhancing analysis with AI: {e}")
+            return self._basic_analysis(confluence_data)
+    
+    @trace_stage('conversation')
+    async def agenerate_conversational_response(self, user_query: str, error_data: Dict[str, str],
+                                                deadline: Optional[Deadline] = None) -> str:
+        """Async version of generate_conversational_response"""
+        if not self.is_available() or not self._has_budget(deadline, 'conversational_response'):
+            return self._basic_conversation(error_data)
+        
+        try:
+            prompt = self._conversation_prompt(user_query, error_data)
+            response, _ = await self._ainvoke_ai(prompt, use_text_model=False, deadline=deadline, task="conversation")
+            return response.strip()
             
-            response = self._invoke_ai(prompt, use_text_model=True)  # Use text model for structured suggestions
-            suggestions = [line.strip() for line in response.split('\n') if line.strip()]
-            return suggestions[:3]  # Limit to 3 suggestions
+        except Exception as e:
+            self._record_skip(e, deadline, 'conversational_response')
+            logger.error(f"Error generating conversational response: {e}")
+            return self._basic_conversation(error_data)
+    
+    @trace_stage('suggestions')
+    async def asuggest_related_queries(self, user_query: str, error_category: str,
+                                       deadline: Optional[Deadline] = None) -> List[str]:
+        """Async version of suggest_related_queries"""
+        if not self.is_available() or not self._has_budget(deadline, 'suggestions'):
+            return []
+        
+        try:
+            prompt = self._suggestions_prompt(user_query, error_category)
+            response, _ = await self._ainvoke_ai(prompt, use_text_model=True, deadline=deadline, task="suggestions")
+            return self._suggestions_result(response)
             
         except Exception as e:
+            self._record_skip(e, deadline, 'suggestions')
             logger.error(f"Error generating suggestions: {e}")
-            return [] 
\ No newline at end of file
+            return []
+    
+    async def astream_conversational_response(self, user_query: str,
+                                              error_data: Dict[str, str]) -> AsyncIterator[str]:
+        """
+        Yield the conversational reply as it is generated. Streams from Ollama;
+        Hugging Face, or any failure, yields the whole reply as one chunk.
+        """
+        prompt = self._conversation_prompt(user_query, error_data)
+        streamed = False
+        if self._provider_configured("ollama"):
+            try:
+                async with self.scheduler.aslot("conversation"):
+                    async for chunk in self.ollama_client.stream_chat(
+                        self.profile("conversation").model, [{'role': 'user', 'content': prompt}],
+                        options=self.profile("conversation").ollama_options(),
+                        keep_alive=self.keep_alive
+                    ):
+                        streamed = True
+                        yield chunk
+                return
+            except (httpx.HTTPError, RuntimeError, LoadShed) as e:
+                logger.warning(f"Ollama streaming failed: {e}")
+                if streamed:
+                    return
+        yield await self.agenerate_conversational_response(user_query, error_data)
+    
+    async def aclose(self):
+        """Close the pooled HTTP connections and write any buffered classifier labels"""
+        await asyncio.to_thread(self.label_store.flush)
+        await self.ollama_client.aclose()
+        if self.hf_client:
+            await self.hf_client.aclose()
@@ -0,0 +1,64 @@
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+# The Hugging Face Inference API times out on longer generations, whatever the task asks for
+HF_MAX_NEW_TOKENS = 150
+
+
+@dataclass
+class ModelProfile:
+    """Model and generation budget for one LLM task"""
+    task: str
+    model: str
+    num_predict: int
+    temperature: float
+    stop: List[str] = field(default_factory=list)
+    num_ctx: Optional[int] = None
+
+    def ollama_options(self) -> Dict[str, Any]:
+        options = {'num_predict': self.num_predict, 'temperature': self.temperature}
+        if self.stop:
+            options['stop'] = self.stop
+        if self.num_ctx:
+            options['num_ctx'] = self.num_ctx
+        return options
+
+    def hf_max_new_tokens(self) -> int:
+        """The generation budget actually sent to Hugging Face"""
+        return min(self.num_predict, HF_MAX_NEW_TOKENS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# Classification needs ~10 output tokens; suggestions a few short lines; only the reply needs room
+DEFAULT_PROFILES = {
+    'analysis': {'num_predict': 16, 'temperature': 0.0, 'stop': ['\n\n\n', 'Explanation:'], 'num_ctx': 2048},
+    'conversation': {'num_predict': 200, 'temperature': 0.3, 'stop': [], 'num_ctx': 2048},
+    'suggestions': {'num_predict': 80, 'temperature': 0.5, 'stop': ['\n\n\n'], 'num_ctx': 1024},
+    'general': {'num_predict': 500, 'temperature': 0.3, 'stop': [], 'num_ctx': None},
+}
+
+
+def load_profiles(default_model: str) -> Dict[str, ModelProfile]:
+    """
+    Build the per-task profiles, overridable per task with LLM_<TASK>_MODEL,
+    LLM_<TASK>_NUM_PREDICT, LLM_<TASK>_TEMPERATURE, LLM_<TASK>_STOP
+    ("|"-separated, escapes like \\n allowed) and LLM_<TASK>_NUM_CTX.
+    """
+    profiles = {}
+    for task, defaults in DEFAULT_PROFILES.items():
+        prefix = f"LLM_{task.upper()}_"
+        stop = os.getenv(prefix + "STOP")
+        num_ctx = os.getenv(prefix + "NUM_CTX", defaults['num_ctx'])
+        profiles[task] = ModelProfile(
+            task=task,
+            model=os.getenv(prefix + "MODEL", default_model),
+            num_predict=int(os.getenv(prefix + "NUM_PREDICT", defaults['num_predict'])),
+            temperature=float(os.getenv(prefix + "TEMPERATURE", defaults['temperature'])),
+            stop=([s.encode().decode('unicode_escape') for s in stop.split('|') if s] if stop is not None
+                  else list(defaults['stop'])),
+            num_ctx=int(num_ctx) if num_ctx else None,
+        )
+    return profiles
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from .tracing import QueryTrace
+
+logger = logging.getLogger(__name__)
+
+CANONICAL_PATTERN = re.compile(r'[a-z0-9#]+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    id INTEGER PRIMARY KEY,
+    at REAL NOT NULL,
+    session TEXT,
+    query TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    entry_id TEXT,
+    status TEXT NOT NULL,
+    total_ms REAL,
+    stages TEXT NOT NULL,
+    cache_hits TEXT NOT NULL,
+    providers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queries_at ON queries (at);
+"""
+
+COLUMNS = ('at', 'session', 'query', 'canonical', 'entry_id', 'status', 'total_ms', 'stages', 'cache_hits', 'providers')
+JSON_COLUMNS = ('stages', 'cache_hits', 'providers')
+
+
+def canonical_query(query: str) -> str:
+    """Lower-cased words only, so "DB timeout!" and "db  timeout" count as one query"""
+    return ' '.join(CANONICAL_PATTERN.findall(query.lower()))
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(values)
+
+    def at(percent: float) -> Optional[float]:
+        if not values:
+            return None
+        return round(values[min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))], 1)
+
+    return {'p50_ms': at(50), 'p95_ms': at(95), 'p99_ms': at(99)}
+
+
+class QueryLog:
+    """
+    Log of answered queries in SQLite. record() only appends to an in-memory
+    ring buffer, so it never blocks a request; run() flushes the buffer in
+    batches from a background task and drops rows older than retention_days.
+    If the buffer fills faster than it is flushed the oldest rows are dropped
+    (and counted) rather than slowing requests down.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, retention_days: float = 30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.dropped = 0
+        self.written = 0
+        self.last_flush_ms = 0.0
+        self.last_rotation = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Several worker processes append to the same file
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record(self, query: str, entry_id: Optional[str] = None, session_id: Optional[str] = None,
+               status: str = 'success', total_ms: Optional[float] = None, stages: Optional[Dict[str, float]] = None,
+               cache_hits: Optional[List[str]] = None, providers: Optional[Dict[str, str]] = None):
+        """Queue one query for the next flush; no I/O happens here"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((
+            time.time(), session_id, query, canonical_query(query), entry_id, status,
+            round(total_ms, 2) if total_ms is not None else None,
+            json.dumps(stages or {}), json.dumps(cache_hits or []), json.dumps(providers or {}),
+        ))
+
+    def record_trace(self, trace: QueryTrace, status: str):
+        self.record(trace.query, trace.entry_id, trace.session_id, status, trace.elapsed_ms(),
+                    trace.stages, trace.cache_hits, trace.providers)
+
+    def flush(self) -> int:
+        """Write everything buffered so far, batch_size rows per transaction"""
+        written = 0
+        started = time.perf_counter()
+        with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    conn = self._connection()
+                    with conn:
+                        conn.executemany(
+                            f"INSERT INTO queries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                            batch
+                        )
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not write {len(batch)} query log rows: {e}")
+                    self.dropped += len(batch)
+                    break
+                written += len(batch)
+        if written:
+            self.written += written
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        return written
+
+    def rotate(self) -> int:
+        """Delete rows older than retention_days; returns how many were removed"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                removed = conn.execute("DELETE FROM queries WHERE at < ?", (cutoff,)).rowcount
+        self.last_rotation = time.time()
+        if removed:
+            logger.info(f"Rotated {removed} query log rows older than {self.retention_days:g} days")
+        return removed
+
+    async def run(self):
+        """Background task: flush every flush_interval seconds and rotate hourly"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+                if time.time() - self.last_rotation >= 3600:
+                    await asyncio.to_thread(self.rotate)
+            except Exception as e:
+                logger.error(f"Query log flush failed: {e}")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Queries over the log ---
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        if not os.path.exists(self.path):
+            return []
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            # No table yet: nothing has been flushed
+            return []
+        finally:
+            conn.close()
+
+    def read(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Logged queries, optionally only those newer than `since` (epoch seconds)"""
+        records = []
+        for row in self._rows(f"SELECT {', '.join(COLUMNS)} FROM queries WHERE at >= ? ORDER BY at", (since or 0,)):
+            record = dict(row)
+            for column in JSON_COLUMNS:
+                record[column] = json.loads(record[column])
+            records.append(record)
+        return records
+
+    def top_queries(self, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most frequent canonical queries, with how many of them matched an entry"""
+        rows = self._rows(
+            "SELECT canonical, COUNT(*) AS count, COUNT(entry_id) AS matched FROM queries WHERE at >= ? "
+            "GROUP BY canonical ORDER BY count DESC, canonical LIMIT ?", (since or 0, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def count(self, since: Optional[float] = None, canonicals: Optional[List[str]] = None) -> int:
+        """Logged queries since `since`, optionally only those with one of the given canonical forms"""
+        if canonicals is not None:
+            if not canonicals:
+                return 0
+            rows = self._rows(
+                f"SELECT COUNT(*) FROM queries WHERE at >= ? AND canonical IN ({', '.join('?' * len(canonicals))})",
+                (since or 0, *canonicals)
+            )
+        else:
+            rows = self._rows("SELECT COUNT(*) FROM queries WHERE at >= ?", (since or 0,))
+        return rows[0][0] if rows else 0
+
+    def top_entries(self, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most frequently matched entries"""
+        rows = self._rows(
+            "SELECT entry_id, COUNT(*) AS count FROM queries WHERE at >= ? AND entry_id IS NOT NULL "
+            "GROUP BY entry_id ORDER BY count DESC, entry_id LIMIT ?", (since or 0, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def report(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """Latency percentiles overall and per stage, cache hit rates and provider shares"""
+        totals, stages, hits, providers = [], {}, Counter(), Counter()
+        matched = 0
+        records = self.read(since)
+        for record in records:
+            if record['total_ms'] is not None:
+                totals.append(record['total_ms'])
+            for stage, ms in record['stages'].items():
+                stages.setdefault(stage, []).append(ms)
+            hits.update(record['cache_hits'])
+            providers.update(f"{task}:{provider}" for task, provider in record['providers'].items())
+            matched += record['entry_id'] is not None
+        count = len(records)
+        return {
+            'queries': count,
+            'match_rate': round(matched / count, 3) if count else None,
+            'total': _percentiles(totals),
+            'stages': {stage: _percentiles(values) for stage, values in sorted(stages.items())},
+            'cache_hit_rates': {cache: round(hit / count, 3) for cache, hit in hits.most_common()},
+            'providers': dict(providers.most_common()),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'buffered': len(self._buffer),
+            'written': self.written,
+            'dropped': self.dropped,
+            'last_flush_ms': self.last_flush_ms,
+            'retention_days': self.retention_days,
+        }
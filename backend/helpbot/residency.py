@@ -0,0 +1,132 @@
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS = 1_000_000_000
+
+
+def parse_range(value: str, default: Tuple[int, int]) -> Tuple[int, int]:
+    """Parse a "start-end" pair such as "8-18" (hours, end exclusive) or "0-4" (Mon-Fri, inclusive)"""
+    try:
+        start, end = (int(part) for part in value.split('-', 1))
+        return start, end
+    except (AttributeError, ValueError):
+        return default
+
+
+class _ModelResidency:
+    __slots__ = ('requests', 'cold_loads', 'total_load_seconds', 'last_load_seconds', 'last_cold_at',
+                 'warmups', 'warmup_loads')
+
+    def __init__(self):
+        self.requests = 0
+        self.cold_loads = 0
+        self.total_load_seconds = 0.0
+        self.last_load_seconds = 0.0
+        self.last_cold_at: Optional[float] = None
+        self.warmups = 0
+        self.warmup_loads = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'cold_loads': self.cold_loads,
+            'cold_load_rate': round(self.cold_loads / self.requests, 3) if self.requests else 0.0,
+            'avg_cold_load_ms': round(self.total_load_seconds / self.cold_loads * 1000, 1) if self.cold_loads else 0.0,
+            'last_load_ms': round(self.last_load_seconds * 1000, 1),
+            'seconds_since_cold_load': round(time.time() - self.last_cold_at) if self.last_cold_at else None,
+            'warmups': self.warmups,
+            'warmup_loads': self.warmup_loads,
+        }
+
+
+class ModelResidencyManager:
+    """
+    Keeps Ollama models loaded so users don't pay a multi-second model load.
+
+    - preload() loads every configured model at startup (an empty-prompt generate)
+    - keep_alive is sent with every request so Ollama holds the model that long
+    - run() sends the same cheap request every warm_interval seconds during
+      business hours, before keep_alive can expire
+    - observe() reads load_duration from each response and counts cold loads,
+      so the keep_alive / warm interval can be tuned from real numbers
+    """
+
+    def __init__(self, client, models: Iterable[str], keep_alive: str = "30m", warm_interval: float = 600.0,
+                 warm_hours: Tuple[int, int] = (8, 18), warm_days: Tuple[int, int] = (0, 4),
+                 cold_load_threshold: float = 0.5):
+        self.client = client
+        self.models = list(dict.fromkeys(models))
+        self.keep_alive = keep_alive
+        self.warm_interval = warm_interval
+        self.warm_hours = warm_hours
+        self.warm_days = warm_days
+        self.cold_load_threshold = cold_load_threshold
+        self._models: Dict[str, _ModelResidency] = {model: _ModelResidency() for model in self.models}
+
+    def _model(self, model: str) -> _ModelResidency:
+        if model not in self._models:
+            self._models[model] = _ModelResidency()
+        return self._models[model]
+
+    def observe(self, model: str, result: Dict[str, Any], warmup: bool = False) -> bool:
+        """Record an Ollama response's timing fields; returns True if it paid a cold load"""
+        stats = self._model(model)
+        load_seconds = result.get('load_duration', 0) / NANOSECONDS
+        stats.last_load_seconds = load_seconds
+        cold = load_seconds >= self.cold_load_threshold
+        if warmup:
+            # A load paid by a warm-up request is the point of warming, not a user-facing cold start
+            stats.warmups += 1
+            stats.warmup_loads += cold
+            return cold
+        stats.requests += 1
+        if cold:
+            stats.cold_loads += 1
+            stats.total_load_seconds += load_seconds
+            stats.last_cold_at = time.time()
+            logger.warning(f"Ollama cold-loaded {model} for a request: {load_seconds:.1f}s")
+        return cold
+
+    def in_warm_window(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.now()
+        return (self.warm_days[0] <= now.weekday() <= self.warm_days[1]
+                and self.warm_hours[0] <= now.hour < self.warm_hours[1])
+
+    async def warm(self, model: str) -> bool:
+        """Load (or keep loaded) one model with an empty prompt; Ollama generates nothing"""
+        try:
+            result = await self.client.generate(model, "", keep_alive=self.keep_alive)
+        except Exception as e:
+            logger.warning(f"Could not warm Ollama model {model}: {e}")
+            return False
+        if self.observe(model, result, warmup=True):
+            logger.info(f"Loaded Ollama model {model} in {result.get('load_duration', 0) / NANOSECONDS:.1f}s")
+        return True
+
+    async def preload(self):
+        for model in self.models:
+            await self.warm(model)
+
+    async def run(self):
+        """Preload, then keep the models warm during business hours"""
+        await self.preload()
+        while True:
+            await asyncio.sleep(self.warm_interval)
+            if self.in_warm_window():
+                for model in self.models:
+                    await self.warm(model)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'keep_alive': self.keep_alive,
+            'warm_interval_seconds': self.warm_interval,
+            'warm_hours': f"{self.warm_hours[0]}-{self.warm_hours[1]}",
+            'warm_days': f"{self.warm_days[0]}-{self.warm_days[1]}",
+            'warm_now': self.in_warm_window(),
+            'models': {model: stats.as_dict() for model, stats in self._models.items()},
+        }
@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling window of outcomes for one provider/model pair"""
+
+    def __init__(self, window: int = 100):
+        # (latency seconds, succeeded, tokens per second)
+        self._calls = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # Counts from creation so a newly seen pair isn't immediately due for exploration
+        self.last_used = time.monotonic()
+
+    def record(self, seconds: float, ok: bool, tokens: int = 0):
+        with self._lock:
+            self._calls.append((seconds, ok, tokens / seconds if ok and seconds > 0 else 0.0))
+            self.last_used = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            calls = list(self._calls)
+        return sum(1 for _, ok, _ in calls if not ok) / len(calls) if calls else 0.0
+
+    def median_latency(self) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(seconds for seconds, ok, _ in self._calls if ok)
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def throughput(self) -> float:
+        """Average tokens per second over successful calls"""
+        with self._lock:
+            rates = [rate for _, ok, rate in self._calls if ok]
+        return sum(rates) / len(rates) if rates else 0.0
+
+    def expected_latency(self, failure_penalty: float) -> float:
+        """
+        Median latency inflated by the error rate, since a failed call costs its
+        time plus a retry elsewhere. Untried pairs score 0 so they get tried.
+        """
+        if not self._calls:
+            return 0.0
+        median = self.median_latency()
+        if median is None:
+            return failure_penalty
+        return median / max(0.05, 1.0 - self.error_rate())
+
+    def snapshot(self) -> Dict[str, Any]:
+        median = self.median_latency()
+        return {
+            'calls': len(self),
+            'median_ms': round(median * 1000, 1) if median is not None else None,
+            'error_rate': round(self.error_rate(), 3),
+            'tokens_per_second': round(self.throughput(), 1),
+        }
+
+
+class ProviderRouter:
+    """
+    Sends each LLM task to the provider with the lowest expected latency, from a
+    rolling window of latency, errors and throughput per provider and model.
+
+    A provider that hasn't been used for explore_seconds gets the next task even
+    if it isn't the best, so one that failed earlier (Ollama restarting, model
+    swapping) gets a chance to show it has recovered and win its traffic back.
+    """
+
+    def __init__(self, explore_seconds: float = 30.0, failure_penalty: float = 30.0, window: int = 100):
+        self.explore_seconds = explore_seconds
+        self.failure_penalty = failure_penalty
+        self.window = window
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, Dict[str, Any]] = {}
+        self.decision_counts: Dict[str, Dict[str, int]] = {}
+
+    def stats(self, provider: str, model: str) -> ProviderStats:
+        key = (provider, model)
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = ProviderStats(self.window)
+            return self._stats[key]
+
+    def record(self, provider: str, model: str, seconds: float, ok: bool, tokens: int = 0):
+        self.stats(provider, model).record(seconds, ok, tokens)
+
+    def choose(self, task: str, candidates: List[Tuple[str, str]]) -> List[str]:
+        """Order the (provider, model) candidates for a task, best first"""
+        if not candidates:
+            return []
+        now = time.monotonic()
+        expected = {provider: self.stats(provider, model).expected_latency(self.failure_penalty)
+                    for provider, model in candidates}
+        ranked = sorted(candidates, key=lambda candidate: expected[candidate[0]])
+        reason = 'only' if len(candidates) == 1 else 'best'
+
+        if len(ranked) > 1:
+            # Give the least recently used of the others a turn if it has been idle too long
+            idle = [candidate for candidate in ranked[1:]
+                    if now - self.stats(*candidate).last_used >= self.explore_seconds]
+            if idle:
+                explore = min(idle, key=lambda candidate: self.stats(*candidate).last_used)
+                ranked.remove(explore)
+                ranked.insert(0, explore)
+                reason = 'explore'
+
+        provider, model = ranked[0]
+        # Count the turn now so concurrent requests don't all explore the same provider
+        self.stats(provider, model).last_used = now
+        self.decisions[task] = {
+            'provider': provider,
+            'model': model,
+            'reason': reason,
+            'expected_ms': {name: round(value * 1000, 1) for name, value in expected.items()},
+        }
+        counts = self.decision_counts.setdefault(task, {})
+        counts[provider] = counts.get(provider, 0) + 1
+        if reason == 'explore':
+            logger.info(f"Routing {task} to {provider} ({model}) to re-check its latency")
+        return [provider for provider, _ in ranked]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            'explore_seconds': self.explore_seconds,
+            'providers': {f"{provider}:{model}": entry.snapshot() for (provider, model), entry in stats.items()},
+            'decisions': self.decisions,
+            'decision_counts': self.decision_counts,
+        }
@@ -0,0 +1,208 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: the conversational reply is what the user reads, suggestions are extras
+TASK_PRIORITIES = {'conversation': 0, 'analysis': 1, 'suggestions': 2}
+# Background work (cache prewarming) queues behind every user-facing task
+BACKGROUND_PRIORITY = len(TASK_PRIORITIES) + 1
+
+_background: contextvars.ContextVar = contextvars.ContextVar('llm_background', default=False)
+
+
+@contextmanager
+def background_priority():
+    """LLM tasks started in this context rank below all user requests (and are shed first)"""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+class LoadShed(Exception):
+    """Raised when an LLM task is dropped because the queue is too deep or too slow"""
+
+    def __init__(self, task: str, reason: str):
+        super().__init__(f"Shed {task}: {reason}")
+        self.task = task
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'task', 'queued_at', 'granted', 'wake')
+
+    def __init__(self, priority: int, seq: int, task: str, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.task = task
+        self.queued_at = time.monotonic()
+        self.granted = False
+        self.wake = wake
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the LLM providers.
+
+    At most max_concurrency generations run at once (match it to Ollama's
+    OLLAMA_NUM_PARALLEL); the rest wait in a bounded priority queue. Rather
+    than letting every request get slow, lower-priority tasks are shed once
+    the queue is shed_queue_depth deep or they have waited shed_wait_seconds,
+    and the caller falls back to the non-AI response.
+
+    Freed slots are handed directly to the highest-priority waiter, which may
+    be a thread (acquire/slot) or a coroutine (aacquire/aslot).
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 32, shed_queue_depth: int = 4,
+                 shed_wait_seconds: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.shed_queue_depth = shed_queue_depth
+        self.shed_wait_seconds = shed_wait_seconds
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._admitted = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._shed: Dict[str, int] = {}
+
+    def _shed_task(self, task: str, reason: str):
+        self._shed[task] = self._shed.get(task, 0) + 1
+        logger.warning(f"Shedding LLM task {task}: {reason}")
+        raise LoadShed(task, reason)
+
+    def _admit(self, wait: float):
+        self._running += 1
+        self._admitted += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def _grant_next(self):
+        """Hand free slots to the highest-priority waiters (called with the lock held)"""
+        while self._queue and self._running < self.max_concurrency:
+            waiter = heapq.heappop(self._queue)
+            waiter.granted = True
+            self._admit(time.monotonic() - waiter.queued_at)
+            waiter.wake()
+
+    def _enqueue(self, task: str, deadline: Optional[Deadline], wake: Callable[[], None]):
+        """
+        Admit immediately (returns None) or queue a waiter and return it with how
+        long it may wait; raises LoadShed if the task is refused outright
+        """
+        priority = TASK_PRIORITIES.get(task, len(TASK_PRIORITIES))
+        if _background.get():
+            priority += BACKGROUND_PRIORITY
+        if self._running < self.max_concurrency and not self._queue:
+            self._admit(0.0)
+            return None, None
+        if len(self._queue) >= self.max_queue:
+            self._shed_task(task, f"queue full ({len(self._queue)} waiting)")
+        if priority > 0 and len(self._queue) >= self.shed_queue_depth:
+            self._shed_task(task, f"{len(self._queue)} tasks already queued")
+
+        waiter = _Waiter(priority, next(self._seq), task, wake)
+        heapq.heappush(self._queue, waiter)
+        # The top-priority task waits as long as the request allows; the others only shed_wait_seconds
+        limit = deadline.remaining() if deadline else None
+        if priority > 0:
+            limit = self.shed_wait_seconds if limit is None else min(limit, self.shed_wait_seconds)
+        return waiter, limit
+
+    def _give_up(self, waiter: _Waiter, shed: bool = True):
+        """Leave the queue after a timeout unless a slot was granted meanwhile (lock held)"""
+        if waiter.granted:
+            return
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        if shed:
+            self._shed_task(waiter.task, f"waited {time.monotonic() - waiter.queued_at:.2f}s for a slot")
+
+    def acquire(self, task: str, deadline: Optional[Deadline] = None):
+        """Block the calling thread until the task may run, or raise LoadShed"""
+        event = threading.Event()
+        with self._lock:
+            waiter, limit = self._enqueue(task, deadline, event.set)
+        if waiter is None:
+            return
+        event.wait(limit)
+        with self._lock:
+            self._give_up(waiter)
+
+    async def aacquire(self, task: str, deadline: Optional[Deadline] = None):
+        """Wait without blocking the event loop until the task may run, or raise LoadShed"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._lock:
+            waiter, limit = self._enqueue(task, deadline, wake)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), limit)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._running -= 1
+                    self._grant_next()
+                else:
+                    self._give_up(waiter, shed=False)
+            raise
+        with self._lock:
+            self._give_up(waiter)
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, task: str, deadline: Optional[Deadline] = None):
+        self.acquire(task, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, task: str, deadline: Optional[Deadline] = None):
+        await self.aacquire(task, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'admitted': self._admitted,
+                'avg_wait_ms': round(self._total_wait / self._admitted * 1000, 1) if self._admitted else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 1),
+                'shed': dict(self._shed),
+            }
@@ -0,0 +1,47 @@
+import json
+import base64
+import binascii
+from typing import Set, Tuple
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or was issued for a different query"""
+
+
+def encode_cursor(query: str, score: float, page_id: str, entry_id: str) -> str:
+    """Opaque cursor pointing just past (score, page_id, entry_id) in the ranking of `query`"""
+    payload = json.dumps([query, score, page_id, entry_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, query: str) -> Tuple[float, str, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_query, score, page_id, entry_id = json.loads(base64.urlsafe_b64decode(padded))
+        after = (float(score), str(page_id), str(entry_id))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise CursorError(f"Invalid cursor: {e}")
+    if cursor_query != query:
+        raise CursorError("Cursor was issued for a different query")
+    return after
+
+
+def make_snippet(text: str, query_words: Set[str], width: int = 160) -> str:
+    """About `width` characters of text around the first query word it contains"""
+    text = ' '.join(text.split())
+    if len(text) <= width:
+        return text
+    lower = text.lower()
+    positions = [lower.find(word) for word in query_words if word in lower]
+    first = min(positions) if positions else 0
+    start = max(0, min(first - width // 4, len(text) - width))
+    # Don't cut words in half at either end
+    if start:
+        space = text.find(' ', start)
+        start = space + 1 if 0 <= space < first else start
+    end = start + width
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+    return ('…' if start else '') + text[start:end] + ('…' if end < len(text) else '')
+
@@ -0,0 +1,175 @@
+import os
+import time
+import logging
+from collections import ChainMap
+from typing import Any, Dict, List, Mapping, Optional
+
+from .knowledge_base import KnowledgeBase
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+
+def parse_space_keys(value: Optional[str]) -> List[str]:
+    """Space keys from a comma-separated setting, in order and without duplicates"""
+    keys = []
+    for key in (value or '').split(','):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def shard_snapshot_path(path: str, space_key: str) -> str:
+    """data/kb_snapshot.db -> data/kb_snapshot.OPS.db"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{space_key}{ext or '.db'}"
+
+
+class SpaceShard:
+    """
+    One Confluence space's part of the knowledge base, with its own client,
+    snapshot file and sync interval, plus the latency and size figures that
+    show whether it is holding back queries.
+    """
+
+    def __init__(self, space_key: str, knowledge_base: KnowledgeBase, snapshot_path: str,
+                 refresh_seconds: int = 0, client=None):
+        self.space_key = space_key
+        self.knowledge_base = knowledge_base
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.client = client
+        self.queries = 0
+        self.timeouts = 0
+        self.total_query_seconds = 0.0
+        self.max_query_seconds = 0.0
+        self.last_query_seconds: Optional[float] = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_seconds: Optional[float] = None
+        self.last_refreshed_at: Optional[float] = None
+
+    def record_query(self, seconds: float, timed_out: bool = False):
+        self.queries += 1
+        self.timeouts += timed_out
+        self.total_query_seconds += seconds
+        self.max_query_seconds = max(self.max_query_seconds, seconds)
+        self.last_query_seconds = seconds
+
+    def record_refresh(self, seconds: float, failed: bool = False):
+        self.refreshes += 1
+        self.refresh_failures += failed
+        self.last_refresh_seconds = seconds
+        if not failed:
+            self.last_refreshed_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 2) if seconds is not None else None
+
+        return {
+            'pages': len(self.knowledge_base.pages),
+            'entries': len(self.knowledge_base),
+            'snapshot': self.snapshot_path,
+            'refresh_seconds': self.refresh_seconds,
+            'queries': self.queries,
+            'timeouts': self.timeouts,
+            'avg_query_ms': ms(self.total_query_seconds / self.queries) if self.queries else None,
+            'max_query_ms': ms(self.max_query_seconds) if self.queries else None,
+            'last_query_ms': ms(self.last_query_seconds),
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'last_refresh_ms': ms(self.last_refresh_seconds),
+            'last_refreshed_at': self.last_refreshed_at,
+        }
+
+
+class ShardedKnowledgeBase:
+    """
+    The knowledge base split into one shard per Confluence space. Lookups
+    read like a single KnowledgeBase over every shard (page ids are unique
+    across spaces) and writes go to the shard holding the page; searches
+    fan out to the shards themselves, so one huge space can be timed out
+    without holding back the small ones.
+    """
+
+    def __init__(self, shards: List[SpaceShard]):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        self.shards: Dict[str, SpaceShard] = {shard.space_key: shard for shard in shards}
+
+    def __len__(self) -> int:
+        return sum(len(shard.knowledge_base) for shard in self.shards.values())
+
+    def _maps(self, attribute: str) -> Mapping:
+        return ChainMap(*(getattr(shard.knowledge_base, attribute) for shard in self.shards.values()))
+
+    @property
+    def pages(self) -> Mapping[str, Dict[str, Any]]:
+        return self._maps('pages')
+
+    @property
+    def page_entries(self) -> Mapping[str, List[ErrorEntry]]:
+        return self._maps('page_entries')
+
+    @property
+    def enrichments(self) -> Mapping[str, Dict[str, Any]]:
+        return self._maps('enrichments')
+
+    @property
+    def entries(self) -> List[ErrorEntry]:
+        return [entry for shard in self.shards.values() for entry in shard.knowledge_base.entries]
+
+    def shard_for_page(self, page_id: str) -> Optional[SpaceShard]:
+        return next((shard for shard in self.shards.values() if page_id in shard.knowledge_base.pages), None)
+
+    def get_by_id(self, error_id: str) -> Optional[ErrorEntry]:
+        for shard in self.shards.values():
+            entry = shard.knowledge_base.get_by_id(error_id)
+            if entry is not None:
+                return entry
+        return None
+
+    def get_enrichment(self, entry: ErrorEntry) -> Optional[Dict[str, Any]]:
+        return self.enrichments.get(entry.version_key())
+
+    def get_page_body(self, page_id: str) -> Optional[str]:
+        shard = self.shard_for_page(page_id)
+        return shard.knowledge_base.get_page_body(page_id) if shard else None
+
+    def update_page(self, page_id: str, title: str, version: int, body: str, reindex: bool = True,
+                    entries: Optional[List[ErrorEntry]] = None, space_key: Optional[str] = None) -> SpaceShard:
+        """
+        Store a page in the shard of space_key, else the shard already holding
+        it, else the first shard. A page moved between spaces changes shard.
+        """
+        owner = self.shard_for_page(page_id)
+        shard = self.shards.get(space_key) or owner or next(iter(self.shards.values()))
+        if owner is not None and owner is not shard:
+            owner.knowledge_base.remove_page(page_id, reindex)
+        shard.knowledge_base.update_page(page_id, title, version, body, reindex, entries)
+        return shard
+
+    def remove_page(self, page_id: str, reindex: bool = True) -> Optional[SpaceShard]:
+        """Drop a page from whichever shard holds it; returns that shard"""
+        shard = self.shard_for_page(page_id)
+        if shard is not None:
+            shard.knowledge_base.remove_page(page_id, reindex)
+        return shard
+
+    def merged(self) -> KnowledgeBase:
+        """All shards as one KnowledgeBase, for the combined snapshot and the shared index"""
+        shards = list(self.shards.values())
+        if len(shards) == 1:
+            return shards[0].knowledge_base
+        merged = KnowledgeBase(shards[0].knowledge_base.extractor)
+        for shard in shards:
+            merged.pages.update(shard.knowledge_base.pages)
+            merged.page_entries.update(shard.knowledge_base.page_entries)
+            merged.enrichments.update(shard.knowledge_base.enrichments)
+        merged.reindex()
+        return merged
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {space_key: shard.stats() for space_key, shard in self.shards.items()}
@@ -0,0 +1,216 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import logging
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .knowledge_base import index_terms
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HBKBIDX\x00'
+FORMAT_VERSION = 1
+
+# magic, format version, little-endian flag, entry/id/term counts, section offsets
+HEADER = struct.Struct('<8sIIIII5Q')
+# offset/length pairs into the string heap for id, error_code, explanation, resolution, page_id
+ENTRY_ROW = struct.Struct('<10I')
+# id offset, id length, entry position
+ID_ROW = struct.Struct('<3I')
+# term offset, term length, first posting, posting count
+TERM_ROW = struct.Struct('<4I')
+
+
+class SharedIndexError(Exception):
+    pass
+
+
+class _HeapWriter:
+    """Accumulates UTF-8 strings into one heap, storing repeated values once"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.seen: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: str) -> Tuple[int, int]:
+        ref = self.seen.get(value)
+        if ref is None:
+            data = value.encode('utf-8')
+            ref = (self.size, len(data))
+            self.chunks.append(data)
+            self.size += len(data)
+            self.seen[value] = ref
+        return ref
+
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+
+def publish_shared_index(knowledge_base, path: str):
+    """
+    Write the knowledge base index in the shared mmap format and atomically
+    rename it into place. Readers holding the previous file keep their mapping
+    until they notice the new inode and remap.
+    """
+    heap = _HeapWriter()
+    entry_rows = bytearray()
+    for entry in knowledge_base.entries:
+        refs = []
+        for value in (entry.id, entry.error_code, entry.explanation, entry.resolution, entry.page_id):
+            refs.extend(heap.add(value))
+        entry_rows += ENTRY_ROW.pack(*refs)
+
+    id_rows = bytearray()
+    for error_id, position in sorted(knowledge_base.id_index.items(), key=lambda item: item[0].encode('utf-8')):
+        id_rows += ID_ROW.pack(*heap.add(error_id), position)
+
+    term_rows = bytearray()
+    postings = array('I')
+    for term, positions in sorted(knowledge_base.postings.items(), key=lambda item: item[0].encode('utf-8')):
+        term_rows += TERM_ROW.pack(*heap.add(term), len(postings), len(positions))
+        postings.extend(positions)
+
+    entries_offset = _align(HEADER.size)
+    ids_offset = _align(entries_offset + len(entry_rows))
+    terms_offset = _align(ids_offset + len(id_rows))
+    postings_offset = _align(terms_offset + len(term_rows))
+    heap_offset = _align(postings_offset + len(postings) * postings.itemsize)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 1 if sys.byteorder == 'little' else 0,
+        len(knowledge_base.entries), len(knowledge_base.id_index), len(knowledge_base.postings),
+        entries_offset, ids_offset, terms_offset, postings_offset, heap_offset
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for offset, section in ((0, header), (entries_offset, entry_rows), (ids_offset, id_rows),
+                                (terms_offset, term_rows), (postings_offset, postings.tobytes())):
+            f.seek(offset)
+            f.write(section)
+        f.seek(heap_offset)
+        for chunk in heap.chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.info(f"Published shared index {path}: {len(knowledge_base.entries)} entries, "
+                f"{heap_offset + heap.size} bytes")
+
+
+class SharedIndex:
+    """
+    Read-only, memory-mapped view of a published knowledge base index.
+
+    Every worker process maps the same file, so the pages are shared through
+    the OS page cache instead of being copied into each worker's heap. Entries
+    are only decoded when they are returned. maybe_remap() picks up a newly
+    published file after the sync job renames it into place.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._file_id = None
+        self._last_check = 0.0
+        self._map(self._open())
+
+    def _open(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped, (stat.st_ino, stat.st_mtime_ns)
+
+    def _map(self, opened):
+        mapped, file_id = opened
+        if len(mapped) < HEADER.size:
+            raise SharedIndexError(f"Shared index {self.path} is truncated")
+        (magic, version, little_endian, entry_count, id_count, term_count,
+         entries_offset, ids_offset, terms_offset, postings_offset, heap_offset) = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SharedIndexError(f"Unsupported shared index format in {self.path}")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise SharedIndexError(f"Shared index {self.path} was written with a different byte order")
+
+        view = memoryview(mapped)
+        total_postings = (heap_offset - postings_offset) // 4
+        self._postings = view[postings_offset:postings_offset + total_postings * 4].cast('I')
+        self._mmap = mapped
+        self._entry_count = entry_count
+        self._id_count = id_count
+        self._term_count = term_count
+        self._entries_offset = entries_offset
+        self._ids_offset = ids_offset
+        self._terms_offset = terms_offset
+        self._heap_offset = heap_offset
+        self._file_id = file_id
+
+    def maybe_remap(self) -> bool:
+        """Remap if the sync job has published a new file since the last check"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_ino, stat.st_mtime_ns) == self._file_id:
+            return False
+        try:
+            self._map(self._open())
+        except (OSError, SharedIndexError) as e:
+            logger.error(f"Failed to remap shared index: {e}")
+            return False
+        logger.info(f"Remapped shared index {self.path}: {self._entry_count} entries")
+        return True
+
+    def __len__(self) -> int:
+        return self._entry_count
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._heap_offset + offset
+        return self._mmap[start:start + length].decode('utf-8')
+
+    def _key(self, offset: int, length: int) -> bytes:
+        start = self._heap_offset + offset
+        return self._mmap[start:start + length]
+
+    def get_entry(self, position: int) -> ErrorEntry:
+        refs = ENTRY_ROW.unpack_from(self._mmap, self._entries_offset + position * ENTRY_ROW.size)
+        return ErrorEntry(*(self._string(refs[i], refs[i + 1]) for i in range(0, 10, 2)))
+
+    def _bisect(self, key: bytes, table_offset: int, row: struct.Struct, count: int) -> Optional[tuple]:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            fields = row.unpack_from(self._mmap, table_offset + middle * row.size)
+            found = self._key(fields[0], fields[1])
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return fields
+        return None
+
+    def get_by_id(self, error_id: str) -> Optional[ErrorEntry]:
+        """Look up an entry by its error log id"""
+        fields = self._bisect(error_id.encode('utf-8'), self._ids_offset, ID_ROW, self._id_count)
+        return self.get_entry(fields[2]) if fields else None
+
+    def candidates(self, query: str) -> List[ErrorEntry]:
+        """Return the entries sharing at least one term with the query"""
+        positions = set()
+        for term in index_terms(query):
+            fields = self._bisect(term.encode('utf-8'), self._terms_offset, TERM_ROW, self._term_count)
+            if fields:
+                positions.update(self._postings[fields[2]:fields[2] + fields[3]])
+        return [self.get_entry(position) for position in sorted(positions)]
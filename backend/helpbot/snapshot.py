@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+from array import array
+from typing import Any, Dict, Optional
+
+from .knowledge_base import KnowledgeBase
+from .models import ErrorEntry
+from .local_search import populate_fts
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE pages (
+    page_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    body BLOB
+);
+CREATE TABLE entries (
+    position INTEGER PRIMARY KEY,
+    page_id TEXT NOT NULL,
+    error_id TEXT NOT NULL,
+    error_code TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    resolution TEXT NOT NULL
+);
+CREATE TABLE id_index (error_id TEXT PRIMARY KEY, position INTEGER NOT NULL);
+CREATE TABLE postings (term TEXT PRIMARY KEY, positions BLOB NOT NULL);
+CREATE TABLE enrichments (
+    version_key TEXT PRIMARY KEY,
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    suggestions TEXT NOT NULL,
+    provider TEXT,
+    created_at INTEGER NOT NULL
+);
+"""
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_snapshot(knowledge_base: KnowledgeBase, path: str):
+    """
+    Write the knowledge base to an SQLite snapshot. The file is written next
+    to the target and atomically renamed, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('snapshot_version', str(SNAPSHOT_VERSION)),
+            ('created_at', str(int(time.time()))),
+        ])
+        conn.executemany("INSERT INTO pages VALUES (?, ?, ?, ?)", [
+            (page_id, page['title'], page['version'], page.get('body'))
+            for page_id, page in knowledge_base.pages.items()
+        ])
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", [
+            (position, entry.page_id, entry.id, entry.error_code, entry.explanation, entry.resolution)
+            for position, entry in enumerate(knowledge_base.entries)
+        ])
+        conn.executemany("INSERT INTO id_index VALUES (?, ?)", knowledge_base.id_index.items())
+        conn.executemany("INSERT INTO postings VALUES (?, ?)", [
+            (term, array('I', positions).tobytes())
+            for term, positions in knowledge_base.postings.items()
+        ])
+        # Only enrichments of entries that still exist are carried over
+        current = {entry.version_key() for entry in knowledge_base.entries}
+        conn.executemany("INSERT INTO enrichments VALUES (?, ?, ?, ?, ?, ?)", [
+            (key, item['severity'], item['category'], json.dumps(item['suggestions']), item.get('provider'),
+             int(item.get('created_at', 0)))
+            for key, item in knowledge_base.enrichments.items() if key in current
+        ])
+        # Full-text tables backing LocalSearchBackend
+        populate_fts(conn, knowledge_base, knowledge_base.extractor)
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote knowledge base snapshot to {path}: {len(knowledge_base.pages)} pages, {len(knowledge_base.entries)} entries")
+
+
+def _read_enrichments(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    return {
+        key: {'severity': severity, 'category': category, 'suggestions': json.loads(suggestions),
+              'provider': provider, 'created_at': created_at}
+        for key, severity, category, suggestions, provider, created_at in conn.execute(
+            "SELECT version_key, severity, category, suggestions, provider, created_at FROM enrichments"
+        )
+    }
+
+
+def load_enrichments(path: str) -> Dict[str, Dict[str, Any]]:
+    """Only the precomputed enrichments, for processes serving entries from the shared index"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return _read_enrichments(conn)
+    except sqlite3.DatabaseError as e:
+        raise SnapshotError(f"Corrupt snapshot {path}: {e}") from e
+    finally:
+        conn.close()
+
+
+def load_snapshot(path: str, knowledge_base: Optional[KnowledgeBase] = None) -> KnowledgeBase:
+    """Load a snapshot written by save_snapshot without re-extracting or re-indexing anything"""
+    if not os.path.exists(path):
+        raise SnapshotError(f"Snapshot not found: {path}")
+
+    started = time.perf_counter()
+    knowledge_base = knowledge_base or KnowledgeBase()
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        version = int(meta.get('snapshot_version', 0))
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+
+        pages = {
+            page_id: {'title': title, 'version': page_version, 'body': body}
+            for page_id, title, page_version, body in conn.execute("SELECT page_id, title, version, body FROM pages")
+        }
+        page_entries = {page_id: [] for page_id in pages}
+        entries = []
+        rows = conn.execute(
+            "SELECT page_id, error_id, error_code, explanation, resolution FROM entries ORDER BY position"
+        )
+        for page_id, error_id, error_code, explanation, resolution in rows:
+            entry = ErrorEntry(error_id, error_code, explanation, resolution, page_id)
+            entries.append(entry)
+            page_entries.setdefault(page_id, []).append(entry)
+
+        id_index = dict(conn.execute("SELECT error_id, position FROM id_index"))
+        postings = {}
+        for term, blob in conn.execute("SELECT term, positions FROM postings"):
+            positions = array('I')
+            positions.frombytes(blob)
+            postings[term] = positions.tolist()
+        enrichments = _read_enrichments(conn)
+    except sqlite3.DatabaseError as e:
+        raise SnapshotError(f"Corrupt snapshot {path}: {e}") from e
+    finally:
+        conn.close()
+
+    knowledge_base.pages = pages
+    knowledge_base.page_entries = page_entries
+    knowledge_base.set_index(entries, id_index, postings)
+    knowledge_base.enrichments = enrichments
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Loaded knowledge base snapshot {path} in {elapsed_ms:.1f} ms: {len(pages)} pages, {len(entries)} entries, {len(enrichments)} enrichments")
+    return knowledge_base
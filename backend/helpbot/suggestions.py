@@ -0,0 +1,124 @@
+import math
+import time
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from .html_extractor import ERROR_TYPES
+from .models import ErrorEntry
+
+logger = logging.getLogger(__name__)
+
+# html_extractor error types folded into the analysis categories, for entries without an enrichment
+KEYWORD_CATEGORIES = {
+    'connection': 'connection',
+    'authentication': 'authentication',
+    'configuration': 'configuration',
+    'database': 'data',
+    'file': 'data',
+    'validation': 'data',
+    'server': 'general',
+    'api': 'general',
+}
+
+# A pair of entries looked up in the same session counts this much more than sharing a category
+COOCCURRENCE_WEIGHT = 3.0
+CATEGORY_WEIGHT = 1.0
+
+
+def keyword_category(entry: ErrorEntry) -> str:
+    """The category whose error-type keywords the entry's title and explanation hit most"""
+    text = f"{entry.error_code} {entry.explanation}".lower()
+    hits = Counter()
+    for error_type, keywords in ERROR_TYPES.items():
+        hits[KEYWORD_CATEGORIES[error_type]] += sum(1 for keyword in keywords if keyword in text)
+    category, count = max(hits.items(), key=lambda item: item[1], default=('general', 0))
+    return category if count else 'general'
+
+
+class SuggestionIndex:
+    """
+    Precomputed related queries per entry, built from the knowledge base and
+    the query log. A lookup is a dict access; build() does the work offline.
+
+    Candidates for an entry are the entries looked up in the same user sessions
+    and the most popular entries of its category. Each is scored by
+    co-occurrence, category and popularity (how often users landed on it), and
+    suggested by its title, so every suggestion is an error we document.
+    """
+
+    def __init__(self, related: Optional[Dict[str, List[str]]] = None, stats: Optional[Dict[str, Any]] = None):
+        self.related = related or {}
+        self.built_stats = stats or {'entries': 0, 'queries': 0, 'sessions': 0, 'built_at': None}
+
+    def __len__(self) -> int:
+        return len(self.related)
+
+    def lookup(self, entry_id: str) -> List[str]:
+        return self.related.get(entry_id, [])
+
+    @classmethod
+    def build(cls, entries: Iterable[ErrorEntry], query_records: Iterable[Dict[str, Any]],
+              enrichments: Optional[Dict[str, Dict[str, Any]]] = None, top_n: int = 3) -> 'SuggestionIndex':
+        started = time.perf_counter()
+        enrichments = enrichments or {}
+        entries = {entry.id: entry for entry in entries}
+
+        popularity = Counter()
+        sessions = defaultdict(set)
+        queries = 0
+        for record in query_records:
+            entry_id = record.get('entry_id')
+            if entry_id not in entries:
+                continue
+            queries += 1
+            popularity[entry_id] += 1
+            if record.get('session'):
+                sessions[record['session']].add(entry_id)
+
+        cooccurrence: Dict[str, Counter] = defaultdict(Counter)
+        for looked_up in sessions.values():
+            for entry_id in looked_up:
+                for other in looked_up:
+                    if other != entry_id:
+                        cooccurrence[entry_id][other] += 1
+
+        categories = {}
+        by_category = defaultdict(list)
+        for entry_id, entry in entries.items():
+            enrichment = enrichments.get(entry.version_key())
+            categories[entry_id] = enrichment['category'] if enrichment else keyword_category(entry)
+            by_category[categories[entry_id]].append(entry_id)
+        for members in by_category.values():
+            members.sort(key=lambda entry_id: (-popularity[entry_id], entry_id))
+
+        related = {}
+        for entry_id in entries:
+            category = categories[entry_id]
+            # Only the category's most popular entries can outrank each other on category alone
+            candidates = set(cooccurrence[entry_id]) | set(by_category[category][:top_n + 1])
+            candidates.discard(entry_id)
+            scored = []
+            for other in candidates:
+                score = COOCCURRENCE_WEIGHT * cooccurrence[entry_id][other]
+                if categories[other] == category:
+                    score += CATEGORY_WEIGHT + math.log1p(popularity[other])
+                scored.append((-score, -popularity[other], other))
+            scored.sort()
+            titles = []
+            for _, _, other in scored:
+                title = entries[other].error_code
+                if title not in titles:
+                    titles.append(title)
+                if len(titles) == top_n:
+                    break
+            if titles:
+                related[entry_id] = titles
+
+        stats = {'entries': len(related), 'queries': queries, 'sessions': len(sessions), 'built_at': time.time(),
+                 'build_ms': round((time.perf_counter() - started) * 1000, 1)}
+        logger.info(f"Built suggestion index: {stats}")
+        return cls(related, stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.built_stats)
@@ -0,0 +1,71 @@
+import time
+import functools
+import contextvars
+from typing import Dict, List, Optional
+
+from .metrics import CACHE_LOOKUPS, STAGE_SECONDS, Timer
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('query_trace', default=None)
+
+
+class QueryTrace:
+    """What happened while answering one query: stage timings, cache hits and providers"""
+
+    def __init__(self, query: str, session_id: Optional[str] = None):
+        self.query = query
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.cache_hits: List[str] = []
+        self.providers: Dict[str, str] = {}
+        self.entry_id: Optional[str] = None
+        # Confluence page the answer came from, so cached answers can be invalidated per page
+        self.page_id: Optional[str] = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = round(self.stages.get(name, 0.0) + seconds * 1000, 2)
+
+    def hit(self, cache: str):
+        if cache not in self.cache_hits:
+            self.cache_hits.append(cache)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_trace(query: str, session_id: Optional[str] = None) -> QueryTrace:
+    """Begin tracing the current request (context); helpers below record into it"""
+    trace = QueryTrace(query, session_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current_trace.get()
+
+
+def _record_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(name).observe(seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+def trace_stage(name: str) -> Timer:
+    """
+    Time a stage into the stage latency histogram served at /metrics and, if
+    the current request is being traced, into its trace. Use it as a context
+    manager (`with trace_stage('fetch'):`) or to decorate a sync or async function.
+    """
+    return Timer(functools.partial(_record_stage, name))
+
+
+def trace_hit(cache: str):
+    CACHE_LOOKUPS.labels(cache, 'hit').inc()
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.hit(cache)
+
+
+def trace_miss(cache: str):
+    CACHE_LOOKUPS.labels(cache, 'miss').inc()
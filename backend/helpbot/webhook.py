@@ -0,0 +1,109 @@
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Header carrying "sha256=<hex HMAC of the raw body>", as sent by Confluence webhooks with a secret
+SIGNATURE_HEADER = 'X-Hub-Signature'
+
+UPDATE_EVENTS = {'page_created', 'page_updated', 'page_restored', 'page_moved'}
+REMOVAL_EVENTS = {'page_removed', 'page_trashed'}
+
+
+class WebhookError(ValueError):
+    """The webhook request is unsigned, wrongly signed or not a page event"""
+
+
+def sign(secret: str, body: bytes) -> str:
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]):
+    """Raise WebhookError unless signature is the HMAC-SHA256 of the raw body under secret"""
+    if not signature:
+        raise WebhookError(f"Missing {SIGNATURE_HEADER} header")
+    if not hmac.compare_digest(sign(secret, body), signature.strip()):
+        raise WebhookError("Signature does not match")
+
+
+def parse_event(body: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """
+    The (event, page_id) of a Confluence webhook payload. The event is None
+    for events other than page changes, which are acknowledged and ignored.
+    """
+    try:
+        payload = json.loads(body)
+        event = payload.get('event') or payload.get('webhookEvent')
+        page = payload.get('page') or {}
+    except (ValueError, AttributeError) as e:
+        raise WebhookError(f"Invalid payload: {e}")
+    if event not in UPDATE_EVENTS and event not in REMOVAL_EVENTS:
+        return None, None
+    page_id = page.get('id') if isinstance(page, dict) else None
+    if page_id is None:
+        raise WebhookError(f"{event} event without a page id")
+    return event, str(page_id)
+
+
+class PageRefreshQueue:
+    """
+    Pages waiting to be re-fetched after a webhook. Events for a page that is
+    already pending are merged, keeping the latest, so a burst of edits costs
+    one fetch. run() hands each page to `handler(event, page_id)` in turn.
+    """
+
+    def __init__(self, handler: Callable[[str, str], Awaitable[Any]]):
+        self.handler = handler
+        self._pending: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self.received = 0
+        self.merged = 0
+        self.applied = 0
+        self.failed = 0
+        self.last_applied_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, event: str, page_id: str):
+        self.received += 1
+        if page_id in self._pending:
+            self.merged += 1
+        # A pending page keeps its place in the queue but applies its latest event
+        self._pending[page_id] = event
+        self._wakeup.set()
+
+    async def drain(self):
+        """Apply every pending event, oldest page first"""
+        while self._pending:
+            page_id = next(iter(self._pending))
+            event = self._pending.pop(page_id)
+            try:
+                await self.handler(event, page_id)
+                self.applied += 1
+                self.last_applied_at = time.time()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Applying {event} for page {page_id} failed: {e}")
+
+    async def run(self):
+        """Background task: apply events as they arrive"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._pending),
+            'received': self.received,
+            'merged': self.merged,
+            'applied': self.applied,
+            'failed': self.failed,
+            'last_applied_at': self.last_applied_at,
+        }
@@ -0,0 +1,233 @@
+# Preload-then-fork multi-worker launcher
+import gc
+import os
+import time
+import signal
+import socket
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Seconds after a worker starts serving before it logs its shared vs private memory; by then
+# startup work (prewarming, first queries) has written to whatever pages it is going to un-share
+MEMORY_REPORT_DELAY_SECONDS = float(os.getenv("PREFORK_MEMORY_REPORT_SECONDS", 60))
+# A worker that dies sooner than this after being started counts as crashing on boot
+WORKER_MIN_UPTIME_SECONDS = float(os.getenv("WORKER_MIN_UPTIME_SECONDS", 10))
+WORKER_MAX_RESTART_DELAY_SECONDS = float(os.getenv("WORKER_MAX_RESTART_DELAY_SECONDS", 30))
+# Quick crashes in a row after which the master stops all workers and exits
+WORKER_MAX_QUICK_CRASHES = int(os.getenv("WORKER_MAX_QUICK_CRASHES", 5))
+
+
+def memory_report(pid: str = "self") -> Dict[str, int]:
+    """Return RSS split into shared and private kB from /proc/<pid>/smaps_rollup (Linux only)"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'shared_kb': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def format_memory_report(report: Dict[str, int]) -> str:
+    if not report:
+        return "memory report unavailable on this platform"
+    return (f"RSS {report['rss_kb'] / 1024:.1f} MB "
+            f"(shared {report['shared_kb'] / 1024:.1f} MB, private {report['private_kb'] / 1024:.1f} MB, "
+            f"PSS {report['pss_kb'] / 1024:.1f} MB)")
+
+
+class RestartPolicy:
+    """
+    When to respawn a worker that exited. Workers that die right after starting
+    are respawned after an exponentially growing delay, and after too many such
+    crashes in a row the master gives up instead of forking in a hot loop. A
+    worker that stayed up for a while is respawned at once.
+    """
+
+    def __init__(self, min_uptime: float = WORKER_MIN_UPTIME_SECONDS, base_delay: float = 0.5,
+                 max_delay: float = WORKER_MAX_RESTART_DELAY_SECONDS,
+                 max_quick_crashes: int = WORKER_MAX_QUICK_CRASHES):
+        self.min_uptime = min_uptime
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_quick_crashes = max_quick_crashes
+        self._started: Dict[int, float] = {}
+        self._quick_crashes: Dict[int, int] = {}
+
+    def started(self, worker_id: int, now: Optional[float] = None):
+        self._started[worker_id] = time.monotonic() if now is None else now
+
+    def exited(self, worker_id: int, now: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before respawning the worker, or None to give up"""
+        now = time.monotonic() if now is None else now
+        if now - self._started.get(worker_id, now) >= self.min_uptime:
+            self._quick_crashes[worker_id] = 0
+            return 0.0
+        crashes = self._quick_crashes.get(worker_id, 0) + 1
+        self._quick_crashes[worker_id] = crashes
+        if crashes > self.max_quick_crashes:
+            return None
+        return min(self.base_delay * 2 ** (crashes - 1), self.max_delay)
+
+
+def preload():
+    """
+    Load everything workers should share copy-on-write: the application
+    module (knowledge base or shared index, Ollama service, search backend),
+    the compiled matchers and, if requested, the embedding model.
+    """
+    # Keep the collector from touching (and thereby un-sharing) objects while we load
+    gc.disable()
+
+    from backend import app as app_module
+    from backend.helpbot import html_extractor
+
+    # Compiled matchers live at module level; touching them here keeps them in the master
+    html_extractor.HTMLExtractor().find_best_match("warm up", app_module.DEMO_ERROR_DATA)
+
+    if os.getenv("PRELOAD_EMBEDDINGS", "false").lower() == "true":
+        try:
+            from backend.helpers import get_embedding_function
+            get_embedding_function()
+        except Exception as e:
+            logger.warning(f"Embedding model not preloaded: {e}")
+
+    return app_module.app
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, worker_id: int, log_level: str):
+    """Body of a forked worker: serve the preloaded app on the inherited socket"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    # Each worker keeps its own counters; the label keeps scrapes of different workers apart
+    from backend.helpbot.metrics import REGISTRY
+    REGISTRY.set_constant_labels(worker=str(worker_id))
+
+    async def report_memory():
+        await asyncio.sleep(MEMORY_REPORT_DELAY_SECONDS)
+        logger.info(f"Worker {worker_id} (pid {os.getpid()}) after warm-up: {format_memory_report(memory_report())}")
+
+    async def schedule_memory_report():
+        # Right after fork nearly every page is still shared; the report only means something later
+        asyncio.get_running_loop().create_task(report_memory())
+
+    app.router.on_startup.append(schedule_memory_report)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info",
+          restart_policy: Optional[RestartPolicy] = None):
+    """
+    Preload the app once in this process, then fork workers that share it
+    copy-on-write. Send the master SIGUSR1 to log every worker's memory split.
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run("backend.app:app", host=host, port=port, log_level=log_level)
+        return
+
+    sock = _bind(host, port)
+    app = preload()
+
+    # Move everything loaded so far into the permanent generation: collections in the
+    # workers then never walk (and write refcounts/gc headers on) the shared pages
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Master {os.getpid()} preloaded app, {gc.get_freeze_count()} objects frozen: "
+                f"{format_memory_report(memory_report())}")
+
+    restart_policy = restart_policy or RestartPolicy()
+    children: Dict[int, int] = {}
+    shutting_down = False
+    gave_up = False
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, worker_id, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = worker_id
+        restart_policy.started(worker_id)
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(signum, frame):
+        for pid, worker_id in sorted(children.items(), key=lambda item: item[1]):
+            logger.info(f"Worker {worker_id} (pid {pid}): {format_memory_report(memory_report(str(pid)))}")
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, report_memory)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+    logger.info(f"Started {workers} workers on {host}:{port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = children.pop(pid, None)
+        if worker_id is None or shutting_down:
+            continue
+        delay = restart_policy.exited(worker_id)
+        if delay is None:
+            logger.error(f"Worker {worker_id} (pid {pid}) keeps crashing on startup (status {status}) - "
+                         f"stopping all workers")
+            gave_up = True
+            stop(None, None)
+            continue
+        logger.warning(f"Worker {worker_id} (pid {pid}) exited with status {status} - restarting in {delay:.1f}s")
+        time.sleep(delay)
+        if not shutting_down:
+            spawn(worker_id)
+
+    sock.close()
+    logger.info("All workers stopped")
+    if gave_up:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve(
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", 8000)),
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+    )
@@ -6,7 +6,8 @@
         apiUrl: window.HELPBOT_API_URL || 'http://localhost:8000',
         position: window.HELPBOT_POSITION || 'bottom-right', // bottom-right, bottom-left, top-right, top-left
         theme: window.HELPBOT_THEME || 'default', // default, dark, light
-        defaultMode: window.HELPBOT_DEFAULT_MODE || 'widget' // widget, sidebar
+        defaultMode: window.HELPBOT_DEFAULT_MODE || 'widget', // widget, sidebar
+        autocompleteDelay: window.HELPBOT_AUTOCOMPLETE_DELAY || 150 // ms of typing pause before asking for completions
     };
 
     // Prevent multiple instances
@@ -436,6 +437,40 @@
             background: #e9ecef;
         }
 
+        .helpbot-input-group {
+            position: relative;
+        }
+
+        .helpbot-autocomplete {
+            display: none;
+            position: absolute;
+            left: 0;
+            right: 0;
+            z-index: 10;
+            background: white;
+            border: 1px solid #e5e7eb;
+            border-radius: 8px;
+            box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
+            max-height: 220px;
+            overflow-y: auto;
+        }
+
+        .helpbot-autocomplete-item {
+            padding: 8px 12px;
+            font-size: 12px;
+            cursor: pointer;
+        }
+
+        .helpbot-autocomplete-item.active,
+        .helpbot-autocomplete-item:hover {
+            background: #eef2ff;
+        }
+
+        .helpbot-autocomplete-item small {
+            color: #6b7280;
+            margin-left: 6px;
+        }
+
         @media (max-width: 480px) {
             .helpbot-widget:not(.sidebar-mode) .helpbot-panel {
                 width: calc(100vw - 40px);
@@ -473,6 +508,7 @@
                         <div class="helpbot-input-group">
                             <label for="helpbot-input">Describe your error:</label>
                             <textarea id="helpbot-input" placeholder="Example: Error Log 1, connection timeout, database error..."></textarea>
+                            <div id="helpbot-autocomplete" class="helpbot-autocomplete"></div>
                         </div>
                         <button id="helpbot-analyze" class="helpbot-btn helpbot-btn-primary">🔍 Analyze Error</button>
                     </div>
@@ -525,6 +561,14 @@
         constructor() {
             this.isOpen = false;
             this.isSidebarMode = HELPBOT_CONFIG.defaultMode === 'sidebar';
+            // Groups this page's queries so the server can learn which errors are looked up together
+            this.sessionId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+            // Completions per typed prefix, so backspacing and retyping never asks the server twice
+            this.autocompleteCache = new Map();
+            this.autocompleteTimer = null;
+            this.autocompleteRequest = null;
+            this.autocompleteItems = [];
+            this.autocompleteIndex = -1;
             this.init();
         }
 
@@ -546,6 +590,7 @@
             this.loading = document.getElementById('helpbot-loading');
             this.results = document.getElementById('helpbot-results');
             this.error = document.getElementById('helpbot-error');
+            this.autocompleteList = document.getElementById('helpbot-autocomplete');
 
             // Set initial mode
             if (this.isSidebarMode) {
@@ -571,11 +616,21 @@
 
             // Enter key support
             this.input.addEventListener('keydown', (e) => {
+                if (this.handleAutocompleteKey(e)) {
+                    return;
+                }
                 if (e.key === 'Enter' && e.ctrlKey) {
                     this.analyzeError();
                 }
             });
 
+            // Typeahead, once the user pauses typing
+            this.input.addEventListener('input', () => {
+                clearTimeout(this.autocompleteTimer);
+                this.autocompleteTimer = setTimeout(() => this.autocomplete(), HELPBOT_CONFIG.autocompleteDelay);
+            });
+            this.input.addEventListener('blur', () => setTimeout(() => this.hideAutocomplete(), 150));
+
             // Close on outside click (widget mode only)
             document.addEventListener('click', (e) => {
                 if (!this.isSidebarMode && this.isOpen && 
@@ -653,7 +708,107 @@
             }
         }
 
+        async autocomplete() {
+            const prefix = this.input.value.trim().toLowerCase();
+            if (prefix.length < 2) {
+                this.hideAutocomplete();
+                return;
+            }
+            if (this.autocompleteCache.has(prefix)) {
+                this.showAutocomplete(this.autocompleteCache.get(prefix));
+                return;
+            }
+
+            // Only the latest prefix matters; drop a slower earlier request
+            if (this.autocompleteRequest) {
+                this.autocompleteRequest.abort();
+            }
+            this.autocompleteRequest = new AbortController();
+            try {
+                const response = await fetch(
+                    `${HELPBOT_CONFIG.apiUrl}/autocomplete?q=${encodeURIComponent(prefix)}`,
+                    { signal: this.autocompleteRequest.signal }
+                );
+                if (!response.ok) {
+                    return;
+                }
+                const result = await response.json();
+                this.autocompleteCache.set(prefix, result.suggestions || []);
+                if (this.input.value.trim().toLowerCase() === prefix) {
+                    this.showAutocomplete(result.suggestions || []);
+                }
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    console.warn('HelpBot autocomplete failed:', error);
+                }
+            }
+        }
+
+        showAutocomplete(suggestions) {
+            this.autocompleteItems = suggestions;
+            this.autocompleteIndex = -1;
+            this.autocompleteList.innerHTML = '';
+            if (!suggestions.length) {
+                this.hideAutocomplete();
+                return;
+            }
+            suggestions.forEach((suggestion, index) => {
+                const item = document.createElement('div');
+                item.className = 'helpbot-autocomplete-item';
+                item.textContent = suggestion.text;
+                if (suggestion.kind === 'entry') {
+                    const hint = document.createElement('small');
+                    hint.textContent = suggestion.query;
+                    item.appendChild(hint);
+                }
+                item.addEventListener('mousedown', (e) => {
+                    e.preventDefault();
+                    this.pickAutocomplete(index);
+                });
+                this.autocompleteList.appendChild(item);
+            });
+            this.autocompleteList.style.display = 'block';
+        }
+
+        hideAutocomplete() {
+            this.autocompleteItems = [];
+            this.autocompleteIndex = -1;
+            this.autocompleteList.style.display = 'none';
+        }
+
+        pickAutocomplete(index) {
+            // Entries fill in their "Error Log #<id>" query, which the server answers by id
+            this.input.value = this.autocompleteItems[index].query;
+            this.hideAutocomplete();
+            this.input.focus();
+        }
+
+        handleAutocompleteKey(e) {
+            const count = this.autocompleteItems.length;
+            if (!count) {
+                return false;
+            }
+            if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                const step = e.key === 'ArrowDown' ? 1 : count - 1;
+                this.autocompleteIndex = this.autocompleteIndex < 0
+                    ? (e.key === 'ArrowDown' ? 0 : count - 1)
+                    : (this.autocompleteIndex + step) % count;
+                Array.from(this.autocompleteList.children).forEach((item, index) => {
+                    item.classList.toggle('active', index === this.autocompleteIndex);
+                });
+            } else if (e.key === 'Enter' && !e.ctrlKey && this.autocompleteIndex >= 0) {
+                this.pickAutocomplete(this.autocompleteIndex);
+            } else if (e.key === 'Escape') {
+                this.hideAutocomplete();
+            } else {
+                return false;
+            }
+            e.preventDefault();
+            return true;
+        }
+
         async analyzeError() {
+            this.hideAutocomplete();
             const query = this.input.value.trim();
             
             if (!query) {
@@ -673,7 +828,7 @@
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({ query })
+                    body: JSON.stringify({ query, session_id: this.sessionId })
                 });
 
                 if (!response.ok) {
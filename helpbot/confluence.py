@@ -2,7 +2,8 @@ import os
 import time
 import base64
 import requests
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,10 +11,20 @@ load_dotenv()
 BASE_URL = os.getenv("CONFLUENCE_BASE_URL")
 USERNAME = os.getenv("CONFLUENCE_USERNAME")
 API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN")
-SPACE_KEY = os.getenv("CONFLUENCE_SPACE_KEY")
+# Comma-separated spaces to search; CONFLUENCE_SPACE_KEY still works for a single space
+SPACE_KEYS = [key.strip() for key in (os.getenv("CONFLUENCE_SPACE_KEYS") or os.getenv("CONFLUENCE_SPACE_KEY") or "").split(",")
+              if key.strip()]
+SPACE_KEY = SPACE_KEYS[0] if SPACE_KEYS else None
+WEBHOOK_SECRET = os.getenv("CONFLUENCE_WEBHOOK_SECRET")
 
 _CACHE = {}
-_CACHE_TTL_SECONDS = 300
+# With webhooks pushing page changes the TTL is only a safety net for missed events
+_CACHE_TTL_SECONDS = int(os.getenv("CONFLUENCE_CACHE_TTL_SECONDS", "3600" if WEBHOOK_SECRET else "300"))
+# Each space is cached on its own; CONFLUENCE_CACHE_TTL_SECONDS_<SPACE> overrides the TTL per space
+_SPACE_TTL_SECONDS = {key: int(os.getenv(f"CONFLUENCE_CACHE_TTL_SECONDS_{key.upper()}", _CACHE_TTL_SECONDS))
+                      for key in SPACE_KEYS}
+# Per-space size and fetch time of the last refresh
+SPACE_STATS: Dict[str, Dict[str, Any]] = {}
 
 class ConfigError(Exception):
     pass
@@ -29,10 +40,23 @@ def _get_auth_header() -> Dict[str, str]:
 
 def test_connection() -> Dict[str, Any]:
     """
-    Tests the connection to Confluence by fetching space details.
-    Returns a dictionary with status and a detailed message.
+    Tests the connection to every configured space. Returns the first
+    failure, or a success message naming all spaces.
     """
-    url = f"{BASE_URL}/rest/api/space/{SPACE_KEY}"
+    names = []
+    for space_key in SPACE_KEYS:
+        result = _test_space(space_key)
+        if result["status"] != "success":
+            return result
+        names.append(result["name"])
+    return {
+        "status": "success",
+        "message": f"Successfully connected to {', '.join(repr(name) for name in names)}."
+    }
+
+def _test_space(space_key: str) -> Dict[str, Any]:
+    """Tests the connection to one space by fetching its details."""
+    url = f"{BASE_URL}/rest/api/space/{space_key}"
     print(f"--- [Connection Test] ---")
     print(f"  URL: {url}")
     try:
@@ -44,13 +68,14 @@ def test_connection() -> Dict[str, Any]:
         print(f"  Success! Found space: {space_data.get('name')}")
         return {
             "status": "success",
+            "name": space_data.get('name'),
             "message": f"Successfully connected to space '{space_data.get('name')}'."
         }
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
             message = "Authentication failed (401). Check your CONFLUENCE_USERNAME and CONFLUENCE_API_TOKEN."
         elif e.response.status_code == 404:
-            message = f"Space '{SPACE_KEY}' not found (404). Check your CONFLUENCE_SPACE_KEY and that the user has access."
+            message = f"Space '{space_key}' not found (404). Check your CONFLUENCE_SPACE_KEYS and that the user has access."
         else:
             message = f"An HTTP error occurred: {e.response.status_code} {e.response.reason}"
         print(f"  Error: {message}")
@@ -63,21 +88,46 @@ def test_connection() -> Dict[str, Any]:
         print("--- [Test End] ---")
 
 
+def _page_record(page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The cached form of a page fetched with body.view, or None if it has no body."""
+    html_content = page.get("body", {}).get("view", {}).get("value", "")
+    if not html_content:
+        return None
+    return {
+        "id": str(page.get("id")),
+        "title": page.get("title", "Untitled"),
+        "url": f"{BASE_URL.rstrip('/')}{page.get('_links', {}).get('webui', '')}",
+        "html": html_content
+    }
+
+
 def fetch_all_pages_in_space() -> List[Dict[str, Any]]:
     """
-    Fetches all pages from the configured Confluence space with caching.
+    Fetches all pages from every configured space. Spaces are fetched
+    concurrently and cached separately, so a large space being refreshed
+    doesn't hold up the others.
+    """
+    with ThreadPoolExecutor(max_workers=len(SPACE_KEYS)) as pool:
+        per_space = list(pool.map(fetch_space_pages, SPACE_KEYS))
+    return [page for pages in per_space for page in pages]
+
+
+def fetch_space_pages(space_key: str) -> List[Dict[str, Any]]:
     """
-    cache_key = f"space_{SPACE_KEY}_pages"
+    Fetches all pages from one Confluence space with caching.
+    """
+    cache_key = f"space_{space_key}_pages"
     cached = _CACHE.get(cache_key)
-    if cached and (time.time() - cached['timestamp'] < _CACHE_TTL_SECONDS):
-        print("--- [Fetching Pages] ---")
+    if cached and (time.time() - cached['timestamp'] < _SPACE_TTL_SECONDS[space_key]):
+        print(f"--- [Fetching Pages: {space_key}] ---")
         print("  Returning pages from cache.")
         print("--- [Fetch End] ---")
         return cached['data']
 
-    print("--- [Fetching Pages] ---")
+    print(f"--- [Fetching Pages: {space_key}] ---")
     print("  Cache empty or expired. Fetching fresh from Confluence.")
     
+    started = time.perf_counter()
     all_pages = []
     start = 0
     limit = 50
@@ -86,7 +136,7 @@ def fetch_all_pages_in_space() -> List[Dict[str, Any]]:
     while True:
         url = f"{BASE_URL}/rest/api/content/search"
         params = {
-            "cql": f"space = '{SPACE_KEY}' and type = page",
+            "cql": f"space = '{space_key}' and type = page",
             "limit": limit,
             "start": start,
             "expand": "body.view"
@@ -98,13 +148,9 @@ def fetch_all_pages_in_space() -> List[Dict[str, Any]]:
             results = data.get("results", [])
             
             for page in results:
-                html_content = page.get("body", {}).get("view", {}).get("value", "")
-                if html_content:
-                    all_pages.append({
-                        "title": page.get("title", "Untitled"),
-                        "url": f"{BASE_URL.rstrip('/')}{page.get('_links', {}).get('webui', '')}",
-                        "html": html_content
-                    })
+                record = _page_record(page)
+                if record:
+                    all_pages.append(record)
             
             if len(results) < limit:
                 break
@@ -114,6 +160,54 @@ def fetch_all_pages_in_space() -> List[Dict[str, Any]]:
             raise  # Re-raise the exception to be handled by the caller
 
     _CACHE[cache_key] = {"timestamp": time.time(), "data": all_pages}
-    print(f"  Fetched and cached {len(all_pages)} pages.")
+    SPACE_STATS[space_key] = {
+        "pages": len(all_pages),
+        "fetch_ms": round((time.perf_counter() - started) * 1000, 1),
+        "fetched_at": time.time(),
+    }
+    print(f"  Fetched and cached {len(all_pages)} pages in {SPACE_STATS[space_key]['fetch_ms']} ms.")
     print("--- [Fetch End] ---")
-    return all_pages 
\ No newline at end of file
+    return all_pages
+
+
+def fetch_page(page_id: str) -> Dict[str, Any]:
+    """Fetches a single page with its rendered body and space."""
+    url = f"{BASE_URL}/rest/api/content/{page_id}"
+    headers = {"Accept": "application/json", **_get_auth_header()}
+    response = requests.get(url, headers=headers, params={"expand": "body.view,space"}, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def apply_page_event(event: str, page_id: str, removed: bool = False):
+    """
+    Updates the cached spaces in place after a webhook: a removed page is
+    dropped and a changed page is re-fetched on its own, instead of waiting
+    for the TTL to expire and re-downloading the whole space.
+    """
+    print(f"--- [Page Event] ---")
+    print(f"  {event} for page {page_id}")
+    cached_spaces = {key: _CACHE[f"space_{key}_pages"] for key in SPACE_KEYS if f"space_{key}_pages" in _CACHE}
+    if not cached_spaces:
+        # Nothing cached yet; the next fetch reads the current spaces anyway
+        print("  No cached pages to update.")
+        return
+    page = None
+    if not removed:
+        try:
+            page = fetch_page(page_id)
+        except requests.exceptions.RequestException as e:
+            # Can't tell what changed: expire the caches so the next request refetches
+            print(f"  Failed to fetch page: {e}. Expiring the cache.")
+            for key in cached_spaces:
+                _CACHE.pop(f"space_{key}_pages", None)
+            return
+    for space_key, cached in cached_spaces.items():
+        # The page leaves whichever space held it, and rejoins the one it is in now
+        pages = [cached_page for cached_page in cached['data'] if cached_page.get("id") != page_id]
+        record = _page_record(page) if page and page.get("space", {}).get("key", SPACE_KEY) == space_key else None
+        if record:
+            pages.append(record)
+        cached['data'] = pages
+        print(f"  {space_key} cache now holds {len(pages)} pages.")
+    print("--- [Event End] ---")
@@ -1,6 +1,8 @@
 import re
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List
+
+from .models import ErrorLog
 
 # This single regex is designed to capture the three key parts from a paragraph.
 # It looks for "Error Log #<ID>:", then "Issue:" or "Explanation:", and finally "Resolution:" or "Solution:".
@@ -13,7 +15,7 @@ LOG_PATTERN = re.compile(
     re.IGNORECASE | re.DOTALL
 )
 
-def extract_issues_from_html(html_content: str) -> List[Dict[str, str]]:
+def extract_issues_from_html(html_content: str) -> List[ErrorLog]:
     """
     Parses HTML from a Confluence page and extracts structured error log data.
 
@@ -21,14 +23,10 @@ def extract_issues_from_html(html_content: str) -> List[Dict[str, str]]:
         html_content: The HTML string of the Confluence page body.
 
     Returns:
-        A list of dictionaries, where each dictionary represents one found error log.
+        A list of ErrorLog records, one per found error log.
         Example:
         [
-            {
-                "id": "3999",
-                "issue": "can not find cat",
-                "resolution": "find cat"
-            },
+            ErrorLog(id="3999", issue="can not find cat", resolution="find cat"),
             ...
         ]
     """
@@ -43,10 +41,10 @@ def extract_issues_from_html(html_content: str) -> List[Dict[str, str]]:
         text = p.get_text(separator=" ", strip=True)
         match = LOG_PATTERN.search(text)
         if match:
-            found_issues.append({
-                "id": match.group(1),
-                "issue": match.group("issue").strip(),
-                "resolution": (match.group("resolution") or "Not specified").strip()
-            })
+            found_issues.append(ErrorLog(
+                id=match.group(1),
+                issue=match.group("issue").strip(),
+                resolution=(match.group("resolution") or "Not specified").strip()
+            ))
             
     return found_issues 
\ No newline at end of file
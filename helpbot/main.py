@@ -1,9 +1,10 @@
 import re
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 from . import confluence, extractor, models
+from backend.helpbot.webhook import SIGNATURE_HEADER, REMOVAL_EVENTS, WebhookError, parse_event, verify_signature
 
 app = FastAPI(title="HelpBot 2.0")
 templates = Jinja2Templates(directory="templates")
@@ -24,6 +25,32 @@ async def get_test_connection():
     """Endpoint to allow the user to trigger a connection test from the UI."""
     return confluence.test_connection()
 
+@app.get("/space-stats")
+async def get_space_stats():
+    """Pages and last fetch time of each configured space."""
+    return {space_key: confluence.SPACE_STATS.get(space_key) for space_key in confluence.SPACE_KEYS}
+
+@app.post("/webhooks/confluence", status_code=202)
+async def confluence_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    Receives signed Confluence page events and updates the cached page in the
+    background, so edits show up without waiting for the cache TTL.
+    """
+    if not confluence.WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="CONFLUENCE_WEBHOOK_SECRET is not configured.")
+    body = await request.body()
+    try:
+        verify_signature(confluence.WEBHOOK_SECRET, body, request.headers.get(SIGNATURE_HEADER))
+    except WebhookError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    try:
+        event, page_id = parse_event(body)
+    except WebhookError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if event:
+        background_tasks.add_task(confluence.apply_page_event, event, page_id, event in REMOVAL_EVENTS)
+    return {"accepted": bool(event), "event": event, "page_id": page_id}
+
 @app.post("/analyze", response_model=models.AnalyzeResponse)
 async def analyze_error(req: models.AnalyzeRequest):
     """
@@ -41,8 +68,8 @@ async def analyze_error(req: models.AnalyzeRequest):
         for page in all_pages:
             issues_on_page = extractor.extract_issues_from_html(page["html"])
             for issue in issues_on_page:
-                issue['source_title'] = page['title']
-                issue['source_url'] = page['url']
+                issue.source_title = page['title']
+                issue.source_url = page['url']
             all_issues.extend(issues_on_page)
         
         print(f"  Found {len(all_issues)} structured logs in total.")
@@ -55,14 +82,14 @@ async def analyze_error(req: models.AnalyzeRequest):
         if target_id:
             print(f"  Searching for specific Error ID: {target_id}")
             for issue in all_issues:
-                if issue["id"] == target_id:
+                if issue.id == target_id:
                     best_match = issue
                     break
         else:
             # If no ID, fall back to a simple text search.
             print(f"  No ID found, performing text search.")
             for issue in all_issues:
-                if req.error_text.lower() in issue["issue"].lower():
+                if req.error_text.lower() in issue.issue.lower():
                     best_match = issue
                     break
         
@@ -70,16 +97,16 @@ async def analyze_error(req: models.AnalyzeRequest):
             print(f"  No match found for query.")
             raise HTTPException(status_code=404, detail="Could not find a matching error log in the knowledge base.")
 
-        print(f"  Found best match: Error #{best_match['id']} from page '{best_match['source_title']}'")
+        print(f"  Found best match: Error #{best_match.id} from page '{best_match.source_title}'")
         print(f"--- [Analyze End] ---")
 
         # 4. Return the structured response.
         return models.AnalyzeResponse(
-            issue=f"Error Log #{best_match['id']}: {best_match['issue']}",
-            explanation=best_match['issue'],
-            resolution=best_match['resolution'],
-            source_title=best_match['source_title'],
-            source_url=best_match['source_url']
+            issue=f"Error Log #{best_match.id}: {best_match.issue}",
+            explanation=best_match.issue,
+            resolution=best_match.resolution,
+            source_title=best_match.source_title,
+            source_url=best_match.source_url
         )
 
     except confluence.ConfigError as e:
@@ -1,6 +1,16 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
 from typing import List, Optional
 
+@dataclass(slots=True)
+class ErrorLog:
+    """A structured error log found on a Confluence page (slotted to keep large spaces compact)."""
+    id: str
+    issue: str
+    resolution: str
+    source_title: str = ""
+    source_url: str = ""
+
 class AnalyzeRequest(BaseModel):
     error_text: str
 
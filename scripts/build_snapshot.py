@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Build or incrementally refresh the on-disk knowledge base snapshot.
+
+Run this before `docker build` (or as a build step) so the image ships with
+a warm knowledge base and new replicas can answer from the first request:
+
+    python scripts/build_snapshot.py --output data/kb_snapshot.db
+
+Run it as the periodic sync job with --shared-index to publish the
+memory-mapped index that multi-worker deployments map read-only.
+
+With --enrich, severity, category and related queries are generated once per
+new or changed entry and stored in the snapshot, so /query only needs the LLM
+for the conversational reply.
+
+With several spaces in CONFLUENCE_SPACE_KEYS, each space is synced
+concurrently into its own snapshot next to --output (kb_snapshot.OPS.db),
+which the app loads as that space's shard. --output then holds all spaces
+combined, for the local search backend and the shared index.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Make the backend package importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.helpbot.confluence_client import ConfluenceClient
+from backend.helpbot.knowledge_base import KnowledgeBase
+from backend.helpbot.snapshot import load_snapshot, save_snapshot, SnapshotError
+from backend.helpbot.shared_index import publish_shared_index
+from backend.helpbot.enrichment import enrich_knowledge_base
+from backend.helpbot.shards import ShardedKnowledgeBase, SpaceShard, parse_space_keys, shard_snapshot_path
+
+load_dotenv('.env')
+
+
+def enrich(knowledge_base: KnowledgeBase, concurrency: int):
+    from backend.helpbot.ollama_service import OllamaService
+    from backend.helpbot.scheduler import LLMScheduler
+
+    service = OllamaService()
+    if not service.is_available():
+        print("Warning: no AI provider available - skipping enrichment", file=sys.stderr)
+        return None
+    # A batch job: run exactly `concurrency` generations at a time and never shed any of them
+    service.scheduler = LLMScheduler(max_concurrency=concurrency, max_queue=concurrency,
+                                     shed_queue_depth=concurrency)
+
+    async def run():
+        try:
+            return await enrich_knowledge_base(knowledge_base, service, concurrency=concurrency)
+        finally:
+            await service.aclose()
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the HelpBot knowledge base snapshot")
+    parser.add_argument('--output', default=os.getenv("KNOWLEDGE_BASE_SNAPSHOT", "data/kb_snapshot.db"),
+                        help="Snapshot file to write")
+    parser.add_argument('--shared-index', default=os.getenv("KNOWLEDGE_BASE_SHARED_INDEX"),
+                        help="Also publish the memory-mapped index read by all worker processes")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes used to parse and extract fetched pages")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore any existing snapshot and re-fetch every page")
+    parser.add_argument('--enrich', action='store_true',
+                        help="Precompute severity, category and suggestions for new or changed entries")
+    parser.add_argument('--enrich-concurrency', type=int, default=int(os.getenv("ENRICH_CONCURRENCY", 2)),
+                        help="Entries enriched at once; keep at or below OLLAMA_NUM_PARALLEL")
+    args = parser.parse_args()
+
+    url = os.getenv("CONFLUENCE_URL")
+    username = os.getenv("CONFLUENCE_USERNAME")
+    api_token = os.getenv("CONFLUENCE_API_TOKEN")
+    space_keys = parse_space_keys(os.getenv("CONFLUENCE_SPACE_KEYS") or os.getenv("CONFLUENCE_SPACE_KEY"))
+    if not all([url, username, api_token, space_keys]):
+        print("Error: Confluence environment variables are not fully set. Check your .env file.", file=sys.stderr)
+        sys.exit(1)
+
+    client = ConfluenceClient(url, username, api_token, space_keys[0], space_keys=space_keys)
+    sharded = len(space_keys) > 1
+    shards = []
+    for space_key in space_keys:
+        shard = SpaceShard(space_key, KnowledgeBase(),
+                           shard_snapshot_path(args.output, space_key) if sharded else args.output,
+                           client=client.for_space(space_key))
+        if not args.full and os.path.exists(shard.snapshot_path):
+            try:
+                load_snapshot(shard.snapshot_path, shard.knowledge_base)
+                print(f"Loaded existing snapshot of {space_key} with {len(shard.knowledge_base.pages)} pages "
+                      f"- refreshing incrementally")
+            except SnapshotError as e:
+                print(f"Existing snapshot of {space_key} unusable ({e}) - rebuilding from scratch")
+        shards.append(shard)
+    knowledge_base = ShardedKnowledgeBase(shards)
+
+    started = time.time()
+    try:
+        # Spaces sync concurrently and share the extraction processes
+        with ProcessPoolExecutor(max_workers=args.processes) as pool, \
+                ThreadPoolExecutor(max_workers=len(shards)) as spaces:
+            results = list(spaces.map(lambda shard: shard.knowledge_base.refresh(shard.client, pool=pool), shards))
+    except Exception as e:
+        print(f"Error refreshing from Confluence: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    enrich_stats = Counter()
+    for shard in shards:
+        if args.enrich:
+            enrich_stats.update(enrich(shard.knowledge_base, args.enrich_concurrency) or {})
+        save_snapshot(shard.knowledge_base, shard.snapshot_path)
+
+    combined = knowledge_base.merged()
+    if sharded:
+        save_snapshot(combined, args.output)
+    if args.shared_index:
+        publish_shared_index(combined, args.shared_index)
+        print(f"Shared index published to {args.shared_index}")
+    print(f"Snapshot written to {args.output} in {time.time() - started:.1f}s")
+    for shard, stats in zip(shards, results):
+        print(f"  {shard.space_key}: Pages: {len(shard.knowledge_base.pages)}  Entries: {len(shard.knowledge_base)}  "
+              f"Added: {stats['added']}  Updated: {stats['updated']}  Removed: {stats['removed']}  "
+              f"Unchanged: {stats['unchanged']}")
+    if enrich_stats:
+        print(f"  Enriched: {enrich_stats['enriched']}  Reused: {enrich_stats['reused']}  Failed: {enrich_stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
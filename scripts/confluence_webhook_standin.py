@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Stand in for Confluence and post signed synthetic page events to a running
+HelpBot, to try the webhook without configuring one in Confluence:
+
+    python scripts/confluence_webhook_standin.py page_updated 123456
+    python scripts/confluence_webhook_standin.py page_removed 123456 --url http://localhost:8000
+
+The secret defaults to CONFLUENCE_WEBHOOK_SECRET from the environment or .env.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import requests
+from dotenv import load_dotenv
+
+# Make the backend package importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.helpbot.webhook import SIGNATURE_HEADER, UPDATE_EVENTS, REMOVAL_EVENTS, sign
+
+load_dotenv('.env')
+
+
+def build_event(event: str, page_id: str, space_key: str = '') -> bytes:
+    """A payload shaped like Confluence's page webhooks"""
+    return json.dumps({
+        'event': event,
+        'timestamp': int(time.time() * 1000),
+        'page': {'id': page_id, 'spaceKey': space_key},
+    }).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('event', choices=sorted(UPDATE_EVENTS | REMOVAL_EVENTS))
+    parser.add_argument('page_id')
+    parser.add_argument('--url', default='http://localhost:8000', help='HelpBot base URL')
+    parser.add_argument('--secret', default=os.getenv('CONFLUENCE_WEBHOOK_SECRET'))
+    parser.add_argument('--space', default=os.getenv('CONFLUENCE_SPACE_KEY', ''))
+    parser.add_argument('--unsigned', action='store_true', help='omit the signature (expect a 401)')
+    args = parser.parse_args()
+
+    if not args.secret and not args.unsigned:
+        parser.error('--secret or CONFLUENCE_WEBHOOK_SECRET is required')
+
+    body = build_event(args.event, args.page_id, args.space)
+    headers = {'Content-Type': 'application/json'}
+    if not args.unsigned:
+        headers[SIGNATURE_HEADER] = sign(args.secret, body)
+    response = requests.post(f"{args.url.rstrip('/')}/webhooks/confluence", data=body, headers=headers, timeout=10)
+    print(f"{response.status_code} {response.text}")
+    return 0 if response.status_code == 202 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
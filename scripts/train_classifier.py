@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Train the local severity/category classifier on the labels the LLM produced.
+
+The app appends every LLM analysis to the label file; run this periodically
+to (re)train the model the app loads at startup:
+
+    python scripts/train_classifier.py --output data/classifier.json
+
+It reports accuracy, the share of queries the model would answer without the
+LLM at the configured confidence threshold, and prediction latency, all on a
+held-out split, before refitting on every label and writing the model.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from dotenv import load_dotenv
+
+# Make the backend package importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.helpbot.classifier import ErrorClassifier, LabelStore, LABELS
+
+load_dotenv('.env')
+
+
+def evaluate(classifier: ErrorClassifier, labels, threshold: float):
+    correct = {head: 0 for head in LABELS}
+    confident = confident_correct = 0
+    latencies = []
+    for label in labels:
+        started = time.perf_counter()
+        prediction = classifier.predict(label['text'])
+        latencies.append(time.perf_counter() - started)
+        hits = {head: prediction[head][0] == label[head] for head in LABELS}
+        for head, hit in hits.items():
+            correct[head] += hit
+        if all(confidence >= threshold for _, confidence in prediction.values()):
+            confident += 1
+            confident_correct += all(hits.values())
+    latencies.sort()
+    return {
+        'accuracy': {head: count / len(labels) for head, count in correct.items()},
+        'local_rate': confident / len(labels),
+        'local_accuracy': confident_correct / confident if confident else None,
+        'mean_us': sum(latencies) / len(latencies) * 1e6,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the HelpBot severity/category classifier")
+    parser.add_argument('--labels', default=os.getenv("CLASSIFIER_LABELS_PATH", "data/llm_labels.jsonl"),
+                        help="JSONL file of LLM labels collected by the app")
+    parser.add_argument('--output', default=os.getenv("CLASSIFIER_MODEL_PATH", "data/classifier.json"),
+                        help="Model file to write")
+    parser.add_argument('--holdout', type=float, default=0.2, help="Share of labels held out for evaluation")
+    parser.add_argument('--epochs', type=int, default=15, help="Training passes over the labels")
+    parser.add_argument('--threshold', type=float, default=float(os.getenv("CLASSIFIER_CONFIDENCE", 0.8)),
+                        help="Confidence below which the app escalates to the LLM")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    labels = LabelStore(args.labels).load()
+    if len(labels) < 10:
+        print(f"Error: need at least 10 labels in {args.labels}, found {len(labels)}", file=sys.stderr)
+        sys.exit(1)
+
+    random.Random(args.seed).shuffle(labels)
+    split = max(1, int(len(labels) * args.holdout))
+    held_out, training = labels[:split], labels[split:]
+
+    started = time.time()
+    classifier = ErrorClassifier.train(training, epochs=args.epochs, seed=args.seed)
+    print(f"Trained on {len(training)} labels in {time.time() - started:.1f}s, evaluating on {len(held_out)}")
+    report = evaluate(classifier, held_out, args.threshold)
+    for head, accuracy in report['accuracy'].items():
+        print(f"  {head.capitalize()} accuracy: {accuracy:.1%}")
+    local_accuracy = f"{report['local_accuracy']:.1%}" if report['local_accuracy'] is not None else "n/a"
+    print(f"  Answered locally at confidence >= {args.threshold}: {report['local_rate']:.1%}"
+          f" (both labels correct: {local_accuracy})")
+    print(f"  Prediction latency: mean {report['mean_us']:.0f}us  p99 {report['p99_us']:.0f}us")
+
+    # The held-out numbers describe the method; ship a model that has seen every label
+    classifier = ErrorClassifier.train(labels, epochs=args.epochs, seed=args.seed)
+    classifier.save(args.output)
+    print(f"Model written to {args.output} ({len(labels)} labels)")
+
+
+if __name__ == "__main__":
+    main()
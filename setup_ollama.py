@@ -80,6 +80,24 @@ def pull_model(model_name="llama3.2"):
         print(f"❌ Failed to pull {model_name}: {stderr}")
         return False
 
+def preload_model(model_name="llama3.2", keep_alive="30m"):
+    """Load the model into memory now so the first HelpBot query doesn't pay for it"""
+    print(f"🔥 Loading {model_name} into memory (keep_alive={keep_alive})...")
+    try:
+        response = requests.post(
+            "http://localhost:11434/api/generate",
+            json={"model": model_name, "prompt": "", "stream": False, "keep_alive": keep_alive},
+            timeout=300
+        )
+        if response.status_code == 200:
+            load_seconds = response.json().get("load_duration", 0) / 1e9
+            print(f"✅ {model_name} loaded in {load_seconds:.1f}s")
+            return True
+        print(f"❌ Failed to load {model_name}: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Failed to load {model_name}: {e}")
+    return False
+
 def test_ollama_integration():
     """Test Ollama integration with a simple query"""
     print("🧪 Testing Ollama integration...")
@@ -162,6 +180,8 @@ def main():
         print("❌ Failed to pull model")
         return
     
+    preload_model(model_choice)
+    
     # Test integration
     if test_ollama_integration():
         print("\n🎉 Setup completed successfully!")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test the async Ollama / Hugging Face clients and OllamaService's async path
+"""
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+import httpx
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def ollama_transport(delay, calls):
+    async def handler(request):
+        body = json.loads(request.content)
+        calls.append(request.url.path)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append('cancelled')
+            raise
+        if body['stream']:
+            lines = [{'message': {'content': word}, 'done': False} for word in ('Found ', 'it')]
+            lines.append({'done': True})
+            return httpx.Response(200, content='\n'.join(json.dumps(line) for line in lines))
+        if request.url.path == '/api/chat':
+            return httpx.Response(200, json={'message': {'content': 'from ollama'}, 'done': True})
+        return httpx.Response(200, json={'response': 'Severity:\nhigh\n\nCategory:\nconnection', 'done': True})
+    return httpx.MockTransport(handler)
+
+
+def huggingface_transport():
+    async def handler(request):
+        return httpx.Response(200, json=[{'generated_text': 'from huggingface'}])
+    return httpx.MockTransport(handler)
+
+
+def make_service(ollama_delay, calls):
+    from backend.helpbot.ollama_service import OllamaService
+    from backend.helpbot.llm_clients import AsyncOllamaClient, AsyncHuggingFaceClient
+    from backend.helpbot.classifier import LabelStore
+
+    class HuggingFace:
+        available = True
+
+    service = OllamaService()
+    service.ollama_llm = object()
+    service.ollama_available = True
+    service.huggingface_service = HuggingFace()
+    service.current_provider = "ollama"
+    service.classifier = None
+    service.label_store = LabelStore(os.path.join(tempfile.mkdtemp(), 'labels.jsonl'))
+    service.hedge_default_delay = 0.1
+    service.ollama_client = AsyncOllamaClient(transport=ollama_transport(ollama_delay, calls))
+    service.hf_client = AsyncHuggingFaceClient('token', transport=huggingface_transport())
+    # Hugging Face has been slower lately, so the router keeps Ollama as primary
+    for _ in range(5):
+        service.router.record('huggingface', 'unknown', 0.5, ok=True)
+    return service
+
+
+async def run_async_path():
+    # Fast Ollama: analysis goes through /api/generate and is parsed
+    calls = []
+    service = make_service(0.01, calls)
+    analysis = await service.aenhance_error_analysis("db down", {'explanation': 'e', 'resolution': 'r'})
+    assert analysis['enhanced'] and analysis['severity'] == 'high' and analysis['category'] == 'connection'
+    assert analysis['ai_provider'] == 'ollama'
+    # The LLM's label is buffered, not written from the event loop; closing the service writes it
+    assert not os.path.exists(service.label_store.path)
+    assert await service.agenerate_conversational_response("db down", analysis) == 'from ollama'
+    assert calls == ['/api/generate', '/api/chat']
+
+    # Streaming chat yields chunks as they arrive
+    chunks = [chunk async for chunk in service.astream_conversational_response("db down", analysis)]
+    assert chunks == ['Found ', 'it']
+    await service.aclose()
+    with open(service.label_store.path) as f:
+        assert '"category": "connection"' in f.read()
+
+    # Slow Ollama: Hugging Face wins the hedge and the Ollama request is cancelled
+    calls = []
+    service = make_service(1.0, calls)
+    assert await service._ainvoke_ai("hello", task="conversation") == ('from huggingface', 'huggingface')
+    assert service.current_provider == "ollama"
+    await asyncio.sleep(0.05)
+    assert calls == ['/api/chat', 'cancelled']
+    assert service.hedge_stats == {'hedged': 1, 'secondary_wins': 1}
+    await service.aclose()
+
+
+def test_async_llm():
+    """Async clients, hedging with real cancellation, and streaming"""
+    print("⚡ Testing Async LLM Clients")
+    print("=" * 50)
+    asyncio.run(run_async_path())
+    print("   ✅ async generate/chat, streaming and cancelled hedge loser")
+
+
+async def run_residency():
+    from datetime import datetime
+    from backend.helpbot.llm_clients import AsyncOllamaClient
+    from backend.helpbot.residency import ModelResidencyManager
+
+    requests_seen = []
+
+    async def handler(request):
+        body = json.loads(request.content)
+        requests_seen.append(body)
+        # The first request for the model pays a 2.5s load, later ones find it resident
+        load_duration = 2_500_000_000 if len(requests_seen) == 1 else 1_000_000
+        return httpx.Response(200, json={'response': '', 'done': True, 'load_duration': load_duration})
+
+    client = AsyncOllamaClient(transport=httpx.MockTransport(handler))
+    residency = ModelResidencyManager(client, ['llama3.2', 'llama3.2'], keep_alive="45m")
+    await residency.preload()
+    assert requests_seen == [{'model': 'llama3.2', 'stream': False, 'prompt': '', 'keep_alive': '45m'}]
+
+    # A request that found the model resident, then one that paid a cold load
+    assert not residency.observe('llama3.2', {'load_duration': 2_000_000})
+    assert residency.observe('llama3.2', {'load_duration': 3_000_000_000})
+    stats = residency.stats()['models']['llama3.2']
+    print(f"   Residency: {stats}")
+    assert stats['warmups'] == 1 and stats['warmup_loads'] == 1
+    assert stats['requests'] == 2 and stats['cold_loads'] == 1 and stats['cold_load_rate'] == 0.5
+    assert stats['avg_cold_load_ms'] == 3000.0
+
+    # Business hours: Monday 09:00 is warm, Saturday and 22:00 are not
+    assert residency.in_warm_window(datetime(2024, 1, 1, 9))
+    assert not residency.in_warm_window(datetime(2024, 1, 6, 9))
+    assert not residency.in_warm_window(datetime(2024, 1, 1, 22))
+    await client.aclose()
+
+
+def test_model_residency():
+    """Preload with keep_alive and count cold loads from Ollama's timing fields"""
+    print("🔥 Testing Ollama Model Residency")
+    print("=" * 50)
+    asyncio.run(run_residency())
+    print("   ✅ preload, keep_alive and cold-load tracking")
+
+
+async def run_task_profiles():
+    from backend.helpbot.llm_clients import AsyncOllamaClient
+
+    payloads = []
+
+    async def handler(request):
+        payloads.append(json.loads(request.content))
+        if request.url.path == '/api/chat':
+            return httpx.Response(200, json={'message': {'content': 'Sorry about that'}, 'done': True})
+        return httpx.Response(200, json={'response': 'Severity:\nlow\n\nCategory:\ndata', 'done': True})
+
+    service = make_service(0.01, [])
+    service.ollama_client = AsyncOllamaClient(transport=httpx.MockTransport(handler))
+    usage = service.track_profile_usage()
+    analysis = await service.aenhance_error_analysis("bad row", {'explanation': 'e', 'resolution': 'r'})
+    await service.agenerate_conversational_response("bad row", analysis)
+
+    # Classification runs on its own small model with a tight budget and stop sequences
+    assert payloads[0]['model'] == 'llama3.2:1b'
+    assert payloads[0]['options']['num_predict'] == 16 and payloads[0]['options']['stop']
+    assert payloads[1]['model'] == 'llama3.2' and payloads[1]['options']['num_predict'] == 200
+    print(f"   Profiles used: {usage}")
+    assert usage['analysis'] == {'provider': 'ollama', 'model': 'llama3.2:1b', 'num_predict': 16, 'temperature': 0.0}
+    assert usage['conversation']['model'] == 'llama3.2'
+    await service.aclose()
+
+
+def test_task_profiles():
+    """Each task uses its own model and generation budget, and reports it"""
+    print("🎛️ Testing Per-Task Model Profiles")
+    print("=" * 50)
+    os.environ['LLM_ANALYSIS_MODEL'] = 'llama3.2:1b'
+    try:
+        asyncio.run(run_task_profiles())
+    finally:
+        del os.environ['LLM_ANALYSIS_MODEL']
+    print("   ✅ per-task model, num_predict and stop sequences")
+
+
+if __name__ == "__main__":
+    test_async_llm()
+    test_model_residency()
+    test_task_profiles()
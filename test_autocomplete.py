@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the typeahead index behind /autocomplete
+"""
+import sys
+import time
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def make_entries(count):
+    from backend.helpbot.models import ErrorEntry
+    entries = [
+        ErrorEntry('1', 'Error Log 1: Database Connection Failed', 'Connection to the database server timed out.', 'Check the network.'),
+        ErrorEntry('2', 'Error Log 2: AS2 Connection Timeout', 'The partner socket is unreachable.', 'Retry later.'),
+        ErrorEntry('3', 'Error Log 3: Login Rejected', 'The password was wrong, login unauthorized.', 'Reset it.'),
+    ]
+    for i in range(4, count + 1):
+        entries.append(ErrorEntry(str(i), f'Error Log {i}: Batch {i % 97} Transfer Failure',
+                                  f'Transfer job {i} failed while writing partner file {i % 13}.', 'Rerun the job.'))
+    return entries
+
+
+def test_autocomplete_index():
+    """Prefixes complete titles from any word, ids and popular queries, entries first"""
+    print("⌨️ Testing Autocomplete Index")
+    print("=" * 50)
+    from backend.helpbot.autocomplete import AutocompleteIndex
+
+    records = [{'canonical': 'connection refused by partner', 'entry_id': '2'}] * 3
+    records += [{'canonical': 'connection reset once', 'entry_id': '2'}]  # too rare to suggest
+    records += [{'canonical': 'connection gibberish', 'entry_id': None}] * 5  # never matched
+    index = AutocompleteIndex.build(make_entries(20000), records)
+    print(f"   Stats: {index.stats()}")
+
+    suggestions = index.complete("Conn", limit=5)
+    print(f"   'Conn': {[s['text'] for s in suggestions]}")
+    # The popular entry first, then the other title, then the logged query
+    assert [s['entry_id'] for s in suggestions[:2]] == ['2', '1']
+    assert suggestions[0]['query'] == 'Error Log #2'
+    texts = [s['text'] for s in suggestions]
+    assert 'connection refused by partner' in texts
+    assert 'connection reset once' not in texts and 'connection gibberish' not in texts
+
+    # Ids complete to the entry, with or without "error log"
+    assert index.complete("error log 3")[0]['entry_id'] == '3'
+    assert index.complete("#1999")[0]['entry_id'] == '1999'
+    assert index.complete("") == [] and index.complete("zzz") == []
+
+    # Common terms from the entries
+    assert any(s['kind'] == 'term' and s['text'] == 'unauthorized' for s in index.complete("unauth"))
+
+    started = time.perf_counter()
+    for prefix in ("e", "tr", "transfer", "error log 12", "batch 4", "pass"):
+        for _ in range(100):
+            index.complete(prefix)
+    per_lookup_ms = (time.perf_counter() - started) / 600 * 1000
+    print(f"   complete(): {per_lookup_ms:.3f} ms per lookup over {len(index)} keys")
+    assert per_lookup_ms < 10
+    print("   ✅ titles, ids, popular queries and terms under 10 ms")
+
+
+if __name__ == "__main__":
+    test_autocomplete_index()
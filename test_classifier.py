@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the local severity/category classifier and its LLM fallback
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+TEMPLATES = [
+    ("Connection timeout to {host}, network unreachable", 'high', 'connection'),
+    ("Socket refused by {host}, connection reset", 'high', 'connection'),
+    ("Invalid password for user {user}, login unauthorized", 'medium', 'authentication'),
+    ("Token expired for {user}, credential rejected", 'medium', 'authentication'),
+    ("Config setting {key} missing from properties file", 'low', 'configuration'),
+    ("Environment parameter {key} has invalid option", 'low', 'configuration'),
+    ("Duplicate row in table {table}, sql constraint", 'medium', 'data'),
+    ("Database query on {table} returned corrupt record", 'medium', 'data'),
+]
+
+
+def make_labels(count, seed=0):
+    rng = random.Random(seed)
+    labels = []
+    for i in range(count):
+        template, severity, category = rng.choice(TEMPLATES)
+        text = template.format(host=f"db{i % 7}", user=f"user{i % 5}", key=f"key{i % 9}", table=f"orders{i % 4}")
+        labels.append({'text': text, 'severity': severity, 'category': category})
+    return labels
+
+
+def test_classifier_training():
+    """Train on LLM labels, then predict accurately in microseconds"""
+    print("🏷️ Testing Local Error Classifier")
+    print("=" * 50)
+    from backend.helpbot.classifier import ErrorClassifier, LabelStore, extract_features, normalize_label
+
+    # Features reuse the extractor's error-type keyword tables
+    features = extract_features("Connection timeout while reading the table")
+    assert features['type:connection'] >= 2.0 and 'type:database' in features and 'w:the' not in features
+    assert normalize_label('severity', ' High.') == 'high' and normalize_label('category', 'weird') is None
+
+    store = LabelStore(os.path.join(tempfile.mkdtemp(), 'labels.jsonl'))
+    for label in make_labels(200):
+        store.append(label['text'], label['severity'], label['category'])
+    store.append("garbage", 'critical', 'general')  # not a known severity, dropped on load
+    labels = store.load()
+    assert len(labels) == 200
+
+    classifier = ErrorClassifier.train(labels[:160])
+    held_out = labels[160:]
+    correct = sum(all(classifier.predict(l['text'])[head][0] == l[head] for head in ('severity', 'category'))
+                  for l in held_out)
+    started = time.perf_counter()
+    for label in held_out:
+        classifier.predict(label['text'])
+    per_prediction_us = (time.perf_counter() - started) / len(held_out) * 1e6
+    print(f"   Held-out accuracy: {correct}/{len(held_out)}  latency: {per_prediction_us:.0f}us")
+    assert correct == len(held_out)
+    assert per_prediction_us < 1000
+
+    # Round-trips through the model file
+    path = os.path.join(tempfile.mkdtemp(), 'classifier.json')
+    classifier.save(path)
+    loaded = ErrorClassifier.load(path)
+    assert loaded.examples == 160
+    assert loaded.predict(held_out[0]['text']) == classifier.predict(held_out[0]['text'])
+    print("   ✅ training, held-out accuracy and save/load")
+
+
+def test_classifier_fallback():
+    """Confident predictions skip the LLM; uncertain ones escalate and become labels"""
+    print("🔀 Testing Classifier LLM Fallback")
+    print("=" * 50)
+    from backend.helpbot.ollama_service import OllamaService
+    from backend.helpbot.classifier import ErrorClassifier, LabelStore
+
+    service = OllamaService()
+    service.classifier = ErrorClassifier.train(make_labels(200))
+    service.label_store = LabelStore(os.path.join(tempfile.mkdtemp(), 'labels.jsonl'))
+    service.ollama_available = True
+    prompts = []
+
+    def fake_invoke(prompt, use_text_model=False, deadline=None, task="general"):
+        prompts.append(task)
+        return "Severity:\nlow\n\nCategory:\ngeneral", "ollama"
+
+    service._invoke_ai = fake_invoke
+    service.is_available = lambda: True
+
+    usage = service.track_profile_usage()
+    data = {'explanation': 'Connection timeout to db3, network unreachable', 'resolution': 'Check the VPN'}
+    result = service.enhance_error_analysis("cannot reach database host", data)
+    assert result['ai_provider'] == 'local_classifier' and result['category'] == 'connection'
+    assert result['severity'] == 'high' and prompts == []
+    assert usage['analysis']['provider'] == 'local_classifier'
+
+    # Nothing like the training data: escalates to the LLM, whose answer is stored as a label
+    data = {'explanation': 'Printer out of paper', 'resolution': 'Refill tray'}
+    result = service.enhance_error_analysis("printer halted", data)
+    assert prompts == ['analysis'] and result['category'] == 'general'
+    assert service.label_store.load()[0]['category'] == 'general'
+    stats = service.classifier_stats()
+    print(f"   Classifier stats: {stats}")
+    assert stats['local'] == 1 and stats['escalated'] == 1
+    print("   ✅ local answer when confident, LLM and new label otherwise")
+
+
+if __name__ == "__main__":
+    test_classifier_training()
+    test_classifier_fallback()
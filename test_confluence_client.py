@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Test batched and conditional page fetches and traffic accounting in ConfluenceClient
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+
+# Add backend to path
+sys.path.append('backend')
+
+BODY = "<p>Error Log 1: Database Connection Failed</p>" * 20
+
+
+class FakeConfluenceAdapter(BaseAdapter):
+    """Answers the content and content search APIs from a dict of pages and records every request"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.requests = []
+        # Upcoming failures: 'down' raises a connection error, 'cut' a body cut off mid-transfer,
+        # 'bug' a local error from outside requests; a number is returned as the status
+        self.failures = []
+
+    def send(self, request, **kwargs):
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure == 'down':
+                self.requests.append(None)
+                raise requests.exceptions.ConnectionError("connection refused")
+            if failure == 'cut':
+                self.requests.append(None)
+                raise requests.exceptions.ChunkedEncodingError("connection broken: incomplete read")
+            if failure == 'bug':
+                self.requests.append(None)
+                raise ValueError("unexpected payload")
+            response = requests.Response()
+            response.status_code = failure
+            response._content = b'{}'
+            response.request = request
+            self.requests.append(None)
+            return response
+        url = urlparse(request.url)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append(params)
+        cql = params.get('cql', '')
+        single = not url.path.endswith('/search')
+        if single:
+            ids = [url.path.rsplit('/', 1)[-1]]
+        elif cql.startswith('id in ('):
+            ids = cql[len('id in ('):-1].split(',')
+        else:
+            ids = list(self.pages)[:int(params.get('limit', 10))]
+        results = []
+        for page_id in ids:
+            if page_id not in self.pages:
+                continue
+            page = {'id': page_id, 'title': f'Page {page_id}', 'version': {'number': self.pages[page_id]}}
+            if 'body.storage' in params.get('expand', ''):
+                page['body'] = {'storage': {'value': BODY}}
+            results.append(page)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(results[0] if single else {'results': results}).encode()
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def make_client(pages, **options):
+    from backend.helpbot.confluence_client import ConfluenceClient
+    options.setdefault('backoff_seconds', 0.001)
+    client = ConfluenceClient('https://confluence.test', 'bot', 'token', 'OPS', **options)
+    adapter = FakeConfluenceAdapter(pages)
+    client.session.mount('https://', adapter)
+    return client, adapter
+
+
+def test_batched_fetch():
+    """Many page bodies come back in one CQL request per batch"""
+    print("📦 Testing Batched Page Fetches")
+    print("=" * 50)
+    from backend.helpbot.confluence_client import ConfluenceClient
+
+    client, adapter = make_client({str(i): 1 for i in range(1, 31)})
+    pages = client.get_pages([str(i) for i in range(1, 31)] + ['999', 'x) OR (1=1'], batch_size=25)
+    assert len(pages) == 30 and len(adapter.requests) == 2
+    assert adapter.requests[0]['cql'].startswith('id in (1,2,3')
+    assert ConfluenceClient.page_body(pages['7']) == BODY
+    print("   ✅ 30 pages in 2 requests, invalid ids never reach CQL")
+
+
+def test_conditional_search_and_transfer():
+    """Version-only searches skip bodies, and traffic is counted per request"""
+    print("📏 Testing Conditional Search and Transfer Counts")
+    print("=" * 50)
+    from backend.helpbot.confluence_client import (ConfluenceClient, SEARCH_EXPAND_VERSIONS,
+                                                   count_transfer)
+
+    client, adapter = make_client({'1': 3})
+    with count_transfer() as full:
+        results = client.search_pages("database", limit=1)
+    assert ConfluenceClient.page_body(results[0]) == BODY
+
+    with count_transfer() as versions_only:
+        results = client.search_pages("database", limit=1, expand=SEARCH_EXPAND_VERSIONS)
+    assert ConfluenceClient.page_body(results[0]) is None and results[0]['version']['number'] == 3
+    print(f"   Search with bodies: {full.bytes} bytes, versions only: {versions_only.bytes} bytes")
+    assert versions_only.bytes < full.bytes / 10
+    assert client.transfer_stats() == {'requests': 2, 'bytes': full.bytes + versions_only.bytes}
+    print("   ✅ unchanged pages validate without downloading bodies")
+
+
+def test_retries_and_circuit_breaker():
+    """Brownouts are retried, then the circuit opens and last known good data is served"""
+    print("🔌 Testing Retries, Circuit Breaker and Stale Serving")
+    print("=" * 50)
+    from backend.helpbot.circuit_breaker import CircuitBreaker
+    from backend.helpbot.confluence_client import SEARCH_EXPAND_VERSIONS, count_transfer
+
+    breaker = CircuitBreaker('confluence', failure_threshold=2, reset_seconds=0.2)
+    client, adapter = make_client({'1': 1}, retries=2, breaker=breaker)
+
+    # Two transient failures are retried away
+    adapter.failures = ['down', 503]
+    assert client.search_pages("database", limit=1)[0]['id'] == '1'
+    assert len(adapter.requests) == 3 and client.retried == 2
+    assert client.get_page_content('1') == BODY
+
+    # A sustained outage: each call exhausts its retries, and two failed calls open the circuit
+    adapter.failures = ['down'] * 6
+    with count_transfer() as transfer:
+        results = client.search_pages("database", limit=1)
+        assert results[0]['id'] == '1' and transfer.stale
+    client.search_pages("database", limit=1)
+    assert breaker.state == 'open' and not adapter.failures
+
+    # While open Confluence isn't called at all; cached pages and searches are still served,
+    # whichever expand the search was cached under
+    calls = len(adapter.requests)
+    with count_transfer() as transfer:
+        assert client.get_page_content('1') == BODY and transfer.stale
+        assert client.search_pages("never searched", limit=1) == []
+        results = client.search_pages("database", limit=1, expand=SEARCH_EXPAND_VERSIONS)
+        assert results[0]['id'] == '1'
+    assert len(adapter.requests) == calls
+    print(f"   Stats while open: {client.stats()}")
+
+    # After the cool-down one probe goes through and closes the circuit again
+    time.sleep(0.25)
+    with count_transfer() as transfer:
+        assert client.search_pages("database", limit=1)[0]['id'] == '1' and not transfer.stale
+    assert breaker.state == 'closed'
+    print("   ✅ retries, fail-fast while open, stale serving and recovery")
+
+
+def test_failed_probe_reopens_circuit():
+    """A failed half-open probe re-opens the circuit; a local error ends it without counting"""
+    print("🩺 Testing Failed Half-Open Probes")
+    print("=" * 50)
+    from backend.helpbot.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+    breaker = CircuitBreaker('confluence', failure_threshold=1, reset_seconds=0.05)
+    client, adapter = make_client({'1': 1}, retries=0, breaker=breaker)
+
+    # The probe's body is cut off mid-transfer: not a connection error or timeout, still a failure
+    adapter.failures = ['down']
+    client.get_page('1')
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    adapter.failures = ['cut']
+    assert client.get_page('1') is None
+    assert breaker.state == 'open' and not breaker._probing
+    try:
+        client._get('/rest/api/content/1')
+        raise AssertionError("the re-opened circuit should refuse calls")
+    except CircuitOpenError as e:
+        assert e.retry_in > 0
+
+    # The probe fails on our side: the probe ends, but Confluence isn't blamed for it
+    time.sleep(0.06)
+    adapter.failures = ['bug']
+    assert client.get_page('1') is None
+    assert breaker.state == 'half_open' and not breaker._probing and breaker.consecutive_failures == 2
+    assert client.get_page('1')['id'] == '1' and breaker.state == 'closed'
+
+    # A burst of local errors, e.g. from spent deadlines, never opens a healthy circuit
+    adapter.failures = ['bug'] * 3
+    for _ in range(3):
+        assert client.get_page('1') is None
+    assert breaker.state == 'closed' and breaker.consecutive_failures == 0
+    print(f"   Breaker: {breaker.stats()}")
+    print("   ✅ cut-off bodies re-open the circuit, local errors only end the probe")
+
+
+def test_brownout_keeps_event_loop_free():
+    """Retry backoff during a Confluence brownout sleeps in a worker thread, not on the event loop"""
+    print("🌤️ Testing the Event Loop During a Brownout")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import app as helpbot
+    from backend.helpbot.confluence_client import count_transfer
+
+    client, adapter = make_client({'1': 1}, retries=3, backoff_seconds=0.1)
+    saved = helpbot.confluence_client, helpbot.search_backend
+    helpbot.confluence_client = helpbot.search_backend = client
+
+    async def scenario():
+        gaps = []
+
+        async def ticker():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - started)
+
+        # Three failures in a row: the answer waits out the backoff, the loop doesn't
+        adapter.failures = ['down', 503, 'down']
+        tick = asyncio.ensure_future(ticker())
+        helpbot.start_trace("database connection failed", None)
+        with count_transfer() as transfer:
+            response = await helpbot.answer_query(helpbot.QueryRequest(query="database connection failed"))
+        tick.cancel()
+        return response, max(gaps), transfer
+
+    try:
+        started = time.perf_counter()
+        response, longest_gap, transfer = asyncio.run(scenario())
+        elapsed = time.perf_counter() - started
+    finally:
+        helpbot.confluence_client, helpbot.search_backend = saved
+        helpbot.knowledge_base.remove_page('1')
+    print(f"   Answered in {elapsed * 1000:.0f} ms after {client.retried} retries; "
+          f"longest event loop stall {longest_gap * 1000:.0f} ms")
+    assert response.status == 'success' and client.retried == 3 and transfer.requests >= 1
+    assert elapsed > 0.3 and longest_gap < 0.1
+    print("   ✅ other requests keep being served while Confluence is retried")
+
+
+if __name__ == "__main__":
+    test_batched_fetch()
+    test_conditional_search_and_transfer()
+    test_retries_and_circuit_breaker()
+    test_failed_probe_reopens_circuit()
+    test_brownout_keeps_event_loop_free()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the per-request deadline: budget arithmetic, skipped LLM stages and the out-of-time answer
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_deadline_budget():
+    """Stage timeouts are capped by the remaining budget and skips are recorded once"""
+    print("⏱️ Testing Deadline Budget")
+    print("=" * 50)
+    from backend.helpbot.deadline import Deadline
+
+    deadline = Deadline(2.0)
+    assert 1.9 < deadline.remaining() <= 2.0 and deadline.timeout(0.5) == 0.5
+    assert deadline.has_budget(1.0) and not deadline.has_budget(5.0) and not deadline.expired()
+    deadline.skip('suggestions')
+    deadline.skip('suggestions')
+    assert deadline.skipped_stages == ['suggestions']
+
+    spent = Deadline(0)
+    assert spent.expired() and spent.timeout(0.5) == 0.0
+    print("   ✅ remaining budget, capped timeouts, one entry per skipped stage")
+
+
+def run_query(helpbot, query, budget_seconds):
+    """Answer one query through the /query pipeline with the given budget, bypassing the answer cache"""
+    saved = helpbot.QUERY_DEADLINE_SECONDS
+    helpbot.QUERY_DEADLINE_SECONDS = budget_seconds
+
+    async def ask():
+        helpbot.start_trace(query, None)
+        return await helpbot.answer_query(helpbot.QueryRequest(query=query))
+
+    try:
+        return asyncio.run(ask())
+    finally:
+        helpbot.QUERY_DEADLINE_SECONDS = saved
+
+
+def test_query_deadline():
+    """A short budget skips the LLM stages but still answers; no budget at all returns the timeout answer"""
+    print("🏁 Testing /query Under a Deadline")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import app as helpbot
+
+    service = helpbot.ollama_service
+    saved = service.current_provider, service.min_llm_budget
+    # An LLM that looks available, but needs more time than the request has left
+    service.current_provider = 'ollama'
+    service.min_llm_budget = 5.0
+    try:
+        response = run_query(helpbot, "AS2 connection timeout", 1.0)
+    finally:
+        service.current_provider, service.min_llm_budget = saved
+    print(f"   1s budget: status={response.status}, skipped={response.skipped_stages}")
+    assert response.status == 'success' and not response.enhanced
+    assert response.skipped_stages == ['enhance_error_analysis', 'conversational_response']
+    assert response.explanation and response.conversational_response
+
+    response = run_query(helpbot, "AS2 connection timeout", 0)
+    print(f"   No budget: status={response.status}, skipped={response.skipped_stages}")
+    assert response.status == 'error' and response.skipped_stages == ['knowledge_base']
+    assert response.explanation == "The request took too long to complete."
+    print("   ✅ best answer so far, with the left-out stages listed")
+
+
+if __name__ == "__main__":
+    test_deadline_budget()
+    test_query_deadline()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test offline enrichment of knowledge base entries and serving it from the snapshot
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+PAGE = """<p>Error Log 1: Database Connection Failed</p>
+<p>Issue: Unable to reach the primary database server.</p>
+<p>Solution: Verify the database server is running.</p>
+<p>Error Log 2: Authentication Service Unavailable</p>
+<p>Issue: Login requests are not answered.</p>
+<p>Solution: Restart the authentication service.</p>
+<p>Error Log 3: Disk Full</p>
+<p>Issue: The export volume has no free space.</p>
+<p>Solution: Purge old exports.</p>"""
+
+
+class FakeAIService:
+    """Answers the entry-level stages and records how many ran at once"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self.fail_on = fail_on
+
+    async def aenhance_error_analysis(self, user_query, data, deadline=None):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        self.calls.append(('analysis', user_query))
+        if user_query == self.fail_on:
+            return {**data, 'enhanced': False}
+        return {**data, 'enhanced': True, 'severity': 'high', 'category': 'data', 'ai_provider': 'ollama'}
+
+    async def asuggest_related_queries(self, user_query, error_category, deadline=None):
+        self.calls.append(('suggestions', user_query))
+        return [f"{error_category} follow-up"]
+
+
+def test_enrichment():
+    """Enrich once per entry version with bounded concurrency, persist and reuse"""
+    print("🧪 Testing Offline Enrichment")
+    print("=" * 50)
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.enrichment import enrich_knowledge_base
+    from backend.helpbot.snapshot import load_snapshot, load_enrichments, save_snapshot
+
+    knowledge_base = KnowledgeBase()
+    knowledge_base.update_page('100', 'Errors', 1, PAGE)
+    assert len(knowledge_base) == 3
+
+    service = FakeAIService(fail_on='Error Log 3: Disk Full')
+    stats = asyncio.run(enrich_knowledge_base(knowledge_base, service, concurrency=2))
+    print(f"   First run: {stats}, peak concurrency {service.peak}")
+    assert stats == {'enriched': 2, 'reused': 0, 'failed': 1}
+    assert service.peak == 2
+
+    entry = knowledge_base.get_by_id('1')
+    enrichment = knowledge_base.get_enrichment(entry)
+    assert enrichment['severity'] == 'high' and enrichment['suggestions'] == ['data follow-up']
+
+    # A second run only retries the failed entry; unchanged entries keep their enrichment
+    service = FakeAIService()
+    stats = asyncio.run(enrich_knowledge_base(knowledge_base, service, concurrency=2))
+    assert stats == {'enriched': 1, 'reused': 2, 'failed': 0}
+    assert [call for call in service.calls if call[0] == 'analysis'] == [('analysis', 'Error Log 3: Disk Full')]
+
+    # Editing an entry's content invalidates its enrichment
+    knowledge_base.update_page('100', 'Errors', 2, PAGE.replace('Purge old exports', 'Grow the volume'))
+    assert knowledge_base.get_enrichment(knowledge_base.get_by_id('3')) is None
+    assert knowledge_base.get_enrichment(knowledge_base.get_by_id('1')) is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kb.db')
+        save_snapshot(knowledge_base, path)
+        loaded = load_snapshot(path)
+        assert loaded.get_enrichment(loaded.get_by_id('1')) == enrichment
+        # The stale enrichment of the edited entry isn't written
+        assert len(load_enrichments(path)) == 2
+    print("   ✅ bounded concurrency, per-version reuse and snapshot round trip")
+
+
+if __name__ == "__main__":
+    test_enrichment()
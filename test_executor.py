@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test the extraction executor: size-based dispatch, queue-wait accounting and the deadline path
+"""
+import sys
+import time
+import asyncio
+import threading
+
+# Add backend to path
+sys.path.append('backend')
+
+PAGE = """<p>Error Log 1: Database Connection Failed</p>
+<p>Issue: Unable to reach the primary database server.</p>
+<p>Solution: Verify the database server is running.</p>"""
+
+
+def test_dispatch():
+    """Large pages go to the process pool; small pages and matching stay in threads"""
+    print("🔀 Testing Executor Dispatch")
+    print("=" * 50)
+    from backend.helpbot.executor import ExtractionExecutor, extract_entries, match_entries
+
+    executor = ExtractionExecutor(process_workers=1, thread_workers=2, process_threshold=1000)
+
+    async def scenario():
+        small = await executor.run(len(PAGE), extract_entries, PAGE)
+        large_page = PAGE * 20
+        large = await executor.run(len(large_page), extract_entries, large_page)
+        # Matching never leaves the process, however many candidates there are
+        match = await executor.run_in_thread(match_entries, "database connection failed", large * 50)
+        return small, large, match
+
+    try:
+        small, large, match = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    pools = executor.stats()['pools']
+    print(f"   Pools: thread {pools['thread']['tasks']} tasks, process {pools['process']['tasks']} tasks")
+    assert len(small) == 1 and len(large) == 20 and match.id == '1'
+    assert pools['process']['tasks'] == 1 and pools['thread']['tasks'] == 2
+    assert ExtractionExecutor(process_workers=0).process_pool() is None
+    print("   ✅ page size picks the pool, candidate sets are never pickled")
+
+
+def test_queue_wait_and_deadline():
+    """Queue wait is measured, and a timed-out task stays counted until it really finishes"""
+    print("⏳ Testing Queue Wait and Deadlines")
+    print("=" * 50)
+    from backend.helpbot.deadline import Deadline, DeadlineExceeded
+    from backend.helpbot.executor import ExtractionExecutor
+
+    executor = ExtractionExecutor(process_workers=0, thread_workers=1)
+    release = threading.Event()
+    ran = []
+
+    def blocker():
+        release.wait(2)
+        ran.append('blocker')
+
+    def queued():
+        ran.append('queued')
+
+    async def scenario():
+        # A second task queues behind the first one in the single worker
+        first = asyncio.ensure_future(executor.run_in_thread(blocker))
+        await asyncio.sleep(0.05)
+        try:
+            await executor.run_in_thread(queued, deadline=Deadline(0.05))
+            raise AssertionError("the queued task should have timed out")
+        except DeadlineExceeded as e:
+            assert e.stage == 'queued'
+        # The caller gave up, but the blocker still occupies the pool
+        in_flight = executor.stats()['pools']['thread']['in_flight']
+        release.set()
+        await first
+        await asyncio.sleep(0.05)
+        # The next task queues for about 100 ms behind this one
+        busy = asyncio.ensure_future(executor.run_in_thread(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        await executor.run_in_thread(time.sleep, 0)
+        await busy
+        return in_flight
+
+    try:
+        in_flight = asyncio.run(scenario())
+        try:
+            asyncio.run(executor.run_in_thread(queued, deadline=Deadline(0)))
+            raise AssertionError("an expired deadline should not submit anything")
+        except DeadlineExceeded:
+            pass
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()['pools']['thread']
+    print(f"   In flight after timeout: {in_flight}; stats: {stats}")
+    assert in_flight == 1 and stats['in_flight'] == 0 and stats['timeouts'] == 1
+    # The queued task was cancelled before it started
+    assert ran == ['blocker']
+    assert stats['tasks'] == 3 and stats['max_queue_wait_ms'] >= 80
+    print("   ✅ queue wait recorded, queued work cancelled, running work still counted")
+
+
+if __name__ == "__main__":
+    test_dispatch()
+    test_queue_wait_and_deadline()
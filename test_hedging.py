@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test hedged LLM requests across Ollama and Hugging Face
+"""
+import sys
+import time
+
+# Add backend to path
+sys.path.append('backend')
+
+
+class SlowOllama:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def invoke(self, prompt):
+        time.sleep(self.delay)
+        return "from ollama"
+
+
+class FastHuggingFace:
+    available = True
+
+    def __init__(self):
+        self.max_lengths = []
+
+    def query(self, prompt, max_length=200, use_text_model=False, timeout=30):
+        self.max_lengths.append(max_length)
+        time.sleep(0.01)
+        return "from huggingface"
+
+
+def make_service(ollama_delay):
+    from backend.helpbot.ollama_service import OllamaService
+
+    service = OllamaService()
+    service.ollama_llm = SlowOllama(ollama_delay)
+    service.ollama_available = True
+    service.huggingface_service = FastHuggingFace()
+    service.current_provider = "ollama"
+    service.hedge_default_delay = 0.1
+    service.hedge_min_samples = 5
+    return service
+
+
+def test_hedging():
+    """A slow primary is hedged to the secondary, and the hedge delay adapts to recorded latency"""
+    print("🏁 Testing Hedged LLM Requests")
+    print("=" * 50)
+
+    # Ollama answers within the hedge delay: no hedge
+    service = make_service(0.01)
+    assert service._invoke_ai("hello") == ("from ollama", "ollama")
+    assert service.hedge_stats['hedged'] == 0
+
+    # Ollama stalls: Hugging Face gets the prompt after the delay and wins
+    service = make_service(0.5)
+    usage = service.track_profile_usage()
+    started = time.monotonic()
+    assert service._invoke_ai("hello") == ("from huggingface", "huggingface")
+    elapsed = time.monotonic() - started
+    print(f"   Hedged answer in {elapsed * 1000:.0f} ms")
+    assert elapsed < 0.4
+    assert service.hedge_stats == {'hedged': 1, 'secondary_wins': 1}
+    # The general profile's 500 tokens are capped for Hugging Face, and usage shows what was sent
+    assert service.huggingface_service.max_lengths == [150] and usage['general']['num_predict'] == 150
+
+    # The winner is reported per request; the service-wide provider stays what startup found
+    analysis = service.enhance_error_analysis("disk full", {'explanation': 'e', 'resolution': 'r'})
+    assert analysis['ai_provider'] == 'huggingface' and service.current_provider == 'ollama'
+
+    # With enough samples the delay follows the primary's recent percentile
+    service = make_service(0.01)
+    assert service.hedge_delay('ollama') == 0.1
+    for seconds in (0.2, 0.2, 0.2, 0.2, 0.3):
+        service.latency['ollama'].record(seconds)
+    assert service.hedge_delay('ollama') == 0.3
+    print(f"   Latency stats: {service.latency_stats()['providers']['ollama']}")
+
+    print("   ✅ slow primary hedged, threshold adapts")
+
+
+if __name__ == "__main__":
+    test_hedging()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test knowledge base snapshot round trip, incremental refresh and single-page index updates
+"""
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+PAGE_V1 = """<p>Error Log 1: Database Connection Failed</p>
+<p>Issue: Unable to reach the primary database server.</p>
+<p>Solution: Verify the database server is running.</p>
+<p>Error Log 2: Authentication Service Unavailable</p>
+<p>Issue: Login requests are not answered.</p>
+<p>Solution: Restart the authentication service.</p>"""
+
+PAGE_V2 = """<p>Error Log 3: Disk Full</p>
+<p>Issue: The export volume has no free space.</p>
+<p>Solution: Purge old exports.</p>"""
+
+
+class FakeConfluenceClient:
+    """Serves a set of (title, version, body) pages from one space and counts body fetches and requests"""
+
+    space_key = 'OPS'
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.body_fetches = 0
+        self.requests = 0
+
+    def get_page(self, page_id, expand='body.storage,version'):
+        self.requests += 1
+        self.body_fetches += 1
+        title, version, body = self.pages[page_id]
+        return {'id': page_id, 'title': title, 'version': {'number': version},
+                'space': {'key': self.space_key}, 'body': {'storage': {'value': body}}}
+
+    def list_pages(self, expand='version'):
+        return [
+            {'id': page_id, 'title': title, 'version': {'number': version}}
+            for page_id, (title, version, _) in self.pages.items()
+        ]
+
+    def get_pages(self, page_ids):
+        self.requests += 1
+        self.body_fetches += len(page_ids)
+        return {
+            page_id: {'id': page_id, 'version': {'number': self.pages[page_id][1]},
+                      'body': {'storage': {'value': self.pages[page_id][2]}}}
+            for page_id in page_ids
+        }
+
+    @staticmethod
+    def page_body(page):
+        return page['body']['storage']['value']
+
+
+def test_snapshot_round_trip():
+    """Refresh from a fake space, save, reload and compare"""
+    print("💾 Testing Knowledge Base Snapshot")
+    print("=" * 50)
+
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.snapshot import load_snapshot, save_snapshot
+
+    client = FakeConfluenceClient({'100': ('Errors', 1, PAGE_V1)})
+    knowledge_base = KnowledgeBase()
+    stats = knowledge_base.refresh(client)
+    print(f"   Initial refresh: {stats}")
+    assert stats['added'] == 1
+    assert len(knowledge_base) == 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kb.db')
+        save_snapshot(knowledge_base, path)
+        loaded = load_snapshot(path)
+
+    assert loaded.entries == knowledge_base.entries
+    assert loaded.get_by_id('2').page_id == '100'
+    assert loaded.pages['100']['version'] == 1
+    assert loaded.get_page_body('100') == PAGE_V1
+    assert loaded.candidates('database server down')[0].id == '1'
+    print("   ✅ Snapshot reloads entries, id index, postings and bodies")
+
+
+def test_incremental_refresh():
+    """Only changed pages are re-fetched"""
+    from backend.helpbot.knowledge_base import KnowledgeBase
+
+    client = FakeConfluenceClient({'100': ('Errors', 1, PAGE_V1)})
+    knowledge_base = KnowledgeBase()
+    knowledge_base.refresh(client)
+
+    client.pages['200'] = ('More errors', 1, PAGE_V2)
+    client.pages['300'] = ('Even more errors', 1, PAGE_V2)
+    client.body_fetches = client.requests = 0
+    stats = knowledge_base.refresh(client)
+    print(f"   Second refresh: {stats}")
+    assert stats == {'added': 2, 'updated': 0, 'removed': 0, 'unchanged': 1}
+    # Both new bodies in one batched request, the unchanged page not at all
+    assert client.body_fetches == 2 and client.requests == 1
+    assert knowledge_base.get_by_id('3') is not None
+
+    del client.pages['100']
+    stats = knowledge_base.refresh(client)
+    assert stats['removed'] == 1
+    assert knowledge_base.get_by_id('1') is None
+    print("   ✅ Incremental refresh fetches only new or changed pages")
+
+
+def test_page_splice():
+    """Updating or removing one page leaves the same index a full rebuild would"""
+    print("✂️ Testing Single-Page Index Updates")
+    print("=" * 50)
+    from backend.helpbot.knowledge_base import KnowledgeBase
+
+    knowledge_base = KnowledgeBase()
+    rebuilt = KnowledgeBase()
+    # The same error ids on several pages, and updates that grow and shrink a page
+    steps = [('200', PAGE_V2), ('100', PAGE_V1), ('300', PAGE_V1), ('100', PAGE_V2), ('050', PAGE_V1),
+             ('300', None), ('100', PAGE_V1), ('200', PAGE_V1), ('050', None)]
+    for page_id, body in steps:
+        if body is None:
+            knowledge_base.remove_page(page_id)
+            rebuilt.remove_page(page_id, reindex=False)
+        else:
+            knowledge_base.update_page(page_id, f'Page {page_id}', 1, body)
+            rebuilt.update_page(page_id, f'Page {page_id}', 1, body, reindex=False)
+        rebuilt.reindex()
+        assert [(entry.page_id, entry.id) for entry in knowledge_base.entries] == \
+            [(entry.page_id, entry.id) for entry in rebuilt.entries]
+        assert knowledge_base.id_index == rebuilt.id_index, page_id
+        assert knowledge_base.postings == rebuilt.postings, page_id
+
+    assert knowledge_base.get_by_id('1').page_id == '100'
+    assert {entry.page_id for entry in knowledge_base.candidates('database server')} == {'100', '200'}
+    print(f"   {len(steps)} updates, {len(knowledge_base)} entries, index identical to a full rebuild")
+    print("   ✅ only the changed page is re-indexed")
+
+
+if __name__ == "__main__":
+    test_snapshot_round_trip()
+    test_incremental_refresh()
+    test_page_splice()
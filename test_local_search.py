@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite FTS5 local search backend
+"""
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+from test_knowledge_base import FakeConfluenceClient, PAGE_V1, PAGE_V2
+
+
+def test_local_search():
+    """Search pages and entries of a snapshot with FTS5"""
+    print("🔎 Testing Local FTS5 Search Backend")
+    print("=" * 50)
+
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.snapshot import save_snapshot
+    from backend.helpbot.local_search import LocalSearchBackend
+
+    knowledge_base = KnowledgeBase()
+    knowledge_base.refresh(FakeConfluenceClient({
+        '100': ('Database and Login Errors', 3, PAGE_V1),
+        '200': ('Storage Errors', 1, PAGE_V2),
+    }))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kb.db')
+        save_snapshot(knowledge_base, path)
+        backend = LocalSearchBackend(path)
+
+        # Prefix matching: "authentic" matches "Authentication"
+        pages = backend.search_pages("authentic", limit=5)
+        print(f"   Page results: {[(p['title'], round(p['score'], 3)) for p in pages]}")
+        assert pages[0]['id'] == '100'
+        assert pages[0]['version']['number'] == 3
+        assert 'Error Log 1' in pages[0]['body']['storage']['value']
+
+        entries = backend.search_entries("disk space", limit=5)
+        assert entries[0]['id'] == '3'
+        assert '<b>' in entries[0]['snippet']
+
+        # FTS syntax in user input is treated as plain text
+        assert backend.search_pages('" OR * NEAR(', limit=5) == []
+        backend.close()
+
+    print("   ✅ bm25-ranked prefix search over pages and entries")
+
+
+if __name__ == "__main__":
+    test_local_search()
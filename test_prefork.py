@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the prefork launcher's restart backoff and its give-up on workers that crash on boot
+"""
+import gc
+import os
+import sys
+import signal
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_restart_policy():
+    """Quick crashes back off exponentially up to a cap, then give up; a long-lived worker restarts at once"""
+    print("🔁 Testing Worker Restart Policy")
+    print("=" * 50)
+    from backend.prefork import RestartPolicy
+
+    policy = RestartPolicy(min_uptime=10, base_delay=0.5, max_delay=3, max_quick_crashes=4)
+    delays = []
+    now = 0.0
+    for _ in range(5):
+        policy.started(0, now=now)
+        now += 1
+        delays.append(policy.exited(0, now=now))
+    print(f"   Delays after quick crashes: {delays}")
+    assert delays == [0.5, 1.0, 2.0, 3, None]
+
+    # Another worker is tracked on its own, and staying up resets its count
+    policy.started(1, now=now)
+    assert policy.exited(1, now=now + 1) == 0.5
+    policy.started(1, now=now + 2)
+    assert policy.exited(1, now=now + 60) == 0.0
+    policy.started(1, now=now + 61)
+    assert policy.exited(1, now=now + 62) == 0.5
+    print("   ✅ backoff, cap, give-up and reset")
+
+
+def test_crash_loop_stops_master():
+    """Workers dying on boot are respawned a bounded number of times, then the master exits"""
+    print("💥 Testing Crash Loop Handling")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import prefork
+
+    class CountingPolicy(prefork.RestartPolicy):
+        def __init__(self):
+            super().__init__(min_uptime=10, base_delay=0.01, max_delay=0.05, max_quick_crashes=3)
+            self.spawned = []
+
+        def started(self, worker_id, now=None):
+            self.spawned.append(worker_id)
+            super().started(worker_id, now)
+
+    def crash_on_boot(app, sock, worker_id, log_level):
+        os._exit(3)
+
+    policy = CountingPolicy()
+    saved_run_worker = prefork._run_worker
+    saved_handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1)}
+    prefork._run_worker = crash_on_boot
+    try:
+        try:
+            prefork.serve('127.0.0.1', 0, workers=2, restart_policy=policy)
+            raise AssertionError("the master should give up")
+        except SystemExit as e:
+            assert e.code == 1
+    finally:
+        prefork._run_worker = saved_run_worker
+        for signum, handler in saved_handlers.items():
+            signal.signal(signum, handler)
+        gc.unfreeze()
+        gc.enable()
+
+    print(f"   Forks before giving up: {len(policy.spawned)}")
+    # Two initial forks; the first worker to exceed its 3 quick crashes stops everything
+    assert 5 <= len(policy.spawned) <= 8
+    print("   ✅ bounded respawns, then a non-zero exit")
+
+
+if __name__ == "__main__":
+    test_restart_policy()
+    test_crash_loop_stops_master()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test the answer cache, background LLM priority and cache prewarming
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_answer_cache():
+    """LRU eviction, TTL expiry and hit counting"""
+    print("🗃️ Testing Answer Cache")
+    print("=" * 50)
+    from backend.helpbot.answer_cache import AnswerCache
+
+    cache = AnswerCache(max_entries=2, ttl=0.2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    assert cache.get('b') is None and cache.get('c') == 3
+    time.sleep(0.25)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['entries'] == 1
+    print("   ✅ eviction, expiry and hit rate")
+
+
+def test_background_priority():
+    """Background LLM work waits behind every user-facing task"""
+    print("🐢 Testing Background Priority")
+    print("=" * 50)
+    from backend.helpbot.scheduler import LLMScheduler, background_priority
+
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=8, shed_queue_depth=8, shed_wait_seconds=5.0)
+    order = []
+
+    def run(task, background):
+        if background:
+            with background_priority():
+                with scheduler.slot(task):
+                    order.append(f"background {task}")
+        else:
+            with scheduler.slot(task):
+                order.append(task)
+
+    scheduler.acquire('conversation')
+    threads = []
+    for task, background in (('conversation', True), ('suggestions', False)):
+        thread = threading.Thread(target=run, args=(task, background))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+    scheduler.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ['suggestions', 'background conversation']
+    print("   ✅ a user's suggestions outrank a background reply")
+
+
+def test_prewarm():
+    """Top logged queries are replayed into the answer cache and coverage is reported"""
+    print("🔥 Testing Cache Prewarming")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ['QUERY_LOG_PATH'] = os.path.join(tempfile.mkdtemp(), 'queries.db')
+    os.environ['KNOWLEDGE_BASE_SNAPSHOT'] = os.path.join(tempfile.mkdtemp(), 'missing.db')
+    os.environ['PREWARM_TOP_N'] = '2'
+    from backend import app as helpbot
+    helpbot.PREWARM_TOP_N = 2  # in case another test imported the app first
+
+    for query, count in (("AS2 timeout", 5), ("database connection failed", 3), ("login broken", 2)):
+        for _ in range(count):
+            helpbot.query_log.record(query)
+    helpbot.query_log.flush()
+
+    stats = asyncio.run(helpbot.prewarm_caches())
+    print(f"   Prewarm: {stats}")
+    assert stats['warmed'] == 2 and stats['traffic_coverage'] == 0.8
+    assert len(helpbot.answer_cache) == 2
+
+    # A user's differently-typed query is now answered from the cache
+    async def ask():
+        helpbot.start_trace("as2  TIMEOUT", None)
+        return await helpbot.answer_with_cache(helpbot.QueryRequest(query="as2  TIMEOUT"))
+
+    hits = helpbot.answer_cache.hits
+    response = asyncio.run(ask())
+    assert response.status == 'success' and helpbot.answer_cache.hits == hits + 1
+    print("   ✅ top queries warmed, coverage 80% of logged traffic")
+
+
+if __name__ == "__main__":
+    test_answer_cache()
+    test_background_priority()
+    test_prewarm()
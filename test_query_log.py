@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test the buffered query log and its reports
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_query_log():
+    """Records are buffered, flushed in batches and reported on"""
+    print("🗒️ Testing Query Log")
+    print("=" * 50)
+    from backend.helpbot.query_log import QueryLog, canonical_query
+    from backend.helpbot.tracing import start_trace, trace_hit, trace_stage
+
+    assert canonical_query("  DB Timeout!! on error log #12 ") == "db timeout on error log #12"
+
+    path = os.path.join(tempfile.mkdtemp(), 'queries.db')
+    log = QueryLog(path, buffer_size=100, batch_size=4)
+
+    # Recording only touches memory
+    started = time.perf_counter()
+    for i in range(10):
+        log.record("DB timeout" if i % 2 else "db  timeout!", entry_id='1', session_id='s',
+                   total_ms=10.0 * (i + 1), stages={'search': 5.0}, cache_hits=['page'],
+                   providers={'conversation': 'ollama'})
+    record_us = (time.perf_counter() - started) / 10 * 1e6
+    assert not os.path.exists(path) and log.stats()['buffered'] == 10
+    print(f"   record(): {record_us:.1f}us per query")
+
+    # A traced request records its stages, hits and providers
+    async def traced():
+        trace = start_trace("login rejected", "s2")
+        with trace_stage('analysis'):
+            await asyncio.sleep(0.01)
+        trace_hit('enrichment')
+        trace.providers['analysis'] = 'local_classifier'
+        log.record_trace(trace, 'success')
+
+    asyncio.run(traced())
+    assert log.flush() == 11
+    assert log.stats()['written'] == 11 and log.stats()['buffered'] == 0
+
+    records = log.read()
+    assert records[-1]['stages']['analysis'] >= 10 and records[-1]['cache_hits'] == ['enrichment']
+    assert log.top_queries(1) == [{'canonical': 'db timeout', 'count': 10, 'matched': 10}]
+    assert log.top_entries() == [{'entry_id': '1', 'count': 10}]
+    report = log.report()
+    print(f"   Report: {report}")
+    assert report['queries'] == 11 and report['match_rate'] == 0.909
+    assert report['total']['p50_ms'] == 50.0 and report['stages']['search']['p99_ms'] == 5.0
+    assert report['cache_hit_rates']['page'] == 0.909
+    assert report['providers'] == {'conversation:ollama': 10, 'analysis:local_classifier': 1}
+
+    # A full buffer drops the oldest rows instead of blocking
+    small = QueryLog(path, buffer_size=3)
+    for i in range(5):
+        small.record(f"q{i}")
+    assert small.stats()['dropped'] == 2
+    small.flush()
+    assert [r['query'] for r in small.read()][-3:] == ['q2', 'q3', 'q4']
+
+    # Rotation removes rows past the retention window
+    log.retention_days = 0
+    assert log.rotate() == 14
+    log.close()
+    print("   ✅ buffered writes, batched flush, reports and rotation")
+
+
+if __name__ == "__main__":
+    test_query_log()
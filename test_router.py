@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test latency-aware LLM provider routing
+"""
+import sys
+import time
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_router():
+    """Route to the fastest healthy provider and periodically re-check the others"""
+    print("🧭 Testing Adaptive Provider Routing")
+    print("=" * 50)
+
+    from backend.helpbot.router import ProviderRouter
+
+    router = ProviderRouter(explore_seconds=0.2)
+    candidates = [('ollama', 'llama3.2'), ('huggingface', 'google/flan-t5-small')]
+
+    # Ollama is failing, Hugging Face is slow but healthy
+    for _ in range(5):
+        router.record('ollama', 'llama3.2', 0.05, ok=False)
+        router.record('huggingface', 'google/flan-t5-small', 1.5, ok=True, tokens=60)
+    assert router.choose('analysis', candidates)[0] == 'huggingface'
+    assert router.decisions['analysis']['reason'] == 'best'
+
+    # After the exploration interval Ollama gets one task to show it has recovered
+    time.sleep(0.25)
+    assert router.choose('analysis', candidates)[0] == 'ollama'
+    assert router.decisions['analysis']['reason'] == 'explore'
+    assert router.choose('analysis', candidates)[0] == 'huggingface'
+
+    # Once it answers quickly again it wins the traffic back
+    for _ in range(20):
+        router.record('ollama', 'llama3.2', 0.3, ok=True, tokens=120)
+    assert router.choose('analysis', candidates)[0] == 'ollama'
+
+    snapshot = router.snapshot()
+    print(f"   Providers: {snapshot['providers']}")
+    assert snapshot['providers']['huggingface:google/flan-t5-small']['tokens_per_second'] == 40.0
+    assert snapshot['decision_counts']['analysis'] == {'huggingface': 2, 'ollama': 2}
+
+    print("   ✅ routes by expected latency and explores idle providers")
+
+
+if __name__ == "__main__":
+    test_router()
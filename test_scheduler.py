@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test the bounded LLM priority scheduler
+"""
+import sys
+import time
+import threading
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def test_scheduler():
+    """Queued tasks run by priority and low-priority work is shed under load"""
+    print("🚦 Testing LLM Scheduler")
+    print("=" * 50)
+
+    from backend.helpbot.scheduler import LLMScheduler, LoadShed
+
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=8, shed_queue_depth=2, shed_wait_seconds=5.0)
+    order = []
+
+    def run(task):
+        with scheduler.slot(task):
+            order.append(task)
+
+    scheduler.acquire('conversation')  # occupy the only slot
+    threads = []
+    for task in ('suggestions', 'analysis', 'conversation'):
+        thread = threading.Thread(target=run, args=(task,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+    # The queue was two deep when 'conversation' arrived; only the top priority may still join
+    assert scheduler.stats()['queued'] == 3
+
+    # Another low-priority task is shed immediately instead of queueing behind them
+    try:
+        scheduler.acquire('suggestions')
+        assert False, "expected LoadShed"
+    except LoadShed as e:
+        print(f"   Shed: {e}")
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    print(f"   Ran in order: {order}")
+    assert order == ['conversation', 'analysis', 'suggestions']
+
+    # A low-priority task that waits too long for a slot is shed
+    scheduler.shed_wait_seconds = 0.1
+    scheduler.acquire('conversation')
+    started = time.monotonic()
+    try:
+        scheduler.acquire('suggestions')
+        assert False, "expected LoadShed"
+    except LoadShed:
+        assert time.monotonic() - started < 1.0
+    scheduler.release()
+
+    stats = scheduler.stats()
+    print(f"   Stats: {stats}")
+    assert stats['shed'] == {'suggestions': 2}
+    assert stats['running'] == 0 and stats['queued'] == 0
+
+    print("   ✅ priority order and load shedding")
+
+
+if __name__ == "__main__":
+    test_scheduler()
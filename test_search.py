@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the ranked /search API: heap-based top-k, cursor pagination and snippets
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def make_entries():
+    from backend.helpbot.models import ErrorEntry
+    return [
+        ErrorEntry('1', 'Error Log 1: Database Connection Failed', 'Connection to the database server timed out.', 'Check the network.', page_id='p1'),
+        ErrorEntry('2', 'Error Log 2: AS2 Connection Timeout', 'The partner socket is unreachable.', 'Retry later.', page_id='p1'),
+        ErrorEntry('3', 'Error Log 3: Login Rejected', 'The password was wrong, login unauthorized.', 'Reset it.', page_id='p2'),
+        ErrorEntry('4', 'Error Log 4: Proxy Timeout', 'Connection to the proxy timed out.', 'Check the route.', page_id='p2'),
+        ErrorEntry('5', 'Error Log 5: Disk Full', 'No space left on the volume.', 'Free some space.', page_id='p2'),
+    ]
+
+
+def test_top_matches():
+    """top_matches agrees with find_best_match and pages through the ranking without gaps"""
+    print("🔎 Testing Top-k Ranking")
+    print("=" * 50)
+    from backend.helpbot.html_extractor import HTMLExtractor, EXACT_ID_SCORE
+
+    extractor = HTMLExtractor()
+    entries = make_entries()
+    query = "database connection timeout"
+
+    ranked = extractor.top_matches(query, entries, k=10)
+    print(f"   Ranking: {[(score, entry.id) for score, entry in ranked]}")
+    assert ranked[0][1] is extractor.find_best_match(query, entries)
+    assert [score for score, _ in ranked] == sorted((score for score, _ in ranked), reverse=True)
+    assert all(score > 0 for score, _ in ranked) and '5' not in [entry.id for _, entry in ranked]
+
+    # Two results at a time, each page resuming after the last one
+    paged, after = [], None
+    while True:
+        page = extractor.top_matches(query, entries, k=2, after=after)
+        if not page:
+            break
+        paged.extend(page)
+        last_score, last_entry = page[-1]
+        after = (last_score, last_entry.page_id, last_entry.id)
+    assert [entry.id for _, entry in paged] == [entry.id for _, entry in ranked]
+
+    # Naming an entry ranks it first
+    assert extractor.top_matches("error log 3 timeout", entries, k=1)[0] == (EXACT_ID_SCORE, entries[2])
+    print("   ✅ heap ranking matches the best match and paginates cleanly")
+
+
+def test_search_endpoint():
+    """GET /search returns scored results, snippets and a working cursor"""
+    print("🌐 Testing /search")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from fastapi import HTTPException
+    from backend import app as helpbot
+    from backend.helpbot.search import make_snippet
+
+    # Without a knowledge base the demo entries are searched
+    first = asyncio.run(helpbot.search(q="connection timeout", k=1))
+    print(f"   Page 1: {[(r.id, r.score) for r in first.results]}")
+    assert len(first.results) == 1 and first.next_cursor
+    assert first.results[0].id == '3999' and first.results[0].snippet
+
+    second = asyncio.run(helpbot.search(q="connection timeout", k=1, cursor=first.next_cursor))
+    assert second.results[0].id != '3999' and second.results[0].score <= first.results[0].score
+
+    # A cursor only works for the query it was issued for
+    try:
+        asyncio.run(helpbot.search(q="login failed", cursor=first.next_cursor))
+        assert False, "expected a 400"
+    except HTTPException as e:
+        assert e.status_code == 400
+
+    text = "word " * 50 + "the proxy timed out " + "word " * 50
+    snippet = make_snippet(text, {'proxy'}, width=60)
+    assert 'proxy' in snippet and snippet.startswith('…') and snippet.endswith('…')
+    print("   ✅ scored results, snippets and cursor pagination")
+
+
+if __name__ == "__main__":
+    test_top_matches()
+    test_search_endpoint()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test per-space knowledge base shards: routing, concurrent fan-out and the per-space search budget
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+OPS_PAGE = """<p>Error Log 1: Database Connection Failed</p>
+<p>Issue: Connection to the database server timed out.</p>
+<p>Solution: Check the network route to the database.</p>"""
+
+DEV_PAGE = """<p>Error Log 7: Database Migration Failed</p>
+<p>Issue: The database schema migration was rejected.</p>
+<p>Solution: Roll back the migration and retry.</p>"""
+
+
+def make_sharded(*space_keys):
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.shards import ShardedKnowledgeBase, SpaceShard, shard_snapshot_path
+    return ShardedKnowledgeBase([
+        SpaceShard(key, KnowledgeBase(), shard_snapshot_path('data/kb_snapshot.db', key)) for key in space_keys
+    ])
+
+
+def test_routing():
+    """Pages land in their space's shard and reads see every shard"""
+    print("🧩 Testing Shard Routing")
+    print("=" * 50)
+    from backend.helpbot.shards import parse_space_keys, shard_snapshot_path
+
+    assert parse_space_keys(" OPS, DEV,,OPS ") == ['OPS', 'DEV']
+    assert shard_snapshot_path('data/kb_snapshot.db', 'OPS') == 'data/kb_snapshot.OPS.db'
+
+    sharded = make_sharded('OPS', 'DEV')
+    sharded.update_page('100', 'Ops Errors', 1, OPS_PAGE, space_key='OPS')
+    sharded.update_page('200', 'Dev Errors', 1, DEV_PAGE, space_key='DEV')
+    assert len(sharded) == 2 and len(sharded.shards['OPS'].knowledge_base) == 1
+    assert sharded.get_by_id('7').page_id == '200' and '100' in sharded.pages
+    assert sharded.get_page_body('200') == DEV_PAGE
+
+    # An edit without a space stays in the page's shard; a moved page changes shard
+    assert sharded.update_page('200', 'Dev Errors', 2, DEV_PAGE) is sharded.shards['DEV']
+    sharded.update_page('200', 'Dev Errors', 3, DEV_PAGE, space_key='OPS')
+    assert sharded.shard_for_page('200').space_key == 'OPS' and not len(sharded.shards['DEV'].knowledge_base)
+
+    merged = sharded.merged()
+    assert len(merged) == 2 and set(merged.pages) == {'100', '200'}
+    assert sharded.remove_page('100').space_key == 'OPS' and sharded.get_by_id('1') is None
+    print("   ✅ per-space writes, merged reads, moves and removals")
+
+
+class SlowShardExecutor:
+    """Runs tasks inline, but stalls the ones over more than `slow_over` candidates like a huge space would"""
+
+    def __init__(self, slow_over):
+        self.slow_over = slow_over
+
+    async def run_in_thread(self, func, *args, deadline=None):
+        if len(args[1]) > self.slow_over:
+            await asyncio.sleep(5)
+        return func(*args)
+
+
+def test_fan_out():
+    """Queries merge every space by score, and a slow space is timed out without holding back the rest"""
+    print("🌐 Testing Shard Fan-out")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import app as helpbot
+
+    sharded = make_sharded('OPS', 'DEV', 'HUGE')
+    sharded.update_page('100', 'Ops Errors', 1, OPS_PAGE, space_key='OPS')
+    sharded.update_page('200', 'Dev Errors', 1, DEV_PAGE, space_key='DEV')
+    huge = "".join(f"<p>Error Log {n}: Database Backup {n} Failed</p><p>Issue: Database backup stalled.</p>"
+                   f"<p>Solution: Rerun the backup.</p>" for n in range(1000, 1050))
+    sharded.update_page('300', 'Backups', 1, huge, space_key='HUGE')
+
+    saved = helpbot.knowledge_base, helpbot.extraction_executor, helpbot.KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS
+    helpbot.knowledge_base = sharded
+    helpbot.extraction_executor = SlowShardExecutor(slow_over=10)
+    helpbot.KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS = 0.2
+    try:
+        ranked, candidates = asyncio.run(helpbot.search_shards("database migration rejected", 5))
+        print(f"   Merged: {[(round(score, 1), entry.id) for score, entry in ranked]} from {candidates} candidates")
+        assert ranked[0][1].id == '7' and {entry.id for _, entry in ranked} == {'1', '7'}
+        assert [score for score, _ in ranked] == sorted((score for score, _ in ranked), reverse=True)
+
+        stats = sharded.stats()
+        print(f"   HUGE: {stats['HUGE']['timeouts']} timeout(s), {stats['HUGE']['last_query_ms']} ms")
+        assert stats['HUGE']['timeouts'] == 1 and stats['OPS']['timeouts'] == 0
+        assert stats['HUGE']['entries'] == 50 and stats['OPS']['queries'] == 1
+
+        match = asyncio.run(helpbot.find_knowledge_base_match("database connection timed out", None))
+        assert match.id == '1'
+    finally:
+        helpbot.knowledge_base, helpbot.extraction_executor, helpbot.KNOWLEDGE_BASE_SHARD_TIMEOUT_SECONDS = saved
+    print("   ✅ results merged by score within the budget of the slowest space")
+
+
+def test_local_search_follows_edits():
+    """With several spaces, an edit in one of them reaches the combined snapshot local search reads"""
+    print("🔎 Testing Local Search After a Shard Edit")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import app as helpbot
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.local_search import LocalSearchBackend
+    from backend.helpbot.shards import ShardedKnowledgeBase, SpaceShard, shard_snapshot_path
+    from test_knowledge_base import FakeConfluenceClient
+
+    directory = tempfile.mkdtemp()
+    combined_path = os.path.join(directory, 'kb_snapshot.db')
+    sharded = ShardedKnowledgeBase([
+        SpaceShard(key, KnowledgeBase(), shard_snapshot_path(combined_path, key)) for key in ('OPS', 'DEV')
+    ])
+    sharded.update_page('100', 'Ops Errors', 1, OPS_PAGE, space_key='OPS')
+    sharded.update_page('200', 'Dev Errors', 1, DEV_PAGE, space_key='DEV')
+    client = FakeConfluenceClient({'200': ('Dev Errors', 2, DEV_PAGE.replace('Roll back', 'Quarantine'))})
+    client.space_key = 'DEV'
+    search = LocalSearchBackend(combined_path)
+
+    saved = (helpbot.knowledge_base, helpbot.confluence_client, helpbot.search_backend,
+             helpbot.KNOWLEDGE_BASE_SNAPSHOT)
+    helpbot.knowledge_base, helpbot.confluence_client, helpbot.search_backend = sharded, client, search
+    helpbot.KNOWLEDGE_BASE_SNAPSHOT = combined_path
+
+    async def scenario():
+        helpbot.page_refresh_queue.submit('page_updated', '200')
+        await helpbot.page_refresh_queue.drain()
+
+    try:
+        helpbot.save_snapshots(list(sharded.shards.values()))
+        assert search.search_pages("migration")[0]['id'] == '200' and not search.search_pages("quarantine")
+        asyncio.run(scenario())
+        results = search.search_pages("quarantine")
+        print(f"   After the edit: {[(result['id'], result['version']['number']) for result in results]}")
+        assert results and results[0]['id'] == '200' and results[0]['version']['number'] == 2
+        assert 'Quarantine the migration' in results[0]['body']['storage']['value']
+        assert os.path.exists(shard_snapshot_path(combined_path, 'DEV'))
+    finally:
+        search.close()
+        (helpbot.knowledge_base, helpbot.confluence_client, helpbot.search_backend,
+         helpbot.KNOWLEDGE_BASE_SNAPSHOT) = saved
+    print("   ✅ the combined snapshot is rewritten with the shard")
+
+
+if __name__ == "__main__":
+    test_routing()
+    test_fan_out()
+    test_local_search_follows_edits()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped shared knowledge base index
+"""
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+from test_knowledge_base import FakeConfluenceClient, PAGE_V1, PAGE_V2
+
+
+def test_shared_index_publish_and_remap():
+    """Publish, map, look up and remap after a new version is renamed into place"""
+    print("🗺️  Testing Shared mmap Index")
+    print("=" * 50)
+
+    from backend.helpbot.knowledge_base import KnowledgeBase
+    from backend.helpbot.shared_index import SharedIndex, publish_shared_index
+
+    client = FakeConfluenceClient({'100': ('Errors', 1, PAGE_V1)})
+    knowledge_base = KnowledgeBase()
+    knowledge_base.refresh(client)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kb_index.bin')
+        publish_shared_index(knowledge_base, path)
+
+        index = SharedIndex(path, check_interval=0)
+        assert len(index) == 2
+        assert index.get_by_id('2') == knowledge_base.get_by_id('2')
+        assert index.get_by_id('404') is None
+        assert index.candidates('database server') == knowledge_base.candidates('database server')
+        print(f"   Mapped {len(index)} entries")
+
+        client.pages['200'] = ('More errors', 1, PAGE_V2)
+        knowledge_base.refresh(client)
+        publish_shared_index(knowledge_base, path)
+
+        assert index.maybe_remap()
+        assert len(index) == 3
+        assert index.get_by_id('3').explanation == 'The export volume has no free space.'
+        assert not index.maybe_remap()
+
+    print("   ✅ Lookups match the in-memory index and new versions are remapped")
+
+
+if __name__ == "__main__":
+    test_shared_index_publish_and_remap()
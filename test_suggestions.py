@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the data-driven suggestion index built from the knowledge base and query log
+"""
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+
+def make_entries():
+    from backend.helpbot.models import ErrorEntry
+    return [
+        ErrorEntry('1', 'Error Log 1: Database Connection Failed', 'Connection to the database server timed out.', 'Check the network.'),
+        ErrorEntry('2', 'Error Log 2: AS2 Connection Timeout', 'The partner socket is unreachable.', 'Retry later.'),
+        ErrorEntry('3', 'Error Log 3: Login Rejected', 'The password was wrong, login unauthorized.', 'Reset it.'),
+        ErrorEntry('4', 'Error Log 4: Token Expired', 'The credential expired.', 'Log in again.'),
+        ErrorEntry('5', 'Error Log 5: Proxy Unreachable', 'Network route to the proxy is down.', 'Check the route.'),
+    ]
+
+
+def test_suggestion_index():
+    """Session co-occurrence and category popularity rank the related entries"""
+    print("💡 Testing Suggestion Index")
+    print("=" * 50)
+    from backend.helpbot.query_log import QueryLog
+    from backend.helpbot.suggestions import SuggestionIndex, keyword_category
+
+    entries = make_entries()
+    assert keyword_category(entries[0]) == 'connection'
+    assert keyword_category(entries[2]) == 'authentication'
+
+    log = QueryLog(os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    # Users who hit the AS2 timeout often hit the login error next; the proxy error is popular
+    for session in ('a', 'b'):
+        log.record("as2 timeout", '2', session)
+        log.record("cannot log in", '3', session)
+    for _ in range(3):
+        log.record("proxy down", '5', None)
+    log.record("unknown", None, 'c')
+    log.flush()
+    records = log.read()
+    assert len(records) == 8
+
+    index = SuggestionIndex.build(entries, records, top_n=2)
+    print(f"   Related to entry 2: {index.lookup('2')}")
+    assert index.lookup('2') == ['Error Log 3: Login Rejected', 'Error Log 5: Proxy Unreachable']
+    # Without traffic linking them, entries suggest their category's popular entries
+    assert index.lookup('1')[0] == 'Error Log 5: Proxy Unreachable'
+    assert index.lookup('4') == ['Error Log 3: Login Rejected']
+    assert index.lookup('missing') == []
+    stats = index.stats()
+    assert stats['queries'] == 7 and stats['sessions'] == 2
+
+    # An enrichment's category overrides the keyword guess
+    enrichments = {entries[3].version_key(): {'category': 'configuration'}}
+    index = SuggestionIndex.build(entries, records, enrichments, top_n=2)
+    assert index.lookup('4') == []
+    print("   ✅ co-occurrence, category popularity and enrichment categories")
+
+
+if __name__ == "__main__":
+    test_suggestion_index()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test push-based invalidation through the Confluence webhook endpoint
+"""
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.append('backend')
+
+from test_knowledge_base import FakeConfluenceClient
+
+PAGE_V1 = """<p>Error Log 41: Queue Stalled</p>
+<p>Issue: The outbound queue stopped draining.</p>
+<p>Solution: Restart the queue worker.</p>"""
+
+PAGE_V2 = """<p>Error Log 41: Queue Stalled</p>
+<p>Issue: The outbound queue stopped draining.</p>
+<p>Solution: Clear the poison message, then restart the queue worker.</p>"""
+
+
+def test_signature_and_parsing():
+    """Only correctly signed page events are accepted"""
+    print("🔏 Testing Webhook Signatures")
+    print("=" * 50)
+    from backend.helpbot.webhook import WebhookError, parse_event, sign, verify_signature
+
+    body = json.dumps({'event': 'page_updated', 'page': {'id': 900}}).encode()
+    verify_signature('secret', body, sign('secret', body))
+    for signature in (None, sign('other', body), sign('secret', body + b' ')):
+        try:
+            verify_signature('secret', body, signature)
+            assert False, "expected a WebhookError"
+        except WebhookError:
+            pass
+    assert parse_event(body) == ('page_updated', '900')
+    assert parse_event(b'{"event": "comment_created"}') == (None, None)
+
+    print("   ✅ HMAC verification and event parsing")
+
+
+def test_webhook_refreshes_page():
+    """A page_updated event re-extracts the page and drops only the answers quoting it"""
+    print("🪝 Testing Webhook Invalidation")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    import httpx
+    from backend import app as helpbot
+    from backend.helpbot.webhook import SIGNATURE_HEADER, sign
+
+    client = FakeConfluenceClient({'900': ('Queue Errors', 1, PAGE_V1)})
+    helpbot.confluence_client = client
+    helpbot.CONFLUENCE_WEBHOOK_SECRET = 'secret'
+    helpbot.answer_cache.put('queue stalled', 'old answer', ['900'])
+    helpbot.answer_cache.put('disk full', 'other answer', ['901'])
+
+    async def post(event, signature=None):
+        body = json.dumps({'event': event, 'page': {'id': 900}}).encode()
+        headers = {SIGNATURE_HEADER: signature or sign('secret', body)}
+        transport = httpx.ASGITransport(app=helpbot.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://helpbot') as http:
+            return await http.post('/webhooks/confluence', content=body, headers=headers)
+
+    async def scenario():
+        rejected = await post('page_updated', signature='sha256=bad')
+        assert rejected.status_code == 401 and not len(helpbot.page_refresh_queue)
+
+        # Page created, then edited twice before the queue runs: one fetch of the latest version
+        assert (await post('page_created')).status_code == 202
+        await helpbot.page_refresh_queue.drain()
+        assert helpbot.knowledge_base.get_by_id('41').resolution.startswith('Restart')
+        client.pages['900'] = ('Queue Errors', 2, PAGE_V2)
+        await post('page_updated')
+        await post('page_updated')
+        await helpbot.page_refresh_queue.drain()
+
+        entry = helpbot.knowledge_base.get_by_id('41')
+        assert entry.resolution.startswith('Clear the poison message') and client.body_fetches == 2
+        assert helpbot.answer_cache.get('queue stalled') is None
+        assert helpbot.answer_cache.get('disk full') == 'other answer'
+        assert helpbot.page_refresh_queue.stats()['merged'] == 1
+
+        await post('page_removed')
+        await helpbot.page_refresh_queue.drain()
+        assert helpbot.knowledge_base.get_by_id('41') is None and '900' not in helpbot.knowledge_base.pages
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        helpbot.confluence_client = None
+        helpbot.CONFLUENCE_WEBHOOK_SECRET = None
+        helpbot.answer_cache.clear()
+    print("   ✅ signed events refresh one page in place and invalidate its answers")
+
+
+def test_webhook_drops_prewarmed_answers():
+    """Answers cached by prewarming are tagged with their page, so an edit to it drops them too"""
+    print("🔥 Testing Webhook Invalidation of Prewarmed Answers")
+    print("=" * 50)
+    os.environ.pop('CONFLUENCE_URL', None)
+    os.environ.setdefault('QUERY_LOG_PATH', os.path.join(tempfile.mkdtemp(), 'queries.db'))
+    os.environ.setdefault('KNOWLEDGE_BASE_SNAPSHOT', os.path.join(tempfile.mkdtemp(), 'missing.db'))
+    from backend import app as helpbot
+    from backend.helpbot.query_log import canonical_query
+
+    client = FakeConfluenceClient({'900': ('Queue Errors', 1, PAGE_V1)})
+    saved_queries = helpbot.PREWARM_QUERIES
+    helpbot.confluence_client = client
+    helpbot.PREWARM_QUERIES = ["queue stalled draining"]
+    key = canonical_query("queue stalled draining")
+
+    async def scenario():
+        helpbot.page_refresh_queue.submit('page_created', '900')
+        await helpbot.page_refresh_queue.drain()
+        stats = await helpbot.prewarm_caches()
+        assert stats['warmed'] == 1 and helpbot.answer_cache.get(key) is not None
+
+        client.pages['900'] = ('Queue Errors', 2, PAGE_V2)
+        helpbot.page_refresh_queue.submit('page_updated', '900')
+        await helpbot.page_refresh_queue.drain()
+        misses = helpbot.answer_cache.misses
+        assert helpbot.answer_cache.get(key) is None and helpbot.answer_cache.misses == misses + 1
+
+        helpbot.page_refresh_queue.submit('page_removed', '900')
+        await helpbot.page_refresh_queue.drain()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        helpbot.confluence_client = None
+        helpbot.PREWARM_QUERIES = saved_queries
+        helpbot.answer_cache.clear()
+    print("   ✅ the prewarmed answer is a cache miss after its page changes")
+
+
+if __name__ == "__main__":
+    test_signature_and_parsing()
+    test_webhook_refreshes_page()
+    test_webhook_drops_prewarmed_answers()